@@ -1,23 +1,40 @@
 import os
+import sys
 import time
 import streamlit as st
-from openai import OpenAI
 from dotenv import load_dotenv
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import UnstructuredURLLoader, SeleniumURLLoader
-from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
-# Using simple list-based memory instead of ConversationBufferMemory to avoid dependency issues
-# from langchain.memory import ConversationBufferMemory
 from datetime import datetime
-import pandas as pd
-import plotly.express as px
-from bs4 import BeautifulSoup
-import requests
 import json
 import uuid
-import shutil
-import atexit
+import io
+import hashlib
+import functools
+
+# Reuse the sarabotai package components (process-wide model registry etc.)
+_package_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sarabotai")
+if _package_dir not in sys.path:
+    sys.path.insert(0, _package_dir)
+from config import Config
+from modules.embeddings import embedding_registry
+from modules.answer_cache import answer_cache, answer_scope
+from modules.batch_qa import BatchAnswerer, read_questions
+from modules.fetcher import get_fetcher
+from modules.gemini_integration import OpenAIIntegration
+from modules.summarizer import MapReduceSummarizer
+from modules.context_packer import ContextPacker
+from modules.ingestion import ingest_urls, ingest_upload
+from modules.prewarm import prewarmer
+from modules.vector_store import VectorStore, store_handles
+from modules.session_stores import session_stores
+from utils.conversation_memory import ConversationMemory
+from utils.llm_retry import complete_with_retries
+from utils.job_queue import get_job_queue, DONE as JOB_DONE, CANCELLED as JOB_CANCELLED
+from utils.metrics import configure_logging, current_session, metrics, span, start_metrics_server
+from utils.process_stats import format_bytes
+
+# Structured span logs and the optional /metrics endpoint (both once per process)
+configure_logging()
+start_metrics_server()
 
 # Load environment variables (optional fallback)
 load_dotenv()
@@ -35,31 +52,18 @@ if 'client' not in st.session_state:
 st.set_page_config(page_title="SaraBot AI: Advanced Search Tool", page_icon="🤖", layout="wide")
 st.title("SaraBot AI: Advanced Search Tool 🤖")
 
-# Initialize embeddings with device handling fix (lazy loading to save memory)
-embeddings = None
+# Embeddings come from the process-wide registry: the model is loaded once per
+# server process (pre-warmed in the background, see below) and shared by all sessions
 def get_embeddings():
-    global embeddings
-    if embeddings is None:
-        try:
-            embeddings = HuggingFaceEmbeddings(
-                model_name="sentence-transformers/all-MiniLM-L6-v2",
-                model_kwargs={'device': 'cpu'},  # Forced to CPU to avoid meta tensor issue
-                encode_kwargs={'normalize_embeddings': True}
-            )
-        except Exception as e:
-            st.error(f"Failed to initialize embeddings: {str(e)}")
-            embeddings = None
-    return embeddings
-
-# Cleanup function for Windows file locking issues
-def cleanup_chroma_db():
-    if 'db_path' in globals() and os.path.exists(db_path):
-        try:
-            shutil.rmtree(db_path, ignore_errors=True)
-        except:
-            pass
+    try:
+        return embedding_registry.get()
+    except Exception as e:
+        st.error(f"Failed to initialize embeddings: {str(e)}")
+        return None
 
-atexit.register(cleanup_chroma_db)
+# Session index directories are evicted by TTL/LRU under disk and memory quotas;
+# directories orphaned by earlier server processes are removed on first start
+session_stores.start()
 
 # Initialize session state variables
 if 'conversation_history' not in st.session_state:
@@ -67,12 +71,23 @@ if 'conversation_history' not in st.session_state:
 if 'processed_urls' not in st.session_state:
     st.session_state.processed_urls = []
 if 'memory' not in st.session_state:
-    st.session_state.memory = []  # Simple list to store conversation history
+    # Question/answer pairs only; older turns are folded into a running summary
+    # (summarize is attached once an API client is configured)
+    st.session_state.memory = ConversationMemory()
 if 'session_id' not in st.session_state:
     st.session_state.session_id = str(uuid.uuid4())[:8]
+if 'ingest_jobs' not in st.session_state:
+    st.session_state.ingest_jobs = []
 
 # Get database path based on current session
-db_path = f"./chroma_db_{st.session_state.session_id}"
+# (one shared store when SHARED_COLLECTION is on, scoped to the session's documents)
+db_path = Config.CHROMA_PERSIST_DIR if Config.SHARED_COLLECTION else session_stores.path_for(st.session_state.session_id)
+session_stores.touch(st.session_state.session_id)
+# Spans and LLM usage recorded during this run are attributed to the session
+current_session.set(st.session_state.session_id)
+if session_stores.was_evicted(st.session_state.session_id):
+    st.session_state.processed_urls = []
+    st.info("This session was idle for a while and its indexed content was removed. Please process your sources again.")
 
 # Sidebar configuration
 # Project designed by PRAVIN - do not remove watermark
@@ -98,6 +113,7 @@ with st.sidebar:
                 if api_key_input and len(api_key_input.strip()) > 0:
                     try:
                         # Test the API key by creating OpenAI client
+                        from openai import OpenAI
                         test_client = OpenAI(api_key=api_key_input.strip())
                         # Quick test to validate key (simple test prompt)
                         try:
@@ -137,6 +153,12 @@ with st.sidebar:
     # Session management
     with st.expander("🔧 Session Management", expanded=True):
         if st.button("New Session"):
+            # The previous session's index is no longer reachable: stop its jobs
+            # (so they don't write into it again) and remove it now
+            for job in get_job_queue().jobs(owner=st.session_state.session_id):
+                job.cancel()
+            st.session_state.ingest_jobs = []
+            session_stores.evict_session(st.session_state.session_id)
             st.session_state.session_id = str(uuid.uuid4())[:8]
             st.session_state.processed_urls = []
             st.session_state.conversation_history = []
@@ -166,6 +188,8 @@ with st.sidebar:
         temperature = st.slider("Model Temperature", 0.0, 1.0, 0.7, step=0.1)
         max_results = st.slider("Max Results to Return", 1, 10, 3)
         use_selenium = st.checkbox("Use Selenium (for JavaScript-heavy sites)", False)
+        stream_responses = st.checkbox("Stream responses", True)
+        use_answer_cache = st.checkbox("Reuse answers to similar questions", True)
     
     process_url_clicked = st.button("Process URLs/Text", type="primary")
     st.markdown("---")
@@ -173,169 +197,210 @@ with st.sidebar:
     for i, chat in enumerate(st.session_state.conversation_history):
         st.caption(f"Q{i+1}: {chat['question'][:50]}...")
 
-# Function to fetch article metadata
-def get_article_metadata(url):
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        title = soup.find('meta', property='og:title') or soup.find('meta', attrs={'name': 'title'}) or soup.title
-        title = title['content'] if hasattr(title, 'has_attr') and title.has_attr('content') else str(title.string) if title else "Untitled Article"
-        
-        description = soup.find('meta', property='og:description') or soup.find('meta', attrs={'name': 'description'})
-        description = description['content'] if description else "No description available"
-        
-        return {
-            "title": title[:200] + "..." if len(title) > 200 else title,
-            "description": description[:200] + "..." if len(description) > 200 else description,
-            "url": url,
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-    except Exception as e:
-        return {
-            "title": "Untitled Article",
-            "description": f"Error fetching metadata: {str(e)}",
-            "url": url,
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
+# Record a question/answer pair; older turns are summarized with retried completions
+def remember_turn(question, answer):
+    memory = st.session_state.memory
+    if memory.summarize is None and st.session_state.client:
+        memory.summarize = functools.partial(
+            complete_with_retries, OpenAIIntegration(client=st.session_state.client),
+            temperature=0.3, max_tokens=Config.SUMMARY_MAX_TOKENS
+        )
+    memory.add(question, answer)
 
 # Function to call OpenAI API with enhanced error handling
-def generate_openai_response(prompt, context=None):
+# (errors are returned as text; outcome["ok"] is set only for a real answer)
+def generate_openai_response(prompt, context=None, question=None, outcome=None):
     if not st.session_state.api_key_configured or not st.session_state.client:
         return "⚠️ Please configure your API key first in the sidebar."
     
     try:
-        if context:
-            messages = [
-                {"role": "system", "content": "You are a helpful assistant that provides detailed answers based on the given context."},
-                {"role": "user", "content": f"Context:\n{context}\n\nQuestion:\n{prompt}\n\nAnswer:"}
-            ]
-        else:
-            messages = [
-                {"role": "user", "content": prompt}
-            ]
-        
-        response = st.session_state.client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=messages,
-            temperature=temperature,
-            max_tokens=2048
-        )
-        
-        response_text = response.choices[0].message.content
+        # Same client and model as the streaming path; timed and costed in the llm span
+        llm = OpenAIIntegration(client=st.session_state.client)
+        response_text = llm.complete(prompt, context=context, temperature=temperature)
         
-        # Add to conversation history (simple list-based memory)
-        st.session_state.memory.append({"role": "user", "content": prompt})
-        st.session_state.memory.append({"role": "assistant", "content": response_text})
+        # Memory keeps the user's question, not the full prompt with excerpts
+        remember_turn(question or prompt, response_text)
         
+        if outcome is not None:
+            outcome["ok"] = True
         return response_text
     except Exception as e:
         return f"Error generating response: {str(e)}"
 
-# Function to process URLs/text and create vector store
+# Same as generate_openai_response, but yields tokens as they arrive. Memory is
+# only updated once the stream completes; if the user interrupts the run, the
+# generator is closed and the upstream request is cancelled. An error is shown
+# after the partial answer but not remembered; outcome["ok"] is set only when
+# the answer completed.
+def stream_openai_response(prompt, context=None, question=None, outcome=None):
+    if not st.session_state.api_key_configured or not st.session_state.client:
+        yield "⚠️ Please configure your API key first in the sidebar."
+        return
+    
+    llm = OpenAIIntegration(client=st.session_state.client)
+    parts = []
+    try:
+        for delta in llm.stream_response(prompt, context=context, temperature=temperature):
+            parts.append(delta)
+            yield delta
+    except Exception as e:
+        separator = "\n\n" if parts else ""
+        yield f"{separator}Error generating response: {str(e)}"
+        return
+    
+    if outcome is not None:
+        outcome["ok"] = True
+    remember_turn(question or prompt, "".join(parts))
+
+# Display an answer served from the semantic answer cache
+def show_cached_answer(query, cached_answer):
+    st.session_state.conversation_history.append({
+        "question": query,
+        "context": cached_answer["context"],
+        "answer": cached_answer["answer"],
+        "cached": True,
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    })
+    remember_turn(query, cached_answer["answer"])
+    
+    with st.chat_message("user"):
+        st.write(query)
+    
+    with st.chat_message("assistant"):
+        st.write(cached_answer["answer"])
+        cache_stats = answer_cache.stats()
+        st.caption(f"⚡ Served from cache (similarity {cached_answer['similarity']:.2f}, "
+                   f"hit rate {cache_stats['hit_rate']:.0%})")
+        
+        with st.expander("View Sources"):
+            for source in cached_answer["sources"]:
+                st.write(f"- {source}")
+
+# Vector store for the current session (incremental, keyed by document)
+def get_vector_store():
+    if get_embeddings() is None:
+        return None
+    return VectorStore(db_path=db_path, session_id=st.session_state.session_id)
+
+# The session's vector store, None when nothing has been indexed yet
+def get_session_store():
+    vector_store = get_vector_store()
+    if vector_store is None or vector_store.get_store() is None:
+        return None
+    if vector_store.shared and not vector_store.list_documents():
+        return None
+    return vector_store
+
+# Record article metadata for this session, replacing an earlier entry for the same source
+def record_processed_article(metadata):
+    st.session_state.processed_urls = [
+        article for article in st.session_state.processed_urls
+        if article.get("doc_id") != metadata["doc_id"]
+    ]
+    st.session_state.processed_urls.append(metadata)
+
+# Re-measure the session's index so the storage manager can enforce its quotas
+def refresh_session_usage():
+    vector_store = get_vector_store()
+    backend_stats = vector_store.backend_stats() if vector_store is not None else None
+    session_stores.refresh(st.session_state.session_id, memory_bytes=(backend_stats or {}).get("matrix_bytes", 0))
+
+# Function to queue URLs/text for indexing. Ingestion runs as a background job
+# (fetch -> split -> embed -> commit), so the page stays responsive and chat keeps
+# answering from the current index; results are collected by collect_ingest_jobs()
 def process_urls(url_list, uploaded_file=None):
     if not any(url_list) and not uploaded_file:
         st.sidebar.warning("Please enter at least one valid URL or upload a text file.")
         return None
     
-    with st.spinner("Processing content... This may take a few moments ⏳"):
-        # Clear existing database if it exists
-        if os.path.exists(db_path):
-            try:
-                shutil.rmtree(db_path, ignore_errors=True)
-            except Exception as e:
-                st.error(f"Error clearing old database: {str(e)}")
-                return False
-        
-        # Reset processed URLs for this session
-        st.session_state.processed_urls = []
+    # Documents already in the index are kept; only new or changed content is embedded
+    vector_store = get_vector_store()
+    if vector_store is None:
+        return False
+    
+    job_queue = get_job_queue()
+    owner = st.session_state.session_id
+    if uploaded_file:
+        # The job gets its own copy: the widget's buffer is reused by later reruns
+        job = job_queue.submit(
+            "ingest", ingest_upload, vector_store, io.BytesIO(uploaded_file.getvalue()), uploaded_file.name,
+            size=uploaded_file.size, chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+            owner=owner, description=uploaded_file.name
+        )
+    else:
+        valid_urls = []
+        for url in url_list:
+            if url.startswith(('http://', 'https://')):
+                valid_urls.append(url)
+            else:
+                st.warning(f"Skipping invalid URL: {url}")
         
-        try:
-            # Handle text file upload
-            if uploaded_file:
-                file_content = uploaded_file.read().decode("utf-8")
-                metadata = {
-                    "title": uploaded_file.name,
-                    "description": "Uploaded text content",
-                    "url": "local_file",
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
-                st.session_state.processed_urls.append(metadata)
-                
-                # Split text
-                text_splitter = RecursiveCharacterTextSplitter(
-                    separators=['\n\n', '\n', '.', ','],
-                    chunk_size=chunk_size,
-                    chunk_overlap=chunk_overlap
-                )
-                docs = text_splitter.create_documents([file_content])
-                
-                # Create vector store
-                vectorstore_chroma = Chroma.from_documents(
-                    docs, 
-                    get_embeddings(), 
-                    persist_directory=db_path
-                )
-                vectorstore_chroma.persist()
-                
-                st.success("Text content processed successfully! ✅")
-                return True
-            
-            # Handle URLs
-            elif url_list:
-                valid_urls = []
-                for url in url_list:
-                    if url.startswith(('http://', 'https://')):
-                        valid_urls.append(url)
-                    else:
-                        st.warning(f"Skipping invalid URL: {url}")
-                
-                if not valid_urls:
-                    st.error("No valid URLs to process")
-                    return False
-                
-                if use_selenium:
-                    loader = SeleniumURLLoader(urls=valid_urls)
-                else:
-                    loader = UnstructuredURLLoader(urls=valid_urls)
-                
-                data = loader.load()
-                
-                # Store metadata for processed URLs
-                for url in valid_urls:
-                    metadata = get_article_metadata(url)
-                    st.session_state.processed_urls.append(metadata)
-                
-                # Split documents
-                text_splitter = RecursiveCharacterTextSplitter(
-                    separators=['\n\n', '\n', '.', ','],
-                    chunk_size=chunk_size,
-                    chunk_overlap=chunk_overlap
-                )
-                docs = text_splitter.split_documents(data)
-                
-                # Create new vector store
-                vectorstore_chroma = Chroma.from_documents(
-                    docs, 
-                    get_embeddings(), 
-                    persist_directory=db_path
-                )
-                vectorstore_chroma.persist()
-                
-                st.success("URLs processed successfully! ✅")
-                return True
-            
-        except Exception as e:
-            st.error(f"Error processing content: {str(e)}")
+        if not valid_urls:
+            st.error("No valid URLs to process")
             return False
+        
+        job = job_queue.submit(
+            "ingest", ingest_urls, vector_store, valid_urls,
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap, use_selenium=use_selenium,
+            owner=owner, description=f"{len(valid_urls)} URL(s)"
+        )
+    st.session_state.ingest_jobs.append(job.id)
+    return True
+
+# Collect finished ingestion jobs of this session: record their articles and report the outcome
+def collect_ingest_jobs():
+    job_queue = get_job_queue()
+    pending = []
+    collected = False
+    for job_id in st.session_state.ingest_jobs:
+        job = job_queue.get(job_id)
+        if job is None:
+            continue
+        if not job.finished:
+            pending.append(job_id)
+            continue
+        collected = True
+        if job.status == JOB_DONE:
+            for metadata in job.result["articles"]:
+                record_processed_article(metadata)
+            if job.result["unchanged"]:
+                st.info(f"{job.result['unchanged']} article(s) unchanged since they were last indexed")
+            st.success(f"{job.description} processed successfully! ✅")
+        elif job.status == JOB_CANCELLED:
+            if job.warning:
+                st.warning(f"Processing of {job.description} was cancelled, but {job.warning}")
+            else:
+                st.info(f"Processing of {job.description} was cancelled; the index was left unchanged.")
+        else:
+            st.error(f"Error processing content: {job.error}")
+    st.session_state.ingest_jobs = pending
+    if collected:
+        refresh_session_usage()
+
+# Progress of running ingestion jobs. Runs as a fragment that refreshes itself every
+# JOB_POLL_INTERVAL seconds without rerunning the page; once a job finishes the whole
+# app is rerun so its results are collected.
+_fragment = getattr(st, "fragment", None) or st.experimental_fragment
+@_fragment(run_every=Config.JOB_POLL_INTERVAL)
+def show_ingest_jobs():
+    job_queue = get_job_queue()
+    jobs = [job_queue.get(job_id) for job_id in st.session_state.ingest_jobs]
+    if any(job is None or job.finished for job in jobs):
+        st.rerun()
+    st.subheader("⏳ Processing")
+    for job in jobs:
+        stage = job.stage or "queued"
+        st.progress(job.progress, text=f"{job.description} — {stage}: {job.message}")
+        if job.cancelled:
+            st.caption("Cancelling...")
+        elif st.button("Cancel", key=f"cancel_{job.id}"):
+            job_queue.cancel(job.id)
 
 # Function to display processed articles
 def show_processed_articles():
     if st.session_state.processed_urls:
         st.subheader("📚 Processed Content")
+        import pandas as pd
         articles_df = pd.DataFrame(st.session_state.processed_urls)
         
         # Display as expandable cards
@@ -346,9 +411,13 @@ def show_processed_articles():
                 st.markdown(f"**Description:** {article['description']}")
                 st.markdown(f"**Processed at:** {article['timestamp']}")
                 
-                # Add delete button
+                # Add delete button (removes the article's vectors from the index too)
                 if st.button(f"Remove {idx+1}", key=f"remove_{idx}"):
-                    st.session_state.processed_urls.pop(idx)
+                    removed = st.session_state.processed_urls.pop(idx)
+                    vector_store = get_vector_store()
+                    if vector_store is not None and removed.get("source"):
+                        vector_store.delete_document(removed["source"])
+                        refresh_session_usage()
                     st.rerun()
         
         # Display as a table view option
@@ -357,35 +426,26 @@ def show_processed_articles():
 
 # Function to generate summary report
 def generate_summary_report():
-    if os.path.exists(db_path):
-        vectorstore = Chroma(persist_directory=db_path, embedding_function=get_embeddings())
-        
+    if not st.session_state.api_key_configured or not st.session_state.client:
+        return "⚠️ Please configure your API key first in the sidebar."
+    
+    vector_store = get_vector_store()
+    if vector_store is not None and os.path.exists(db_path):
         try:
-            # Get all documents
-            docs = vectorstore.similarity_search("", k=5)
+            # Get all documents (the whole corpus, not just a few chunks)
+            documents = vector_store.get_documents()
             
-            if not docs:
+            if not documents:
                 return "No content available to generate report."
-                
-            combined_text = "\n\n".join([doc.page_content for doc in docs])
-            
-            summary_prompt = f"""
-            Analyze the following text content and provide a comprehensive summary report:
-            
-            Content:
-            {combined_text}
-            
-            Please provide:
-            1. Key themes and topics covered
-            2. Notable facts or statistics mentioned
-            3. Overall sentiment analysis
-            
-            Format your response with clear headings for each section.
-            """
             
+            # Chunk groups are summarized concurrently and reduced into one report;
+            # partial summaries are cached, so only new articles cost LLM calls
+            summarizer = MapReduceSummarizer(OpenAIIntegration(client=st.session_state.client))
             with st.spinner("Generating comprehensive report..."):
-                report = generate_openai_response(summary_prompt)
-                return report
+                report = summarizer.summarize(documents)
+            
+            remember_turn("Generate a comprehensive summary report", report)
+            return report
         except Exception as e:
             return f"Error generating report: {str(e)}"
     else:
@@ -394,20 +454,18 @@ def generate_summary_report():
 # Function to visualize topics
 def visualize_topics():
     if os.path.exists(db_path):
-        vectorstore = Chroma(persist_directory=db_path, embedding_function=get_embeddings())
         try:
-            docs = vectorstore.similarity_search("", k=5)
-            
-            if not docs:
+            # Term counts are maintained at ingest time over the whole corpus,
+            # so rendering needs neither a vector query nor the embedding model
+            # (scoped to the session's documents in shared mode)
+            top_terms = VectorStore(db_path=db_path, session_id=st.session_state.session_id).top_terms(10)
+            if not top_terms:
                 st.warning("No content available for analysis")
                 return
-                
-            words = " ".join([doc.page_content for doc in docs]).split()
-            word_freq = pd.Series(words).value_counts().reset_index()
-            word_freq.columns = ['word', 'count']
-            word_freq = word_freq[~word_freq['word'].str.len().lt(4)]
-            word_freq = word_freq[~word_freq['word'].str.contains(r'[^a-zA-Z]')]
-            word_freq = word_freq.head(10)  # Show top 10 words
+            
+            import pandas as pd
+            import plotly.express as px
+            word_freq = pd.DataFrame(top_terms, columns=['word', 'count'])  # Show top 10 words
             
             if not word_freq.empty:
                 fig = px.bar(word_freq, x='word', y='count', title="Frequent Terms")
@@ -417,6 +475,11 @@ def visualize_topics():
         except Exception as e:
             st.error(f"Error in topic analysis: {str(e)}")
 
+# The page so far only needed light modules. Heavy libraries (langchain, openai,
+# pandas, plotly) and the embedding model are imported/loaded from here on in a
+# background thread, once per process (STARTUP_MODE=lazy: on first use only)
+prewarmer.start()
+
 # Check if API key is configured before allowing operations
 if not st.session_state.api_key_configured:
     st.warning("⚠️ **Please configure your OpenAI API key in the sidebar to use this application.**")
@@ -433,6 +496,11 @@ if not st.session_state.api_key_configured:
 if process_url_clicked:
     process_urls(urls, uploaded_file if url_input_method == "File Upload" else None)
 
+# Pick up ingestion jobs that finished since the last run, then show the running ones
+collect_ingest_jobs()
+if st.session_state.ingest_jobs:
+    show_ingest_jobs()
+
 # Display processed articles in main area
 show_processed_articles()
 
@@ -443,63 +511,74 @@ else:
     query = None
 
 if query:
-    if os.path.exists(db_path):
-        vectorstore = Chroma(persist_directory=db_path, embedding_function=get_embeddings())
+    vectorstore = get_session_store()
+    if vectorstore is not None:
+        # Near-duplicate questions against the same set of chunks (and with the same
+        # conversation history in the prompt) are answered from the cache
+        cached_answer = None
+        packer = ContextPacker()
+        with span("embed_query"):
+            query_vector = get_embeddings().embed_query(query)
+        if use_answer_cache:
+            corpus_fingerprint = vectorstore.fingerprint()
+            cache_scope = answer_scope(vectorstore, packer.packed_history(st.session_state.memory.messages()))
+            cached_answer = answer_cache.lookup(corpus_fingerprint, query_vector, cache_scope)
         
-        # Enhanced similarity search with score threshold
-        retrieved_docs = vectorstore.similarity_search_with_score(query, k=max_results)
-        retrieved_docs = [doc for doc, score in retrieved_docs if score > 0.5]  # Filter by score
-        
-        if retrieved_docs:
-            context = "\n\n".join([f"Source: {doc.metadata.get('source', 'Unknown')}\nContent: {doc.page_content}" 
-                                 for doc in retrieved_docs])
-            
-            # Add conversation to history
-            st.session_state.conversation_history.append({
-                "question": query,
-                "context": context,
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            })
-            
-            # Generate response with conversation history (simple list-based memory)
-            # Get last 4 messages from memory
-            recent_messages = st.session_state.memory[-8:] if len(st.session_state.memory) > 8 else st.session_state.memory
-            history_context = "\n".join([f"{msg['role']}: {msg['content']}" for msg in recent_messages])
+        if cached_answer:
+            show_cached_answer(query, cached_answer)
+        else:
+            # Hybrid retrieval: dense hits above the similarity floor fused with BM25 hits
+            retrieved_docs = [doc for doc, _ in vectorstore.hybrid_search(query, k=max_results, vector=query_vector)]
             
-            with st.spinner("Analyzing content and generating response..."):
-                final_prompt = f"""
-                Previous conversation context:
-                {history_context}
+            if retrieved_docs:
+                # Token-budgeted prompt: newest history, deduplicated excerpts in rank order
+                packed = packer.pack(query, retrieved_docs, st.session_state.memory.messages())
+                context = packed["context"]
+                retrieved_docs = packed["documents"]
+                final_prompt = packed["prompt"]
                 
-                New question: {query}
-                
-                Relevant content excerpts:
-                {context}
-                
-                Please provide a detailed answer citing sources where appropriate.
-                """
-                
-                response = generate_openai_response(final_prompt)
+                # Add conversation to history
+                st.session_state.conversation_history.append({
+                    "question": query,
+                    "context": context,
+                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                })
                 
                 # Display response in chat format
                 with st.chat_message("user"):
                     st.write(query)
                 
                 with st.chat_message("assistant"):
-                    st.write(response)
+                    # Only complete answers are cached; errors may follow partial text
+                    outcome = {"ok": False}
+                    if stream_responses:
+                        # Tokens render as they arrive; write_stream returns the full text
+                        response = st.write_stream(stream_openai_response(final_prompt, question=query, outcome=outcome))
+                    else:
+                        with st.spinner("Analyzing content and generating response..."):
+                            response = generate_openai_response(final_prompt, question=query, outcome=outcome)
+                        st.write(response)
+                    st.session_state.conversation_history[-1]["answer"] = response
+                    
+                    if use_answer_cache and outcome["ok"]:
+                        answer_cache.store(
+                            corpus_fingerprint, query, query_vector, response,
+                            [doc.metadata.get("source", "Unknown source") for doc in retrieved_docs],
+                            context=context, scope=cache_scope
+                        )
                     
                     # Show sources
                     with st.expander("View Sources"):
                         for doc in retrieved_docs:
                             source = doc.metadata.get("source", "Unknown source")
                             st.write(f"- {source}")
-        else:
-            st.warning("No relevant information found in the content to answer this question.")
+            else:
+                st.warning("No relevant information found in the content to answer this question.")
     else:
         st.warning("Please process some content first before asking questions.")
 
 # Additional features in tabs
-tab1, tab2, tab3 = st.tabs(["📊 Summary Report", "🔍 Topic Analysis", "⚡ Quick Actions"])
+tab1, tab2, tab3, tab4 = st.tabs(["📊 Summary Report", "🔍 Topic Analysis", "⚡ Quick Actions", "📋 Batch Questions"])
 
 with tab1:
     st.subheader("Comprehensive Summary Report")
@@ -548,9 +627,9 @@ with tab3:
         if st.button("Reset Vector Database"):
             try:
                 if os.path.exists(db_path):
-                    # Close any existing Chroma client connections first
-                    if 'vectorstore' in globals():
-                        del globals()['vectorstore']
+                    # Closes the store's handles before removing its files; in shared
+                    # mode only this session's document references are released
+                    vector_store = VectorStore(db_path=db_path, session_id=st.session_state.session_id)
                     
                     # Manual cleanup with retries for Windows file locking issues
                     max_retries = 3
@@ -558,7 +637,8 @@ with tab3:
                     
                     for attempt in range(max_retries):
                         try:
-                            shutil.rmtree(db_path, ignore_errors=False)
+                            vector_store.reset()
+                            session_stores.refresh(st.session_state.session_id)
                             st.session_state.processed_urls = []
                             st.success("Vector database reset successfully!")
                             time.sleep(1)
@@ -574,14 +654,151 @@ with tab3:
                 st.error(f"Error resetting database: {str(e)}")
         
         if st.button("Show API Usage"):
+            embedding_stats = embedding_registry.stats()
+            model_lines = "\n".join(
+                f"            - Embedding model load: {m['load_seconds']}s (+{format_bytes(m['rss_delta_bytes'])})\n"
+                f"            - Embedding cache: {m['cache']['memory_hits']} memory hits, "
+                f"{m['cache']['disk_hits']} disk hits, {m['cache']['misses']} misses "
+                f"({m['cache']['hit_rate']:.0%} hit rate)\n"
+                f"            - Embedding throughput: {m['engine']['chunks_per_second']:.0f} chunks/s "
+                f"(batch {m['engine']['batch_size']}, {m['engine']['workers']} workers)"
+                for m in embedding_stats["models"] if "cache" in m
+            ) or "            - Embedding model: still loading"
+            answer_stats = answer_cache.stats()
+            model_lines += (
+                f"\n            - Answer cache: {answer_stats['hits']} hits, {answer_stats['misses']} misses "
+                f"({answer_stats['hit_rate']:.0%} hit rate, {answer_stats['entries']} entries)"
+            )
+            prewarm_stats = prewarmer.stats()
+            if prewarm_stats["finished"]:
+                model_lines += (
+                    f"\n            - Background pre-warm: {len(prewarm_stats['import_seconds'])} modules and the "
+                    f"embedding model in {prewarm_stats['seconds']}s"
+                )
+            handle_stats = store_handles.stats()
+            model_lines += (
+                f"\n            - Vector store handles: {handle_stats['open_handles']} open, "
+                f"{handle_stats['opens']} opens, {handle_stats['reuses']} reuses"
+            )
+            session_stats = session_stores.stats()
+            model_lines += (
+                f"\n            - Session indexes: {session_stats['live_sessions']} live, "
+                f"{format_bytes(session_stats['disk_bytes'])} on disk, "
+                f"{format_bytes(session_stats['memory_bytes'])} in memory, "
+                f"{session_stats['evictions']} evicted, {session_stats['orphans_removed']} orphans removed"
+            )
+            job_stats = get_job_queue().stats()
+            if job_stats:
+                model_lines += "\n            - Ingestion jobs: " + ", ".join(
+                    f"{count} {status}" for status, count in sorted(job_stats.items())
+                )
+            session_store = get_session_store()
+            backend_stats = session_store.backend_stats() if session_store is not None else None
+            if backend_stats:
+                model_lines += (
+                    f"\n            - Vector index: {backend_stats['backend']} backend, "
+                    f"{backend_stats['chunks']} chunks"
+                )
+            http_cache = get_fetcher().cache
+            if http_cache is not None:
+                cache_stats = http_cache.stats()
+                model_lines += (
+                    f"\n            - Page cache: {cache_stats['entries']} pages ({format_bytes(cache_stats['bytes'])}), "
+                    f"{cache_stats['fresh_hits']} fresh hits, {cache_stats['revalidated']} revalidated (304), "
+                    f"{cache_stats['downloads']} downloads"
+                )
             st.info(f"""
             Current configuration:
-            - Model: GPT-3.5 Turbo
+            - Model: {Config.OPENAI_MODEL}
             - Embeddings: HuggingFace MiniLM
             - Chunk Size: {chunk_size}
             - Max Results: {max_results}
             - Session ID: {st.session_state.session_id}
+{model_lines}
+            - Server memory (RSS): {format_bytes(embedding_stats['resident_memory_bytes'])}
             """)
+            
+            # Where this session's time and tokens went
+            diagnostics = metrics.session_stats(st.session_state.session_id)
+            st.markdown("**Session diagnostics**")
+            if diagnostics["stages"]:
+                import pandas as pd
+                st.dataframe(pd.DataFrame([
+                    {
+                        "stage": stage,
+                        "count": stats["count"],
+                        "mean (ms)": round(stats["mean"] * 1000, 1),
+                        "p50 (ms)": round(stats["p50"] * 1000, 1),
+                        "p95 (ms)": round(stats["p95"] * 1000, 1),
+                        "max (ms)": round(stats["max"] * 1000, 1),
+                        "total (s)": round(stats["total"], 2)
+                    }
+                    for stage, stats in sorted(diagnostics["stages"].items(), key=lambda item: -item[1]["total"])
+                ]), use_container_width=True, hide_index=True)
+            else:
+                st.caption("No timings recorded for this session yet.")
+            llm_usage = diagnostics["llm"]
+            st.caption(
+                f"LLM: {llm_usage['requests']} requests, {llm_usage['prompt_tokens']} prompt + "
+                f"{llm_usage['completion_tokens']} completion tokens, ~${llm_usage['cost_usd']:.4f}"
+            )
+
+with tab4:
+    st.subheader("Batch Questions")
+    st.caption("Upload a CSV file with a 'question' column, or a text file with one question per line.")
+    questions_file = st.file_uploader("Questions file", type=["csv", "txt"], key="batch_questions_file")
+    batch_ran = False
+    if st.button("Answer All Questions", disabled=questions_file is None):
+        vectorstore = get_session_store()
+        questions = read_questions(questions_file.getvalue(), questions_file.name)
+        if not st.session_state.api_key_configured or not st.session_state.client:
+            st.warning("⚠️ Please configure your API key first in the sidebar.")
+        elif vectorstore is None:
+            st.warning("Please process some content first before asking questions.")
+        elif not questions:
+            st.warning("No questions found in the file.")
+        else:
+            # All questions are embedded and searched in one pass; the LLM calls run
+            # concurrently within the API key's rate limits and fill the table as they finish
+            answerer = BatchAnswerer(
+                vectorstore, OpenAIIntegration(client=st.session_state.client),
+                k=max_results, temperature=temperature, use_cache=use_answer_cache,
+                limiter_key=hashlib.sha256(st.session_state.openai_api_key.encode("utf-8")).hexdigest()
+            )
+            import pandas as pd
+            rows = [None] * len(questions)
+            progress_bar = st.progress(0.0, text=f"Answering {len(questions)} questions...")
+            table = st.empty()
+            answered = 0
+            last_draw = 0.0
+            for result in answerer.run(questions):
+                rows[result["index"]] = {
+                    "question": result["question"],
+                    "answer": result["answer"] if result["answer"] is not None else result["error"],
+                    "sources": "; ".join(dict.fromkeys(result["sources"])),
+                    "cached": result["cached"]
+                }
+                answered += 1
+                progress_bar.progress(answered / len(questions), text=f"Answered {answered} of {len(questions)}")
+                # Redraw at most a few times per second
+                if time.time() - last_draw > 0.5 or answered == len(questions):
+                    table.dataframe(pd.DataFrame([row for row in rows if row is not None]), use_container_width=True)
+                    last_draw = time.time()
+            progress_bar.empty()
+            st.session_state.batch_results = rows
+            batch_ran = True
+    
+    if st.session_state.get("batch_results"):
+        import pandas as pd
+        results_df = pd.DataFrame(st.session_state.batch_results)
+        if not batch_ran:
+            st.dataframe(results_df, use_container_width=True)
+        st.download_button(
+            label="Download Answers as CSV",
+            data=results_df.to_csv(index=False),
+            file_name="batch_answers.csv",
+            mime="text/csv"
+        )
 
 # Footer watermark - designed by PRAVIN
 st.markdown("---")
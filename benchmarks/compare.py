@@ -0,0 +1,61 @@
+# Compare two benchmark result files (baseline first):
+#
+#   python benchmarks/compare.py baseline.json candidate.json --threshold 10
+#
+# Exits with status 1 if any metric regressed by more than the threshold (percent).
+import argparse
+import json
+import sys
+
+# Metrics where a larger value is better; everything else (seconds, bytes) is lower-is-better
+HIGHER_IS_BETTER = ("per_second",)
+# Counters and settings that describe the run rather than measure it
+IGNORED_PREFIXES = ("meta.", "llm.", "pages_served.")
+IGNORED_SUFFIXES = (".count", "articles", "chunks", "unchanged", "questions", "concurrency")
+
+def flatten(results, prefix=""):
+    metrics = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            metrics.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[name] = float(value)
+    return metrics
+
+def compare(baseline, candidate, threshold):
+    # [(metric, baseline, candidate, change in percent, regressed), ...]
+    before, after = flatten(baseline), flatten(candidate)
+    rows = []
+    for name in sorted(set(before) & set(after)):
+        if name.startswith(IGNORED_PREFIXES) or name.endswith(IGNORED_SUFFIXES):
+            continue
+        old, new = before[name], after[name]
+        change = (new - old) / old * 100 if old else 0.0
+        worse = -change if any(marker in name for marker in HIGHER_IS_BETTER) else change
+        rows.append((name, old, new, change, worse > threshold))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    args = parser.parse_args(argv)
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+    
+    print(f"baseline:  {baseline.get('meta', {}).get('commit')}  candidate: {candidate.get('meta', {}).get('commit')}")
+    rows = compare(baseline, candidate, args.threshold)
+    width = max((len(row[0]) for row in rows), default=10)
+    for name, old, new, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<{width}}  {old:>14.4f}  {new:>14.4f}  {change:>+8.1f}%{flag}")
+    regressions = sum(1 for row in rows if row[4])
+    print(f"{regressions} regression(s) over {args.threshold:.0f}%")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+import html
+import random
+
+# Vocabulary per desk; articles mix one main topic with a little of the others
+TOPICS = {
+    "markets": "stocks bonds inflation earnings investors shares index rally yields central bank interest rates quarter forecast revenue dividend",
+    "technology": "software startup chips processors cloud artificial intelligence model data privacy smartphone network security developers platform",
+    "climate": "emissions carbon renewable solar wind drought temperatures glacier policy electricity grid battery storage heatwave rainfall",
+    "health": "vaccine hospital patients clinical trial virus doctors treatment insurance pharmacy research disease outbreak nutrition",
+    "politics": "election parliament minister campaign voters coalition legislation senate budget reform court opposition treaty summit",
+    "sports": "championship league coach season goal tournament players transfer stadium final injury record medal victory"
+}
+FILLER = "the a of in to and said on for with that as by at from this has was were will over after more than its their new".split()
+CITIES = ["London", "Mumbai", "Singapore", "Toronto", "Nairobi", "Berlin", "Sydney", "Chicago", "Tokyo", "Madrid"]
+
+def _sentence(rng, words):
+    length = rng.randint(12, 28)
+    tokens = [rng.choice(words) if rng.random() < 0.45 else rng.choice(FILLER) for _ in range(length)]
+    if rng.random() < 0.3:
+        tokens.insert(rng.randrange(len(tokens)), rng.choice(CITIES))
+    if rng.random() < 0.25:
+        tokens.insert(rng.randrange(len(tokens)), f"{rng.randint(2, 98)} percent")
+    return " ".join(tokens).capitalize() + "."
+
+def make_article(index, paragraphs=12, seed=0):
+    # (title, description, html) of one deterministic news-like page
+    rng = random.Random(f"{seed}:{index}")
+    topic = list(TOPICS)[index % len(TOPICS)]
+    words = TOPICS[topic].split() * 4 + " ".join(TOPICS.values()).split()
+    title = f"{rng.choice(CITIES)} {topic} report {index}: {' '.join(rng.sample(TOPICS[topic].split(), 4))}"
+    description = _sentence(rng, words)
+    body = "\n".join(
+        f"<p>{html.escape(' '.join(_sentence(rng, words) for _ in range(rng.randint(3, 7))))}</p>"
+        for _ in range(paragraphs)
+    )
+    page = f"""<!DOCTYPE html>
+<html><head>
+<title>{html.escape(title)}</title>
+<meta property="og:title" content="{html.escape(title)}">
+<meta name="description" content="{html.escape(description)}">
+<style>body {{ font-family: serif; }}</style>
+<script>window.analytics = {{}};</script>
+</head><body>
+<nav><a href="/">Home</a> | <a href="/{topic}">{topic.title()}</a></nav>
+<article><h1>{html.escape(title)}</h1>
+{body}
+</article>
+<footer>Copyright Benchmark News</footer>
+</body></html>"""
+    return title, description, page
+
+def make_corpus(articles=50, paragraphs=12, seed=0):
+    # {"/news/<n>.html": html}
+    return {f"/news/{index}.html": make_article(index, paragraphs, seed)[2] for index in range(articles)}
+
+def make_questions(count=200, seed=0):
+    rng = random.Random(f"questions:{seed}")
+    templates = [
+        "What happened with {a} and {b} in {city}?",
+        "How did {a} affect {b}?",
+        "Summarize the latest news about {a}.",
+        "What did officials say about {a} {b}?",
+        "Which reports mention {a} and {b}?"
+    ]
+    questions = []
+    for _ in range(count):
+        words = TOPICS[rng.choice(list(TOPICS))].split()
+        a, b = rng.sample(words, 2)
+        questions.append(rng.choice(templates).format(a=a, b=b, city=rng.choice(CITIES)))
+    return questions
@@ -0,0 +1,106 @@
+# Import-time profile of the app's startup path, from python -X importtime.
+#
+#   python benchmarks/import_profile.py                      # SaraBotAI.py's top-level imports
+#   python benchmarks/import_profile.py --module api --top 30
+#   python benchmarks/import_profile.py --budget 1.0         # exit 1 if the imports take longer
+#
+# streamlit is imported first and left out of the numbers: the server has loaded
+# it before the script runs. Each run is a fresh interpreter, so nothing is warm
+# except the OS file cache.
+import argparse
+import ast
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import Counter
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+PACKAGE_DIR = os.path.join(REPO_DIR, "sarabotai")
+APP_SCRIPT = os.path.join(REPO_DIR, "SaraBotAI.py")
+
+LINE_PATTERN = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+MARKER = "-- profiled imports --"
+
+def startup_imports(script=APP_SCRIPT):
+    # The module-level import statements of a script, in order: what it pays for
+    # before drawing anything. Imports inside functions and blocks are deferred.
+    with open(script, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), script)
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+def profile(statements, preamble=("import streamlit",)):
+    # {"seconds": wall time, "modules": [(name, self_us, cumulative_us, depth), ...]}
+    code = "\n".join([
+        *preamble,
+        "import sys, time",
+        f"sys.stderr.write({MARKER!r} + '\\n')",
+        "_start = time.perf_counter()",
+        *statements,
+        "sys.stderr.write('wall %.6f\\n' % (time.perf_counter() - _start))"
+    ])
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PACKAGE_DIR, capture_output=True, text=True
+    )
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1] if process.stderr.strip() else "import failed")
+    
+    lines = process.stderr.splitlines()
+    lines = lines[lines.index(MARKER) + 1:]
+    modules = []
+    seconds = None
+    for line in lines:
+        if line.startswith("wall "):
+            seconds = float(line.split()[1])
+            continue
+        match = LINE_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return {"seconds": seconds, "modules": modules}
+
+def summarize(result, top=20):
+    modules = result["modules"]
+    # Top-level imports (what the statements asked for, with everything they pulled in)
+    direct = sorted((m for m in modules if m[3] == 0), key=lambda m: -m[2])
+    # Self time per distribution (first dotted component), wherever it was imported from
+    packages = Counter()
+    for name, self_us, _, _ in modules:
+        packages[name.split(".")[0]] += self_us
+    return {
+        "seconds": result["seconds"],
+        "modules_imported": len(modules),
+        "direct": [{"module": name, "cumulative_seconds": cumulative / 1e6} for name, _, cumulative, _ in direct[:top]],
+        "packages": [{"package": name, "self_seconds": total / 1e6} for name, total in packages.most_common(top)]
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import-time profile of the app's startup path")
+    parser.add_argument("--module", action="append", help="profile 'import MODULE' instead of the app's top-level imports (repeatable)")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--budget", type=float, help="exit with status 1 if the imports take longer (seconds)")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args(argv)
+    
+    statements = [f"import {name}" for name in args.module] if args.module else startup_imports()
+    summary = summarize(profile(statements), args.top)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(f"{summary['seconds']:.3f}s for {summary['modules_imported']} modules\n")
+        print("Slowest top-level imports (cumulative):")
+        for row in summary["direct"]:
+            print(f"  {row['cumulative_seconds']:8.3f}s  {row['module']}")
+        print("\nSlowest packages (self time):")
+        for row in summary["packages"]:
+            print(f"  {row['self_seconds']:8.3f}s  {row['package']}")
+    if args.budget is not None and summary["seconds"] > args.budget:
+        print(f"\nOver budget: {summary['seconds']:.3f}s > {args.budget:.3f}s", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+# End-to-end benchmark: ingest a local fixture corpus and run queries against a
+# fake OpenAI endpoint, reporting per-stage timings, latency percentiles and peak
+# RSS as JSON. Nothing leaves the machine.
+#
+#   python benchmarks/run.py --output benchmarks/results/$(git rev-parse --short HEAD).json
+#   python benchmarks/compare.py old.json new.json
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+from fixtures import make_corpus, make_questions
+from import_profile import profile, startup_imports
+from servers import CorpusServer, FakeChatServer
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    
+    def at(fraction):
+        # Nearest-rank percentile
+        return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+    
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": at(0.50),
+        "p95": at(0.95),
+        "p99": at(0.99),
+        "max": ordered[-1]
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def configure_environment(args, workdir, chat_url):
+    # Must run before the sarabotai modules are imported: Config reads the environment once
+    os.environ["SARABOT_CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ["SESSION_STORE_ROOT"] = workdir
+    os.environ["EMBEDDING_BACKEND"] = args.embedder
+    os.environ["VECTOR_BACKEND"] = args.vector_backend
+    os.environ["OPENAI_API_KEY"] = "benchmark"
+    os.environ["OPENAI_BASE_URL"] = chat_url + "/v1"
+    os.environ["BATCH_REQUESTS_PER_MINUTE"] = "1000000"
+    os.environ["BATCH_TOKENS_PER_MINUTE"] = "1000000000"
+    sys.path.insert(0, os.path.join(REPO_DIR, "sarabotai"))
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="sarabot-e2e-")
+    pages = make_corpus(args.articles, args.paragraphs, args.seed)
+    questions = make_questions(args.queries, args.seed)
+    with CorpusServer(pages, latency=args.page_latency) as corpus, \
+            FakeChatServer(args.llm_latency, args.llm_tokens_per_second, args.answer_tokens) as chat:
+        configure_environment(args, workdir, chat.url)
+        from config import Config
+        from modules.batch_qa import BatchAnswerer
+        from modules.context_packer import ContextPacker
+        from modules.embeddings import embedding_registry
+        from modules.gemini_integration import OpenAIIntegration
+        from modules.ingestion import ingest_urls
+        from modules.session_stores import session_stores
+        from modules.vector_store import VectorStore
+        from utils.job_queue import Job
+        from utils.process_stats import peak_memory_bytes, resident_memory_bytes
+        
+        class StageTimer(Job):
+            # Job stand-in that turns the ingestion stage updates into wall time per stage
+            def __init__(self):
+                super().__init__("benchmark")
+                self.timings = {}
+                self._mark = time.perf_counter()
+            
+            def update(self, stage=None, progress=None, message=None):
+                if stage is not None:
+                    self.lap()
+                super().update(stage, progress, message)
+            
+            def lap(self):
+                now = time.perf_counter()
+                if self.stage is not None:
+                    self.timings[self.stage] = self.timings.get(self.stage, 0.0) + now - self._mark
+                self._mark = now
+        
+        results = {
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "args": vars(args)
+            }
+        }
+        rss_start = resident_memory_bytes()
+        
+        # Cold import of everything the app loads before its first paint (fresh interpreter)
+        try:
+            results["startup"] = {"app_import_seconds": profile(startup_imports())["seconds"]}
+        except RuntimeError as e:
+            results["startup"] = {"error": str(e)}
+        
+        start = time.perf_counter()
+        embedding_registry.get()
+        results["model_load_seconds"] = time.perf_counter() - start
+        
+        # Ingest: the same stages as the app's Process button
+        vector_store = VectorStore(db_path=session_stores.path_for("benchmark"), session_id="benchmark")
+        urls = corpus.urls()
+        job = StageTimer()
+        start = time.perf_counter()
+        outcome = ingest_urls(job, vector_store, urls, args.chunk_size, args.chunk_overlap)
+        job.lap()
+        ingest_seconds = time.perf_counter() - start
+        results["ingest"] = {
+            "articles": len(urls),
+            "chunks": outcome["chunks"],
+            "seconds": ingest_seconds,
+            "stages": job.timings,
+            "chunks_per_second": outcome["chunks"] / ingest_seconds if ingest_seconds else 0.0,
+            "peak_rss_bytes": peak_memory_bytes()
+        }
+        
+        # Re-ingest of unchanged pages (revalidation, hash checks)
+        job = StageTimer()
+        start = time.perf_counter()
+        outcome = ingest_urls(job, vector_store, urls, args.chunk_size, args.chunk_overlap)
+        job.lap()
+        results["reingest"] = {"seconds": time.perf_counter() - start, "unchanged": outcome["unchanged"], "stages": job.timings}
+        
+        # Queries, one at a time: retrieval alone and the full answer path
+        packer = ContextPacker()
+        llm = OpenAIIntegration()
+        retrieval, answer = [], []
+        
+        def ask(question):
+            start = time.perf_counter()
+            vector = vector_store.embeddings.embed_query(question)
+            documents = [doc for doc, _ in vector_store.hybrid_search(question, k=Config.MAX_RESULTS, vector=vector)]
+            packed = packer.pack(question, documents)
+            retrieved = time.perf_counter()
+            if not args.skip_llm and packed["documents"]:
+                llm.complete(packed["prompt"])
+            return retrieved - start, time.perf_counter() - start
+        
+        for question in questions:
+            retrieval_seconds, total_seconds = ask(question)
+            retrieval.append(retrieval_seconds)
+            answer.append(total_seconds)
+        results["query"] = {"retrieval_seconds": percentiles(retrieval), "end_to_end_seconds": percentiles(answer)}
+        
+        if args.concurrency > 1:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+                list(executor.map(ask, questions))
+            elapsed = time.perf_counter() - start
+            results["query"]["concurrent"] = {"concurrency": args.concurrency, "queries_per_second": len(questions) / elapsed}
+        
+        if not args.skip_llm:
+            # Batch mode: one batched encode and multi-query search, concurrent LLM calls
+            answerer = BatchAnswerer(vector_store, llm, use_cache=False)
+            start = time.perf_counter()
+            answered = sum(1 for _ in answerer.run(questions))
+            elapsed = time.perf_counter() - start
+            results["batch"] = {"questions": answered, "seconds": elapsed, "questions_per_second": answered / elapsed}
+        
+        results["llm"] = {"requests": chat.requests, "prompt_tokens": chat.prompt_tokens, "completion_tokens": chat.completion_tokens}
+        results["pages_served"] = {"requests": corpus.requests, "not_modified": corpus.not_modified}
+        results["rss_start_bytes"] = rss_start
+        results["peak_rss_bytes"] = peak_memory_bytes()
+        vector_store.close()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end ingest and query benchmark against local stand-in services")
+    parser.add_argument("--articles", type=int, default=50)
+    parser.add_argument("--paragraphs", type=int, default=12, help="paragraphs per article")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=100)
+    parser.add_argument("--embedder", default="hashing", help="EMBEDDING_BACKEND: hashing (deterministic), torch, onnx, onnx-int8")
+    parser.add_argument("--vector-backend", default="auto", help="VECTOR_BACKEND: auto, numpy or chroma")
+    parser.add_argument("--page-latency", type=float, default=0.0, help="seconds added to every page response")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="fake LLM time to first token, seconds")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=100.0)
+    parser.add_argument("--answer-tokens", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel clients for the throughput run (1 = skip)")
+    parser.add_argument("--skip-llm", action="store_true", help="measure retrieval only")
+    parser.add_argument("--output", help="write the JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+    
+    results = run(args)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
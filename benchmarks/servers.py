@@ -0,0 +1,156 @@
+import hashlib
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class _Server:
+    # A ThreadingHTTPServer on a free localhost port, run in a daemon thread
+    def __init__(self, handler):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.owner = self
+        self.thread = None
+    
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name=type(self).__name__, daemon=True)
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
+
+class _CorpusHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+    
+    def do_GET(self):
+        server = self.server.owner
+        page = server.pages.get(self.path.split("?")[0])
+        if page is None:
+            self.send_error(404)
+            return
+        if server.latency:
+            time.sleep(server.latency)
+        body = page.encode("utf-8")
+        etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+        server.requests += 1
+        if self.headers.get("If-None-Match") == etag:
+            server.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+class CorpusServer(_Server):
+    # Serves the fixture pages with ETags (answers 304 to revalidation) and an
+    # optional per-request latency
+    def __init__(self, pages, latency=0.0):
+        super().__init__(_CorpusHandler)
+        self.pages = pages
+        self.latency = latency
+        self.requests = 0
+        self.not_modified = 0
+    
+    def urls(self):
+        return [self.url + path for path in self.pages]
+
+class _ChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_POST(self):
+        server = self.server.owner
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        prompt = " ".join(message.get("content", "") for message in request.get("messages", []))
+        prompt_tokens = max(1, len(prompt) // 4)
+        completion_tokens = min(server.answer_tokens, request.get("max_tokens") or server.answer_tokens)
+        words = ["benchmark"] * completion_tokens
+        with server.lock:
+            server.requests += 1
+            server.prompt_tokens += prompt_tokens
+            server.completion_tokens += completion_tokens
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        response_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = request.get("model", "fake")
+        time.sleep(server.latency)
+        if request.get("stream"):
+            self._stream(server, response_id, model, words, usage)
+            return
+        
+        if server.tokens_per_second:
+            time.sleep(completion_tokens / server.tokens_per_second)
+        body = json.dumps({
+            "id": response_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)}, "finish_reason": "stop"}],
+            "usage": usage
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _stream(self, server, response_id, model, words, usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        
+        def event(delta, finish_reason=None, **extra):
+            chunk = {"id": response_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}], **extra}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        
+        event({"role": "assistant", "content": ""})
+        for word in words:
+            if server.tokens_per_second:
+                time.sleep(1 / server.tokens_per_second)
+            event({"content": word + " "})
+        event({}, "stop", usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+class FakeChatServer(_Server):
+    # OpenAI-compatible /v1/chat/completions (plain and streamed) with a fixed
+    # time to first token and a token rate; point OPENAI_BASE_URL at url + "/v1"
+    def __init__(self, latency=0.2, tokens_per_second=100.0, answer_tokens=60):
+        super().__init__(_ChatHandler)
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.answer_tokens = answer_tokens
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
@@ -0,0 +1,258 @@
+# api.py
+# Headless HTTP service over the same components as the Streamlit app: ingestion
+# jobs, hybrid retrieval, token-budgeted prompts and map-reduce reports, without
+# rerunning a UI script per request. The embedding model, open index handles,
+# the job queue and the OpenAI client are process-wide and shared by all requests.
+#
+#   cd sarabotai && uvicorn api:app --host 0.0.0.0 --port 8000
+#   (or: python sarabotai/api.py)
+import asyncio
+import contextvars
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+from config import Config
+from modules.answer_cache import answer_cache, answer_scope
+from modules.context_packer import ContextPacker
+from modules.embeddings import embedding_registry
+from modules.gemini_integration import OpenAIIntegration
+from modules.ingestion import ingest_urls, ingest_upload
+from modules.prewarm import prewarmer
+from modules.session_stores import session_stores
+from modules.summarizer import MapReduceSummarizer
+from modules.vector_store import VectorStore, store_handles
+from utils.job_queue import get_job_queue
+from utils.metrics import configure_logging, current_session, metrics
+
+# Session IDs become directory names
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+app = FastAPI(title="SaraBot AI API")
+
+# Blocking work (embedding, index access, LLM calls) runs here, off the event loop
+_executor = ThreadPoolExecutor(max_workers=Config.API_THREADS, thread_name_prefix="api")
+_llm = None
+_llm_lock = threading.Lock()
+
+class IngestRequest(BaseModel):
+    urls: list[str]
+    chunk_size: int = Field(Config.DEFAULT_CHUNK_SIZE, ge=100, le=8000)
+    chunk_overlap: int = Field(Config.DEFAULT_CHUNK_OVERLAP, ge=0, le=2000)
+    use_selenium: bool = False
+
+class QueryRequest(BaseModel):
+    question: str = Field(..., min_length=1)
+    k: int = Field(Config.MAX_RESULTS, ge=1, le=50)
+    answer: bool = True  # False returns the retrieved excerpts only
+    use_cache: bool = True
+
+def _run(fn, *args, **kwargs):
+    # Runs in a copy of the request's context so spans keep the session
+    context = contextvars.copy_context()
+    return asyncio.get_running_loop().run_in_executor(_executor, lambda: context.run(fn, *args, **kwargs))
+
+def get_llm():
+    # One client (and HTTP connection pool) per process
+    global _llm
+    with _llm_lock:
+        if _llm is None:
+            try:
+                _llm = OpenAIIntegration()
+            except ValueError as e:
+                raise HTTPException(status_code=503, detail=str(e))
+        return _llm
+
+def _check_session(session_id):
+    if not SESSION_ID_PATTERN.match(session_id):
+        raise HTTPException(status_code=400, detail="Invalid session ID")
+    session_stores.touch(session_id)
+    current_session.set(session_id)
+
+def _store(session_id):
+    db_path = Config.CHROMA_PERSIST_DIR if Config.SHARED_COLLECTION else session_stores.path_for(session_id)
+    return VectorStore(db_path=db_path, session_id=session_id)
+
+def _refresh(session_id):
+    backend_stats = _store(session_id).backend_stats()
+    session_stores.refresh(session_id, memory_bytes=(backend_stats or {}).get("matrix_bytes", 0))
+
+def _ingest(job, session_id, fn, *args, **kwargs):
+    result = fn(job, _store(session_id), *args, **kwargs)
+    _refresh(session_id)
+    return result
+
+def _searchable_store(session_id):
+    vector_store = _store(session_id)
+    if vector_store.get_store() is None or (vector_store.shared and not vector_store.list_documents()):
+        return None
+    return vector_store
+
+def _query(session_id, request):
+    vector_store = _searchable_store(session_id)
+    if vector_store is None:
+        raise HTTPException(status_code=404, detail="No content has been processed in this session")
+    query_vector = vector_store.embeddings.embed_query(request.question)
+    fingerprint = vector_store.fingerprint()
+    scope = answer_scope(vector_store)
+    if request.answer and request.use_cache:
+        cached = answer_cache.lookup(fingerprint, query_vector, scope)
+        if cached:
+            return {"answer": cached["answer"], "sources": cached["sources"], "cached": True}
+    
+    documents = [doc for doc, _ in vector_store.hybrid_search(request.question, k=request.k, vector=query_vector)]
+    if not documents:
+        return {"answer": None, "sources": [], "excerpts": [], "cached": False}
+    packed = ContextPacker().pack(request.question, documents)
+    sources = [doc.metadata.get("source", "Unknown source") for doc in packed["documents"]]
+    if not request.answer:
+        return {
+            "excerpts": [{"text": doc.page_content, "source": doc.metadata.get("source")} for doc in packed["documents"]],
+            "sources": sources,
+            "prompt_tokens": packed["prompt_tokens"]
+        }
+    
+    try:
+        answer = get_llm().complete(packed["prompt"])
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Error generating response: {str(e)}")
+    if request.use_cache:
+        answer_cache.store(fingerprint, request.question, query_vector, answer, sources, context=packed["context"], scope=scope)
+    return {"answer": answer, "sources": sources, "cached": False, "prompt_tokens": packed["prompt_tokens"]}
+
+def _report(session_id):
+    vector_store = _searchable_store(session_id)
+    documents = vector_store.get_documents() if vector_store is not None else {}
+    if not documents:
+        raise HTTPException(status_code=404, detail="No content available to generate report")
+    return {"report": MapReduceSummarizer(get_llm()).summarize(documents)}
+
+def _job_or_404(session_id, job_id):
+    job = get_job_queue().get(job_id)
+    if job is None or job.owner != session_id:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
+
+@app.on_event("startup")
+def startup():
+    configure_logging()
+    prewarmer.start()
+    session_stores.start()
+
+@app.get("/health")
+def health():
+    return {
+        "status": "ok",
+        "embedding_model_loaded": embedding_registry.is_loaded(),
+        "prewarm": prewarmer.stats(),
+        "store_handles": store_handles.stats(),
+        "sessions": session_stores.stats(),
+        "jobs": get_job_queue().stats(),
+        "answer_cache": answer_cache.stats()
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.post("/sessions", status_code=201)
+def create_session():
+    session_id = str(uuid.uuid4())[:8]
+    session_stores.touch(session_id)
+    return {"session_id": session_id}
+
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    _check_session(session_id)
+    vector_store = _store(session_id)
+    documents = await _run(vector_store.list_documents)
+    return {
+        "session_id": session_id,
+        "documents": [{"doc_id": doc_id, "source": source} for doc_id, source in documents.items()],
+        "index": await _run(vector_store.backend_stats),
+        "jobs": [job.to_dict() for job in get_job_queue().jobs(owner=session_id)],
+        "diagnostics": metrics.session_stats(session_id)
+    }
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    _check_session(session_id)
+    for job in get_job_queue().jobs(owner=session_id):
+        job.cancel()
+    await _run(session_stores.evict_session, session_id)
+    return {"deleted": session_id}
+
+@app.delete("/sessions/{session_id}/documents")
+async def delete_document(session_id: str, source: str):
+    _check_session(session_id)
+    removed = await _run(_store(session_id).delete_document, source)
+    await _run(_refresh, session_id)
+    return {"source": source, "chunks_removed": removed}
+
+@app.post("/sessions/{session_id}/ingest", status_code=202)
+def ingest(session_id: str, request: IngestRequest):
+    _check_session(session_id)
+    urls = [url for url in request.urls if url.startswith(("http://", "https://"))]
+    if not urls:
+        raise HTTPException(status_code=400, detail="No valid URLs to process")
+    job = get_job_queue().submit(
+        "ingest", _ingest, session_id, ingest_urls, urls,
+        chunk_size=request.chunk_size, chunk_overlap=request.chunk_overlap, use_selenium=request.use_selenium,
+        owner=session_id, description=f"{len(urls)} URL(s)"
+    )
+    return job.to_dict()
+
+@app.post("/sessions/{session_id}/upload", status_code=202)
+def upload(session_id: str, file: UploadFile = File(...)):
+    _check_session(session_id)
+    # The request's upload file is closed once the response is sent, so the job
+    # reads from its own temporary copy
+    stream = tempfile.TemporaryFile()
+    shutil.copyfileobj(file.file, stream, Config.UPLOAD_BLOCK_SIZE)
+    size = stream.tell()
+    stream.seek(0)
+    job = get_job_queue().submit(
+        "ingest", _ingest, session_id, ingest_upload, stream, file.filename, size=size,
+        owner=session_id, description=file.filename
+    )
+    return job.to_dict()
+
+@app.get("/sessions/{session_id}/jobs/{job_id}")
+def get_job(session_id: str, job_id: str):
+    _check_session(session_id)
+    job = _job_or_404(session_id, job_id)
+    result = job.to_dict()
+    result["result"] = job.result
+    return result
+
+@app.delete("/sessions/{session_id}/jobs/{job_id}")
+def cancel_job(session_id: str, job_id: str):
+    _check_session(session_id)
+    _job_or_404(session_id, job_id)
+    return {"cancelled": get_job_queue().cancel(job_id)}
+
+@app.post("/sessions/{session_id}/query")
+async def query(session_id: str, request: QueryRequest):
+    _check_session(session_id)
+    return await _run(_query, session_id, request)
+
+@app.post("/sessions/{session_id}/report")
+async def report(session_id: str):
+    _check_session(session_id)
+    return await _run(_report, session_id)
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host=Config.API_HOST, port=Config.API_PORT)
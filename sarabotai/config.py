@@ -7,15 +7,124 @@ class Config:
     # OpenAI API Configuration (can be set via session state or env)
     # Note: API key should be set via UI in the main application
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")  # Fallback to env if available
+    OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+    OPENAI_MAX_TOKENS = 2048  # also the headroom reserved for the answer
+    # USD per million (input, output) tokens, for cost estimates from response.usage
+    MODEL_PRICES = {
+        "gpt-3.5-turbo": (0.50, 1.50),
+        "gpt-4o-mini": (0.15, 0.60),
+        "gpt-4o": (2.50, 10.00)
+    }
+    
+    # Prompt token budgets (counted with tiktoken when installed)
+    CONTEXT_WINDOW_TOKENS = int(os.getenv("CONTEXT_WINDOW_TOKENS", "16385"))
+    PROMPT_QUESTION_TOKENS = 500
+    PROMPT_HISTORY_TOKENS = int(os.getenv("PROMPT_HISTORY_TOKENS", "1500"))
+    PROMPT_EXCERPT_TOKENS = int(os.getenv("PROMPT_EXCERPT_TOKENS", "6000"))
+    PROMPT_MIN_EXCERPT_TOKENS = 100  # smallest partial excerpt worth including
+    
+    # Conversation memory: older turns are folded into a running summary
+    MEMORY_MAX_TURNS = int(os.getenv("MEMORY_MAX_TURNS", "6"))
+    MEMORY_KEEP_TURNS = int(os.getenv("MEMORY_KEEP_TURNS", "3"))  # newest turns kept verbatim
     
     # ChromaDB Configuration
     CHROMA_PERSIST_DIR = "./chroma_db"
     CHROMA_COLLECTION_NAME = "news_research"
+    # All sessions share CHROMA_PERSIST_DIR/CHROMA_COLLECTION_NAME; each article version is stored once
+    SHARED_COLLECTION = os.getenv("SHARED_COLLECTION", "false").lower() == "true"
+    STORE_HANDLE_CACHE_SIZE = int(os.getenv("STORE_HANDLE_CACHE_SIZE", "64"))  # open handles per process
+    
+    # Per-session index directories (<SESSION_STORE_ROOT>/chroma_db_<session_id>)
+    SESSION_STORE_ROOT = os.getenv("SESSION_STORE_ROOT", ".")
+    SESSION_TTL = int(os.getenv("SESSION_TTL", str(6 * 3600)))  # seconds idle before eviction
+    SESSION_DISK_QUOTA_BYTES = int(os.getenv("SESSION_DISK_QUOTA_BYTES", str(2 * 1024 ** 3)))
+    SESSION_MEMORY_QUOTA_BYTES = int(os.getenv("SESSION_MEMORY_QUOTA_BYTES", str(512 * 1024 ** 2)))
+    SESSION_JANITOR_INTERVAL = 300  # seconds between background eviction passes
+    
+    # Vector index backend: numpy (in-process matrix), chroma, or auto (numpy
+    # until a corpus grows past NUMPY_BACKEND_MAX_CHUNKS, then Chroma)
+    VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "auto")
+    NUMPY_BACKEND_MAX_CHUNKS = int(os.getenv("NUMPY_BACKEND_MAX_CHUNKS", "20000"))
+    NUMPY_BACKEND_DTYPE = os.getenv("NUMPY_BACKEND_DTYPE", "float32")  # float32 | float16
+    NUMPY_BACKEND_MMAP = os.getenv("NUMPY_BACKEND_MMAP", "false").lower() == "true"
+    
+    # Retrieval (dense + BM25, fused with reciprocal-rank fusion)
+    MIN_RELEVANCE = float(os.getenv("MIN_RELEVANCE", "0.2"))  # cosine similarity floor for dense hits
+    HYBRID_CANDIDATES = 20  # ranked candidates taken from each side before fusion
+    RRF_K = 60
+    LEXICAL_PREFILTER_MIN_CHUNKS = int(os.getenv("LEXICAL_PREFILTER_MIN_CHUNKS", "50000"))
+    LEXICAL_PREFILTER_CANDIDATES = 1000  # dense search is limited to these BM25 hits on large corpora
+    MULTI_QUERY_BLOCK = 64  # queries scored per matrix product in batched searches
+    
+    # Batch question answering
+    BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "500"))
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))  # LLM calls in flight
+    BATCH_REQUESTS_PER_MINUTE = int(os.getenv("BATCH_REQUESTS_PER_MINUTE", "500"))  # API key quota
+    BATCH_TOKENS_PER_MINUTE = int(os.getenv("BATCH_TOKENS_PER_MINUTE", "200000"))
+    
+    # Embedding Model (loaded once per server process and shared by all sessions)
+    EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+    EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", "cpu")  # Forced to CPU to avoid meta tensor issue
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")  # torch | onnx | onnx-int8 | hashing
+    HASHING_EMBEDDING_DIM = 384  # vector size of the hashing backend (same as MiniLM)
+    EMBEDDING_MODEL_DIR = os.getenv("EMBEDDING_MODEL_DIR")  # local ONNX model directory (offline use)
+    ONNX_PARITY_MIN_COSINE = 0.99
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "0"))  # 0 = one per CPU core
+    EMBEDDING_MULTI_PROCESS = os.getenv("EMBEDDING_MULTI_PROCESS", "true").lower() == "true"
+    EMBEDDING_MULTI_PROCESS_MIN = int(os.getenv("EMBEDDING_MULTI_PROCESS_MIN", "2000"))  # texts per call
+    
+    # Local caches shared by all sessions of a server
+    CACHE_DIR = os.getenv("SARABOT_CACHE_DIR", "./.sarabot_cache")
+    EMBEDDING_CACHE_MEMORY_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MEMORY_ENTRIES", "50000"))
+    EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))  # oldest vectors are evicted above this
+    
+    # URL Fetching (one pooled HTTP session per server process)
+    FETCH_MAX_WORKERS = int(os.getenv("FETCH_MAX_WORKERS", "8"))
+    FETCH_PER_HOST_LIMIT = int(os.getenv("FETCH_PER_HOST_LIMIT", "4"))
+    FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "10"))
+    FETCH_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "true").lower() == "true"
+    HTTP_CACHE_TTL = int(os.getenv("HTTP_CACHE_TTL", "900"))  # seconds before revalidating
+    HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    
+    # Semantic answer cache (repeated / near-duplicate questions on the same corpus)
+    ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))  # cosine similarity
+    ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "3600"))
+    ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+    
+    # Map-reduce summary reports
+    SUMMARY_MAX_WORKERS = int(os.getenv("SUMMARY_MAX_WORKERS", "4"))  # concurrent LLM calls
+    SUMMARY_GROUP_CHARS = int(os.getenv("SUMMARY_GROUP_CHARS", "12000"))  # input per LLM call
+    SUMMARY_MAX_TOKENS = 700
+    LLM_MAX_RETRIES = 5  # retries of rate-limited / transient API errors
     
     # Text Processing
     DEFAULT_CHUNK_SIZE = 1000
     DEFAULT_CHUNK_OVERLAP = 200
+    INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))  # chunks per embed + upsert
+    UPLOAD_BLOCK_SIZE = 1024 * 1024  # bytes read per step when streaming uploads
+    ATOMIC_UPLOAD_MAX_BYTES = int(os.getenv("ATOMIC_UPLOAD_MAX_BYTES", str(32 * 1024 * 1024)))  # larger uploads stream in
+    
+    # Background jobs (ingestion runs outside the Streamlit script run)
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_RETENTION = 3600  # seconds finished jobs are kept for result collection
+    JOB_POLL_INTERVAL = 1.0  # seconds between progress refreshes in the UI
+    
+    # Startup: "prewarm" imports the heavy libraries and loads the embedding model in a
+    # background thread once the first page is up; "lazy" loads each on first use only
+    STARTUP_MODE = os.getenv("STARTUP_MODE", "prewarm").lower()
+    
+    # Observability: JSON span logs and Prometheus metrics (/metrics)
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()  # span logs are INFO
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # Streamlit app; 0 = no metrics server
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+    
+    # HTTP API (sarabotai/api.py)
+    API_HOST = os.getenv("API_HOST", "127.0.0.1")
+    API_PORT = int(os.getenv("API_PORT", "8000"))
+    API_THREADS = int(os.getenv("API_THREADS", "64"))  # blocking work (embedding, search, LLM calls) in flight
     
     # UI Settings
     MAX_URL_INPUTS = 3
-    MAX_RESULTS = 5
\ No newline at end of file
+    MAX_RESULTS = 5
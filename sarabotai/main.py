@@ -9,11 +9,11 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Now import other modules
-from modules import gemini_integration, data_processing, vector_store, web_scraper
-# Note: gemini_integration.py now contains OpenAIIntegration class
+# Only the session bookkeeping is needed to draw the page. The OpenAI client,
+# data processor, vector store and scraper are created by the features that use
+# them: building them here loaded the embedding model before the first paint
+# and raised on startup when no API key was set.
 from utils import session_manager
-import os
 
 # Apply dark theme with red/white scheme
 def apply_dark_theme():
@@ -53,64 +53,10 @@ def apply_dark_theme():
     </style>
     """, unsafe_allow_html=True)
 
-# Initialize components after theme
 apply_dark_theme()
-openai_client = gemini_integration.OpenAIIntegration()
-data_processor = data_processing.DataProcessor()
-vector_db = vector_store.VectorStore()
-scraper = web_scraper.WebScraper()
 session = session_manager.SessionManager()
 
-# Rest of your code remains the same...
-
-# Apply dark theme with red/white scheme
-def apply_dark_theme():
-    st.markdown(f"""
-    <style>
-        .stApp {{
-            background-color: #0E1117;
-            color: white;
-        }}
-        .stTextInput>div>div>input {{
-            color: white;
-            background-color: #262730;
-        }}
-        .stButton>button {{
-            background-color: #FF4B4B;
-            color: white;
-            border: none;
-        }}
-        .stButton>button:hover {{
-            background-color: #FF3030;
-        }}
-        .stSelectbox>div>div {{
-            background-color: #262730;
-            color: white;
-        }}
-        [data-testid="stSidebar"] {{
-            background-color: #1A1A1A !important;
-        }}
-        .stExpander {{
-            background-color: #262730;
-            border-color: #FF4B4B;
-        }}
-        .stTabs [aria-selected="true"] {{
-            background-color: #FF4B4B;
-            color: white !important;
-        }}
-    </style>
-    """, unsafe_allow_html=True)
-
-apply_dark_theme()
-
 # UI Layout - Matching your screenshot exactly
-st.set_page_config(
-    page_title="SaraBotAI: News Research Tool",
-    page_icon="📰",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
 # Sidebar Configuration - Reordered to match your screenshot
 with st.sidebar:
     st.title("Configuration")
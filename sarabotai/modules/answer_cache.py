@@ -0,0 +1,92 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from config import Config
+
+def answer_scope(vector_store, history=""):
+    # What an answer depends on besides the corpus and the question: the
+    # conversation history packed into its prompt and, in shared mode (where the
+    # fingerprint only names document versions), the session. None when neither applies.
+    session_id = vector_store.session_id if vector_store.shared else None
+    if not history and session_id is None:
+        return None
+    return hashlib.sha256(f"{session_id or ''}\n{history}".encode("utf-8")).hexdigest()
+
+class AnswerCache:
+    # Process-wide semantic answer cache. Entries are scoped to a corpus
+    # fingerprint (the exact set of indexed chunks) plus an optional answer_scope(),
+    # and matched on cosine similarity of the query embedding, with TTL expiry
+    # and LRU eviction.
+    def __init__(self, threshold=None, ttl=None, max_entries=None):
+        self.threshold = Config.ANSWER_CACHE_THRESHOLD if threshold is None else threshold
+        self.ttl = Config.ANSWER_CACHE_TTL if ttl is None else ttl
+        self.max_entries = max_entries or Config.ANSWER_CACHE_MAX_ENTRIES
+        self._entries = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def lookup(self, fingerprint, query_vector, scope=None):
+        # Returns the best stored entry (with its similarity) above the threshold, or None
+        if fingerprint is None:
+            return None
+        query_vector = self._normalize(query_vector)
+        now = time.time()
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if entry["expires_at"] <= now]
+            for key in expired:
+                del self._entries[key]
+            
+            candidates = [
+                (key, entry) for key, entry in self._entries.items()
+                if entry["fingerprint"] == fingerprint and entry["scope"] == scope
+            ]
+            if candidates:
+                vectors = np.vstack([entry["vector"] for _, entry in candidates])
+                similarities = vectors @ query_vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    key, entry = candidates[best]
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(entry, similarity=float(similarities[best]))
+            self.misses += 1
+            return None
+    
+    def store(self, fingerprint, query, query_vector, answer, sources, context=None, scope=None):
+        if fingerprint is None:
+            return
+        with self._lock:
+            self._entries[self._next_key] = {
+                "fingerprint": fingerprint,
+                "scope": scope,
+                "query": query,
+                "vector": self._normalize(query_vector),
+                "answer": answer,
+                "sources": list(sources),
+                "context": context,
+                "expires_at": time.time() + self.ttl
+            }
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+answer_cache = AnswerCache()
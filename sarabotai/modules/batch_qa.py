@@ -0,0 +1,106 @@
+import contextvars
+import csv
+import io
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import Config
+from modules.answer_cache import answer_cache, answer_scope
+from modules.context_packer import ContextPacker
+from utils.llm_retry import complete_with_retries
+from utils.rate_limiter import get_rate_limiter
+
+# Header names recognized as the question column of a CSV file
+QUESTION_COLUMNS = ("question", "questions", "query", "prompt")
+
+def read_questions(data, name=""):
+    # Questions from a CSV file (the "question" column, else the first column)
+    # or a text file (one per line). Blank entries are skipped, order is kept.
+    text = data.decode("utf-8-sig", errors="replace") if isinstance(data, bytes) else data
+    if name.lower().endswith(".csv"):
+        rows = list(csv.reader(io.StringIO(text)))
+        if not rows:
+            return []
+        header = [cell.strip().lower() for cell in rows[0]]
+        column = next((header.index(column_name) for column_name in QUESTION_COLUMNS if column_name in header), None)
+        if column is None:
+            column = 0  # no header row
+        else:
+            rows = rows[1:]
+        questions = [row[column] for row in rows if len(row) > column]
+    else:
+        questions = text.splitlines()
+    return [question.strip() for question in questions if question.strip()][:Config.BATCH_MAX_QUESTIONS]
+
+class BatchAnswerer:
+    # Answers many questions against one session's index. Retrieval is done for
+    # the whole batch at once (one batched encode, one multi-query search); the
+    # LLM calls then run concurrently, paced by the API key's rate limiter and
+    # retried with backoff, so throughput is bound by the quota.
+    def __init__(self, vector_store, llm, k=None, max_workers=None, temperature=0.7, limiter_key="default", use_cache=True):
+        self.vector_store = vector_store
+        self.llm = llm
+        self.temperature = temperature
+        self.k = k or Config.MAX_RESULTS
+        self.max_workers = max_workers or Config.BATCH_CONCURRENCY
+        # Answers are reused through the answer cache only (its TTL and use_cache apply)
+        self.use_cache = use_cache
+        self.limiter = get_rate_limiter(limiter_key, Config.BATCH_REQUESTS_PER_MINUTE, Config.BATCH_TOKENS_PER_MINUTE)
+        self.packer = ContextPacker()
+    
+    def _answer(self, packed):
+        # Every attempt, retries included, goes through the limiter. The token
+        # quota counts the prompt plus the requested completion size
+        tokens = packed["prompt_tokens"] + Config.OPENAI_MAX_TOKENS
+        return complete_with_retries(
+            self.llm, packed["prompt"], temperature=self.temperature, max_tokens=Config.OPENAI_MAX_TOKENS,
+            before_attempt=lambda: self.limiter.acquire(tokens)
+        )
+    
+    def run(self, questions):
+        # Yields {"index", "question", "answer", "sources", "cached", "error"} per
+        # question as answers complete (not in input order)
+        questions = list(questions)
+        if not questions:
+            return
+        vectors = self.vector_store.embeddings.embed_queries(questions)
+        hits = self.vector_store.hybrid_search_many(questions, self.k, vectors)
+        fingerprint = self.vector_store.fingerprint()
+        scope = answer_scope(self.vector_store)
+        
+        pending = []
+        for index, (question, vector, results) in enumerate(zip(questions, vectors, hits)):
+            result = {"index": index, "question": question, "answer": None, "sources": [], "cached": False, "error": None}
+            if not results:
+                result["error"] = "No relevant information found"
+                yield result
+                continue
+            cached = answer_cache.lookup(fingerprint, vector, scope) if self.use_cache else None
+            if cached:
+                result.update(answer=cached["answer"], sources=cached["sources"], cached=True)
+                yield result
+                continue
+            packed = self.packer.pack(question, [doc for doc, _ in results])
+            result["sources"] = [doc.metadata.get("source", "Unknown source") for doc in packed["documents"]]
+            pending.append((result, vector, packed))
+        
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="batch-qa")
+        try:
+            futures = {
+                executor.submit(contextvars.copy_context().run, self._answer, packed): (result, vector, packed)
+                for result, vector, packed in pending
+            }
+            for future in as_completed(futures):
+                result, vector, packed = futures[future]
+                try:
+                    result["answer"] = future.result()
+                except Exception as e:
+                    result["error"] = f"Error generating response: {str(e)}"
+                else:
+                    if self.use_cache:
+                        answer_cache.store(
+                            fingerprint, result["question"], vector, result["answer"], result["sources"],
+                            context=packed["context"], scope=scope
+                        )
+                yield result
+        finally:
+            # Queued calls are dropped if the consumer stops early
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,159 @@
+import functools
+import hashlib
+from config import Config
+from utils.metrics import span
+
+PROMPT_TEMPLATE = """Previous conversation context:
+{history}
+
+New question: {question}
+
+Relevant content excerpts:
+{context}
+
+Please provide a detailed answer citing sources where appropriate."""
+
+@functools.lru_cache(maxsize=8)
+def _encoding(model):
+    # tiktoken is optional; None means "use the character heuristic"
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+def count_tokens(text, model=None):
+    encoding = _encoding(model or Config.OPENAI_MODEL)
+    if encoding is None:
+        return (len(text) + 3) // 4  # ~4 characters per token for English text
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_tokens(text, budget, model=None):
+    # Longest prefix of text that fits in budget tokens
+    if budget <= 0:
+        return ""
+    encoding = _encoding(model or Config.OPENAI_MODEL)
+    if encoding is None:
+        return text[:budget * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= budget:
+        return text
+    return encoding.decode(tokens[:budget])
+
+def _overlap(previous, text, min_overlap=32):
+    # Length of the longest suffix of previous that is a prefix of text
+    # (neighbouring chunks from the splitter share chunk_overlap characters)
+    position = previous.find(text[:min_overlap])
+    while position != -1:
+        if text.startswith(previous[position:]):
+            return len(previous) - position
+        position = previous.find(text[:min_overlap], position + 1)
+    return 0
+
+class ContextPacker:
+    # Builds the chat prompt under fixed token budgets: instructions + question,
+    # conversation history, retrieved excerpts, and headroom for the answer.
+    # Whatever does not fit is trimmed in priority order: oldest history first,
+    # then the lowest-ranked excerpts; the question is cut only as a last resort.
+    def __init__(self, model=None, context_window=None, answer_tokens=None,
+                 question_tokens=None, history_tokens=None, excerpt_tokens=None):
+        self.model = model or Config.OPENAI_MODEL
+        self.context_window = context_window or Config.CONTEXT_WINDOW_TOKENS
+        self.answer_tokens = answer_tokens or Config.OPENAI_MAX_TOKENS
+        self.question_tokens = question_tokens or Config.PROMPT_QUESTION_TOKENS
+        self.history_tokens = history_tokens or Config.PROMPT_HISTORY_TOKENS
+        self.excerpt_tokens = excerpt_tokens or Config.PROMPT_EXCERPT_TOKENS
+    
+    def count(self, text):
+        return count_tokens(text, self.model)
+    
+    def _budgets(self):
+        # The fixed budgets are shrunk (excerpts first) if they exceed the model window
+        available = self.context_window - self.answer_tokens - self.count(PROMPT_TEMPLATE)
+        question = min(self.question_tokens, max(available, 0))
+        history = min(self.history_tokens, max(available - question, 0))
+        excerpts = min(self.excerpt_tokens, max(available - question - history, 0))
+        return question, history, excerpts
+    
+    def dedupe(self, documents):
+        # Drop exact duplicates and strip text already present in a neighbouring
+        # chunk of the same source; keeps retrieval order
+        seen = set()
+        kept = []
+        for doc in documents:
+            digest = hashlib.sha1(" ".join(doc.page_content.split()).encode("utf-8")).hexdigest()
+            if digest in seen:
+                continue
+            seen.add(digest)
+            text = doc.page_content
+            source = doc.metadata.get("source")
+            index = doc.metadata.get("chunk_index")
+            for other, other_text in kept:
+                if other.metadata.get("source") != source or index is None:
+                    continue
+                other_index = other.metadata.get("chunk_index")
+                if other_index == index - 1:
+                    text = text[_overlap(other_text, text):]
+                elif other_index == index + 1:
+                    text = text[:len(text) - _overlap(text, other_text)]
+            if text.strip():
+                kept.append((doc, text))
+        return kept
+    
+    def pack_excerpts(self, documents, budget):
+        used, parts, spent = [], [], 0
+        for doc, text in self.dedupe(documents):
+            header = f"Source: {doc.metadata.get('source', 'Unknown')}\nContent: "
+            cost = self.count(header + text) + 1
+            if spent + cost > budget:
+                # Partially include the next excerpt if a useful amount still fits
+                remaining = budget - spent - self.count(header) - 1
+                if remaining >= Config.PROMPT_MIN_EXCERPT_TOKENS:
+                    parts.append(header + truncate_tokens(text, remaining, self.model))
+                    used.append(doc)
+                break
+            parts.append(header + text)
+            used.append(doc)
+            spent += cost
+        return "\n\n".join(parts), used
+    
+    def pack_history(self, turns, budget):
+        # turns: [{"role", "content"}, ...] oldest first; the newest turns are kept
+        lines, spent = [], 0
+        for turn in reversed(turns):
+            line = f"{turn['role']}: {turn['content']}"
+            cost = self.count(line) + 1
+            if spent + cost > budget:
+                break
+            lines.append(line)
+            spent += cost
+        return "\n".join(reversed(lines))
+    
+    def packed_history(self, history):
+        # The history text pack() puts in the prompt (independent of the excerpts)
+        return self.pack_history(list(history), self._budgets()[1])
+    
+    def pack(self, question, documents, history=()):
+        with span("prompt_build", documents=len(documents)) as fields:
+            packed = self._pack(question, documents, history)
+            fields["prompt_tokens"] = packed["prompt_tokens"]
+        return packed
+    
+    def _pack(self, question, documents, history):
+        question_budget, _, excerpt_budget = self._budgets()
+        question = truncate_tokens(question, question_budget, self.model)
+        # Space the question doesn't use goes to the excerpts
+        excerpt_budget += question_budget - self.count(question)
+        context, used = self.pack_excerpts(documents, excerpt_budget)
+        history_text = self.packed_history(history)
+        prompt = PROMPT_TEMPLATE.format(history=history_text, question=question, context=context)
+        return {
+            "prompt": prompt,
+            "context": context,
+            "history": history_text,
+            "documents": used,
+            "prompt_tokens": self.count(prompt)
+        }
@@ -1,29 +1,108 @@
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import UnstructuredURLLoader, SeleniumURLLoader
+import codecs
+from datetime import datetime
 from config import Config
+from modules.fetcher import get_fetcher
+from modules.web_scraper import WebScraper
+from utils.metrics import span
 
 class DataProcessor:
-    def __init__(self):
+    def __init__(self, chunk_size=Config.DEFAULT_CHUNK_SIZE, chunk_overlap=Config.DEFAULT_CHUNK_OVERLAP):
+        # langchain is imported when content is first processed, not at app start
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
         self.text_splitter = RecursiveCharacterTextSplitter(
             separators=['\n\n', '\n', '.', ','],
-            chunk_size=Config.DEFAULT_CHUNK_SIZE,
-            chunk_overlap=Config.DEFAULT_CHUNK_OVERLAP
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap
         )
     
+    def load_urls(self, urls, indexed_metadata=None):
+        # One concurrent download per URL; the same HTML feeds both content
+        # extraction and metadata parsing. Returns (documents, article metadata).
+        # indexed_metadata(url) returns the stored metadata of an already indexed
+        # document; unmodified responses for those are not parsed again, unless
+        # they were split with other settings.
+        from langchain_core.documents import Document
+        documents = []
+        articles = []
+        for result in get_fetcher().fetch_many(urls):
+            if not result.ok:
+                articles.append(WebScraper.error_metadata(result.url, result.error))
+                continue
+            stored = indexed_metadata(result.url) if result.not_modified and indexed_metadata else None
+            if stored and self.split_settings(stored) == self.split_settings():
+                articles.append({
+                    "title": stored.get("title", "Untitled Article"),
+                    "description": stored.get("description", "No description available"),
+                    "url": result.url,
+                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "unchanged": True
+                })
+                continue
+            with span("parse", url=result.url, html_bytes=len(result.html)):
+                articles.append(WebScraper.parse_metadata(result.html, result.url))
+                text = WebScraper.extract_text(result.html)
+            if text.strip():
+                documents.append(Document(page_content=text, metadata={"source": result.url}))
+        return documents, articles
+    
+    def split_settings(self, metadata=None):
+        # (chunk_size, chunk_overlap) of this splitter, or as recorded in a chunk's metadata
+        if metadata is None:
+            return (self.chunk_size, self.chunk_overlap)
+        return (metadata.get("chunk_size"), metadata.get("chunk_overlap"))
+    
     def process_urls(self, urls, use_selenium=False):
         try:
             if use_selenium:
-                loader = SeleniumURLLoader(urls=urls)
+                from langchain_community.document_loaders import SeleniumURLLoader
+                data = SeleniumURLLoader(urls=urls).load()
             else:
-                loader = UnstructuredURLLoader(urls=urls)
-            
-            data = loader.load()
+                data, _ = self.load_urls(urls)
             return self.text_splitter.split_documents(data)
         except Exception as e:
             raise Exception(f"Error processing URLs: {str(e)}")
     
+    def iter_stream_documents(self, stream, metadata=None, block_size=None, on_progress=None):
+        # Generator pipeline for large uploads: blocks are decoded incrementally
+        # (multi-byte UTF-8 sequences may straddle blocks) and split window by
+        # window, so memory stays proportional to block_size, not the file size.
+        # The consumer pulls chunks at its own pace, which provides backpressure.
+        from langchain_core.documents import Document
+        block_size = block_size or Config.UPLOAD_BLOCK_SIZE
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        buffer = ""
+        bytes_read = 0
+        while True:
+            block = stream.read(block_size)
+            final = not block
+            bytes_read += len(block)
+            buffer += decoder.decode(block, final=final)
+            if on_progress:
+                on_progress(bytes_read)
+            if not final and len(buffer) < block_size:
+                continue
+            
+            chunks = self.text_splitter.split_text(buffer) if buffer.strip() else []
+            # The last chunk may be cut by the window edge: carry it over so it
+            # is re-split together with the next block (unless it is itself huge,
+            # i.e. text without any separator, which would defeat the bound)
+            carry = None
+            if not final and chunks and len(chunks[-1]) < block_size:
+                carry = chunks.pop()
+            for chunk in chunks:
+                yield Document(page_content=chunk, metadata=dict(metadata or {}))
+            if final:
+                return
+            if carry is None:
+                buffer = ""
+            else:
+                tail_start = buffer.rfind(carry)
+                buffer = buffer[tail_start:] if tail_start >= 0 else buffer[-len(carry):]
+    
     def process_text(self, text):
         try:
             return self.text_splitter.create_documents([text])
         except Exception as e:
-            raise Exception(f"Error processing text: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error processing text: {str(e)}")
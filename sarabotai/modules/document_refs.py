@@ -0,0 +1,117 @@
+import os
+import sqlite3
+import threading
+import time
+
+class DocumentReferences:
+    # Which sessions reference which document version in the shared collection.
+    # Chunks of a (doc_id, content_hash) version are stored once; a version is
+    # garbage-collected when its last reference is released. WAL mode lets
+    # several server processes share the table. last_access is refreshed while
+    # the session is in use, so references of sessions whose server process
+    # died can be found and released (idle_sessions).
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS refs ("
+            "session_id TEXT NOT NULL, doc_id TEXT NOT NULL, content_hash TEXT NOT NULL, "
+            "source TEXT, added_at REAL NOT NULL, last_access REAL, PRIMARY KEY (session_id, doc_id))"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(refs)")}
+        if "last_access" not in columns:
+            # Tables created before last_access existed
+            self._conn.execute("ALTER TABLE refs ADD COLUMN last_access REAL")
+        self._conn.execute("UPDATE refs SET last_access = added_at WHERE last_access IS NULL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS refs_version ON refs (doc_id, content_hash)")
+    
+    def add(self, session_id, doc_id, content_hash, source):
+        # Returns the version this session referenced before, if it was a different one
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash FROM refs WHERE session_id = ? AND doc_id = ?", (session_id, doc_id)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO refs (session_id, doc_id, content_hash, source, added_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (session_id, doc_id, content_hash, source, now, now)
+            )
+        return row[0] if row and row[0] != content_hash else None
+    
+    def remove(self, session_id, doc_id):
+        # Returns the released content hash, or None if the session had no reference
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash FROM refs WHERE session_id = ? AND doc_id = ?", (session_id, doc_id)
+            ).fetchone()
+            self._conn.execute("DELETE FROM refs WHERE session_id = ? AND doc_id = ?", (session_id, doc_id))
+        return row[0] if row else None
+    
+    def remove_session(self, session_id):
+        # Returns [(doc_id, content_hash), ...] released by the session
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT doc_id, content_hash FROM refs WHERE session_id = ?", (session_id,)
+            ).fetchall()
+            self._conn.execute("DELETE FROM refs WHERE session_id = ?", (session_id,))
+        return rows
+    
+    def touch(self, session_id):
+        with self._lock:
+            self._conn.execute("UPDATE refs SET last_access = ? WHERE session_id = ?", (time.time(), session_id))
+    
+    def idle_sessions(self, before):
+        # Sessions holding references that were last used before the given time
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id FROM refs GROUP BY session_id HAVING MAX(last_access) < ?", (before,)
+            ).fetchall()
+        return [session_id for (session_id,) in rows]
+    
+    def get(self, session_id, doc_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash FROM refs WHERE session_id = ? AND doc_id = ?", (session_id, doc_id)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def documents(self, session_id):
+        # {doc_id: (source, content_hash)} referenced by the session
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT doc_id, source, content_hash FROM refs WHERE session_id = ?", (session_id,)
+            ).fetchall()
+        return {doc_id: (source, content_hash) for doc_id, source, content_hash in rows}
+    
+    def references(self, doc_id, content_hash):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM refs WHERE doc_id = ? AND content_hash = ?", (doc_id, content_hash)
+            ).fetchone()[0]
+    
+    def stats(self):
+        with self._lock:
+            sessions, references, versions = self._conn.execute(
+                "SELECT COUNT(DISTINCT session_id), COUNT(*), COUNT(DISTINCT doc_id || ':' || content_hash) FROM refs"
+            ).fetchone()
+        return {"sessions": sessions, "references": references, "stored_versions": versions}
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_refs = {}
+_refs_lock = threading.Lock()
+
+def get_document_refs(directory):
+    # One reference table per shared store directory per process
+    directory = os.path.abspath(directory)
+    with _refs_lock:
+        if directory not in _refs:
+            _refs[directory] = DocumentReferences(os.path.join(directory, "references.sqlite3"))
+        return _refs[directory]
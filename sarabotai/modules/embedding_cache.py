@@ -0,0 +1,104 @@
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+def normalize_text(text):
+    # Whitespace-only differences don't change what a chunk means
+    return " ".join(text.split())
+
+class CachedEmbeddings(Embeddings):
+    # Content-addressed embedding cache in front of any langchain Embeddings.
+    # Keys are sha256(model name + kind + normalized text); vectors live in an
+    # in-memory LRU tier backed by an optional on-disk SQLite tier (float32 blobs).
+    def __init__(self, embeddings, model_name, disk_cache=None, max_memory_entries=50000):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.disk_cache = disk_cache
+        self.max_memory_entries = max_memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+    
+    def cache_key(self, text, kind="doc"):
+        payload = f"{self.model_name}\x00{kind}\x00{normalize_text(text)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def embed_documents(self, texts):
+        return self._embed(list(texts), "doc", self.embeddings.embed_documents)
+    
+    def embed_query(self, text):
+        return self._embed([text], "query", lambda batch: [self.embeddings.embed_query(batch[0])])[0]
+    
+    def embed_queries(self, texts):
+        # Many queries in one batched encode; the supported encoders embed a
+        # query exactly like a one-text document batch
+        return self._embed(list(texts), "query", self.embeddings.embed_documents)
+    
+    def _embed(self, texts, kind, compute):
+        keys = [self.cache_key(text, kind) for text in texts]
+        vectors = {}
+        
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    vectors[key] = vector
+            self.memory_hits += sum(1 for key in keys if key in vectors)
+        
+        pending = [key for key in dict.fromkeys(keys) if key not in vectors]
+        if pending and self.disk_cache is not None:
+            try:
+                stored = self.disk_cache.get_many(pending)
+            except sqlite3.Error:
+                stored = {}
+            for key, blob in stored.items():
+                vectors[key] = np.frombuffer(blob, dtype=np.float32)
+            self._remember(stored.keys(), vectors, disk_hits=len(stored))
+        
+        # Only distinct texts that were never seen are sent to the model
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+        if missing:
+            computed = compute(list(missing.values()))
+            new_vectors = {
+                key: np.asarray(vector, dtype=np.float32)
+                for key, vector in zip(missing.keys(), computed)
+            }
+            vectors.update(new_vectors)
+            self._remember(new_vectors.keys(), vectors, misses=len(missing))
+            if self.disk_cache is not None:
+                try:
+                    self.disk_cache.put_many((key, vector.tobytes()) for key, vector in new_vectors.items())
+                except sqlite3.Error:
+                    # The memory tier still holds the vectors; a full or locked disk isn't fatal
+                    pass
+        
+        return [vectors[key].tolist() for key in keys]
+    
+    def _remember(self, keys, vectors, disk_hits=0, misses=0):
+        with self._lock:
+            self.disk_hits += disk_hits
+            self.misses += misses
+            for key in keys:
+                self._memory[key] = vectors[key]
+                self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+    
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory)
+        }
@@ -0,0 +1,155 @@
+import atexit
+import os
+import queue
+import threading
+import time
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from config import Config
+
+class EmbeddingEngine(Embeddings):
+    # sentence-transformers encoder tuned for CPU ingest:
+    # - small and medium inputs go through a two-stage pipeline where a
+    #   tokenizer thread prepares batch i+1 while batch i runs the forward pass
+    # - large inputs are spread over a multi-process pool with one worker per core
+    def __init__(self, model_name, device="cpu", batch_size=None, workers=None, multi_process_min=None):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device=device)
+        self.model_name = model_name
+        self.device = device
+        self.batch_size = batch_size or Config.EMBEDDING_BATCH_SIZE
+        self.workers = workers or Config.EMBEDDING_WORKERS or os.cpu_count() or 1
+        self.multi_process_min = multi_process_min or Config.EMBEDDING_MULTI_PROCESS_MIN
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.texts_encoded = 0
+        self.encode_seconds = 0.0
+        self.last_throughput = 0.0
+    
+    def embed_documents(self, texts):
+        texts = list(texts)
+        if not texts:
+            return []
+        start = time.perf_counter()
+        if self.workers > 1 and Config.EMBEDDING_MULTI_PROCESS and len(texts) >= self.multi_process_min:
+            vectors = self._encode_multi_process(texts)
+        else:
+            vectors = self._encode_pipelined(texts)
+        self._record(len(texts), time.perf_counter() - start)
+        return vectors.tolist()
+    
+    def embed_query(self, text):
+        return self._encode_pipelined([text])[0].tolist()
+    
+    def _record(self, count, seconds):
+        with self._stats_lock:
+            self.texts_encoded += count
+            self.encode_seconds += seconds
+            if seconds > 0:
+                self.last_throughput = count / seconds
+    
+    def _encode_pipelined(self, texts):
+        import torch
+        from sentence_transformers.util import batch_to_device
+        
+        # Longest first, like SentenceTransformer.encode, to minimise padding
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        batches = [
+            [texts[i] for i in order[start:start + self.batch_size]]
+            for start in range(0, len(texts), self.batch_size)
+        ]
+        
+        # Bounded queue gives backpressure: tokenization runs at most 2 batches ahead
+        features_queue = queue.Queue(maxsize=2)
+        producer_error = []
+        # Set when the consumer stops early (e.g. the forward pass raised), so the
+        # producer doesn't stay blocked on a full queue nobody reads any more
+        stop = threading.Event()
+        
+        def put(item):
+            while not stop.is_set():
+                try:
+                    features_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def tokenize_batches():
+            try:
+                for batch in batches:
+                    if not put(self.model.tokenize(batch)):
+                        return
+            except Exception as e:
+                producer_error.append(e)
+            finally:
+                put(None)
+        
+        producer = None
+        if len(batches) > 1:
+            producer = threading.Thread(target=tokenize_batches, name="embedding-tokenizer", daemon=True)
+            producer.start()
+        else:
+            tokenize_batches()
+        
+        outputs = []
+        try:
+            with torch.inference_mode():
+                while True:
+                    features = features_queue.get()
+                    if features is None:
+                        break
+                    features = batch_to_device(features, self.model.device)
+                    embeddings = self.model(features)["sentence_embedding"]
+                    embeddings = torch.nn.functional.normalize(embeddings, p=2, dim=1)
+                    outputs.append(embeddings.float().cpu().numpy())
+        finally:
+            stop.set()
+            # Drop tokenized batches that will never be used, then wait for the producer
+            while True:
+                try:
+                    features_queue.get_nowait()
+                except queue.Empty:
+                    break
+            if producer is not None:
+                producer.join()
+        if producer_error:
+            raise producer_error[0]
+        
+        vectors = np.empty((len(texts), outputs[0].shape[1]), dtype=np.float32)
+        vectors[order] = np.vstack(outputs)
+        return vectors
+    
+    def _encode_multi_process(self, texts):
+        pool = self._get_pool()
+        # Each worker tokenizes and encodes its own slice, so tokenization overlaps encoding across cores
+        chunk_size = max(self.batch_size, len(texts) // (self.workers * 4) or 1)
+        vectors = self.model.encode_multi_process(texts, pool, batch_size=self.batch_size, chunk_size=chunk_size)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+    
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = self.model.start_multi_process_pool(target_devices=[self.device] * self.workers)
+                atexit.register(self.close)
+            return self._pool
+    
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self.model.stop_multi_process_pool(self._pool)
+                self._pool = None
+    
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "batch_size": self.batch_size,
+                "workers": self.workers,
+                "texts_encoded": self.texts_encoded,
+                "chunks_per_second": self.texts_encoded / self.encode_seconds if self.encode_seconds else 0.0,
+                "last_chunks_per_second": self.last_throughput
+            }
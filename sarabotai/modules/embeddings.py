@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+from config import Config
+from utils.kv_cache import SQLiteCache
+from utils.process_stats import resident_memory_bytes
+
+class EmbeddingRegistry:
+    # One embedding model per server process, shared by every session and every
+    # VectorStore. Streamlit re-executes scripts on each interaction but keeps
+    # imported modules, so this registry survives reruns. Callers get the model
+    # wrapped in a CachedEmbeddings so chunk and query vectors are computed once.
+    def __init__(self):
+        self._models = {}
+        self._cached = {}
+        self._stats = {}
+        self._disk_cache = None
+        self._lock = threading.Lock()
+        self._warmup_threads = {}
+    
+    def get(self, model_name=None):
+        model_name = model_name or Config.EMBEDDING_MODEL_NAME
+        cached = self._cached.get(model_name)
+        if cached is not None:
+            return cached
+        
+        with self._lock:
+            # Another thread may have finished loading while we waited
+            cached = self._cached.get(model_name)
+            if cached is None:
+                from modules.embedding_cache import CachedEmbeddings
+                model = self._load(model_name)
+                self._models[model_name] = model
+                # Backends produce slightly different vectors, so they don't share cache entries
+                cache_name = model_name if Config.EMBEDDING_BACKEND == "torch" else f"{model_name}#{Config.EMBEDDING_BACKEND}"
+                cached = CachedEmbeddings(
+                    model,
+                    cache_name,
+                    disk_cache=self._get_disk_cache(),
+                    max_memory_entries=Config.EMBEDDING_CACHE_MEMORY_ENTRIES
+                )
+                self._cached[model_name] = cached
+        return cached
+    
+    def get_model(self, model_name=None):
+        # The raw model, bypassing the embedding cache
+        model_name = model_name or Config.EMBEDDING_MODEL_NAME
+        self.get(model_name)
+        return self._models[model_name]
+    
+    def _get_disk_cache(self):
+        if self._disk_cache is None:
+            try:
+                self._disk_cache = SQLiteCache(
+                    os.path.join(Config.CACHE_DIR, "embeddings.sqlite"),
+                    table="embeddings",
+                    max_bytes=Config.EMBEDDING_CACHE_MAX_BYTES
+                )
+            except Exception:
+                # Read-only or full disk: fall back to the in-memory tier only
+                return None
+        return self._disk_cache
+    
+    def _load(self, model_name):
+        rss_before = resident_memory_bytes()
+        start = time.perf_counter()
+        if Config.EMBEDDING_BACKEND in ("onnx", "onnx-int8"):
+            # Imported lazily: the ONNX backend never loads torch
+            from modules.onnx_embedder import OnnxEmbedder
+            model = OnnxEmbedder(model_name, quantize=Config.EMBEDDING_BACKEND == "onnx-int8")
+        elif Config.EMBEDDING_BACKEND == "hashing":
+            # Deterministic, model-free vectors for benchmarks and offline runs
+            from modules.hashing_embedder import HashingEmbedder
+            model = HashingEmbedder()
+        else:
+            from modules.embedding_engine import EmbeddingEngine
+            model = EmbeddingEngine(model_name, device=Config.EMBEDDING_DEVICE)
+        load_seconds = time.perf_counter() - start
+        
+        # Dummy encode so the first real query doesn't pay for lazy initialization
+        start = time.perf_counter()
+        model.embed_query("warm-up")
+        warmup_seconds = time.perf_counter() - start
+        
+        self._stats[model_name] = {
+            "model_name": model_name,
+            "device": Config.EMBEDDING_DEVICE,
+            "backend": Config.EMBEDDING_BACKEND,
+            "load_seconds": round(load_seconds, 3),
+            "warmup_seconds": round(warmup_seconds, 3),
+            "rss_delta_bytes": max(resident_memory_bytes() - rss_before, 0),
+            "loaded_at": time.time()
+        }
+        return model
+    
+    def warm_up(self, model_name=None, background=True):
+        # Idempotent: safe to call on every script run
+        model_name = model_name or Config.EMBEDDING_MODEL_NAME
+        if model_name in self._cached:
+            return
+        if not background:
+            self.get(model_name)
+            return
+        
+        with self._lock:
+            thread = self._warmup_threads.get(model_name)
+            if thread is not None and thread.is_alive():
+                return
+            thread = threading.Thread(
+                target=self._warm_up_quietly,
+                args=(model_name,),
+                name=f"embedding-warmup-{model_name}",
+                daemon=True
+            )
+            self._warmup_threads[model_name] = thread
+        thread.start()
+    
+    def _warm_up_quietly(self, model_name):
+        try:
+            self.get(model_name)
+        except Exception:
+            # Loading errors resurface on the first foreground get()
+            pass
+    
+    def is_loaded(self, model_name=None):
+        return (model_name or Config.EMBEDDING_MODEL_NAME) in self._cached
+    
+    def stats(self):
+        models = []
+        for model_name, stats in self._stats.items():
+            stats = dict(stats)
+            if model_name in self._cached:
+                stats["cache"] = self._cached[model_name].stats()
+                stats["engine"] = self._models[model_name].stats()
+            models.append(stats)
+        return {
+            "models": models,
+            "resident_memory_bytes": resident_memory_bytes()
+        }
+
+embedding_registry = EmbeddingRegistry()
+
+def get_embeddings(model_name=None):
+    return embedding_registry.get(model_name)
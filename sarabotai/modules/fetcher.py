@@ -0,0 +1,133 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import Config
+from modules.http_cache import HTTPCache, decode_body
+from utils.metrics import metrics
+
+class FetchResult:
+    def __init__(self, url, html=None, status_code=None, headers=None, error=None, elapsed=0.0, not_modified=False):
+        self.url = url
+        self.html = html
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.error = error
+        self.elapsed = elapsed
+        # True when the body came from the cache without changing upstream
+        # (still fresh, or revalidated with a 304)
+        self.not_modified = not_modified
+    
+    @property
+    def ok(self):
+        return self.error is None and self.html is not None
+
+class Fetcher:
+    # Downloads every URL exactly once on a bounded thread pool. Connections are
+    # kept alive in one pooled requests.Session and each host gets at most
+    # per_host_limit requests in flight. Responses go through an on-disk
+    # HTTPCache and are revalidated with conditional requests.
+    def __init__(self, max_workers=None, per_host_limit=None, timeout=None, cache=None):
+        self.max_workers = max_workers or Config.FETCH_MAX_WORKERS
+        self.per_host_limit = per_host_limit or Config.FETCH_PER_HOST_LIMIT
+        self.timeout = timeout or Config.FETCH_TIMEOUT
+        
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': Config.FETCH_USER_AGENT})
+        adapter = HTTPAdapter(
+            pool_connections=self.max_workers,
+            pool_maxsize=self.max_workers,
+            max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
+        self.cache = cache
+        if self.cache is None and Config.HTTP_CACHE_ENABLED:
+            try:
+                self.cache = HTTPCache()
+            except Exception:
+                self.cache = None
+        
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fetch")
+        self._host_limits = {}
+        self._lock = threading.Lock()
+    
+    def _host_limit(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_limits[host]
+    
+    def fetch(self, url):
+        result = self._fetch(url)
+        metrics.observe("fetch", result.elapsed, error="FetchError" if result.error else None,
+                        url=url, cached=result.not_modified)
+        return result
+    
+    def _fetch(self, url):
+        start = time.perf_counter()
+        try:
+            entry = self.cache.lookup(url) if self.cache else None
+            if entry and entry["fresh"]:
+                self.cache.record_hit()
+                return self._from_cache(url, entry, start)
+            
+            request_headers = self.cache.conditional_headers(entry) if entry else {}
+            with self._host_limit(url):
+                response = self.session.get(url, headers=request_headers, timeout=self.timeout)
+            
+            if response.status_code == 304 and entry:
+                self.cache.mark_revalidated(url, response)
+                return self._from_cache(url, entry, start)
+            
+            response.raise_for_status()
+            if response.encoding is None:
+                # Detect the charset once, for both the text below and the cache entry
+                response.encoding = response.apparent_encoding
+            if self.cache:
+                self.cache.store(url, response)
+            return FetchResult(
+                url,
+                html=response.text,
+                status_code=response.status_code,
+                headers=dict(response.headers),
+                elapsed=time.perf_counter() - start
+            )
+        except Exception as e:
+            return FetchResult(url, error=str(e), elapsed=time.perf_counter() - start)
+    
+    def _from_cache(self, url, entry, start):
+        return FetchResult(
+            url,
+            html=decode_body(entry["body"], entry["encoding"]),
+            status_code=entry["status"],
+            headers=entry["headers"],
+            elapsed=time.perf_counter() - start,
+            not_modified=True
+        )
+    
+    def fetch_many(self, urls):
+        # Results come back in input order; duplicate URLs are fetched once
+        unique_urls = list(dict.fromkeys(urls))
+        # (each task runs in a copy of the caller's context, so spans keep their session)
+        futures = [self._executor.submit(contextvars.copy_context().run, self.fetch, url) for url in unique_urls]
+        results = {url: future.result() for url, future in zip(unique_urls, futures)}
+        return [results[url] for url in urls]
+
+_shared_fetcher = None
+_shared_lock = threading.Lock()
+
+def get_fetcher():
+    # Process-wide fetcher so every session shares the same connection pool
+    global _shared_fetcher
+    if _shared_fetcher is None:
+        with _shared_lock:
+            if _shared_fetcher is None:
+                _shared_fetcher = Fetcher()
+    return _shared_fetcher
@@ -1,38 +1,101 @@
-from openai import OpenAI
+import time
 from config import Config
+from modules.summarizer import MapReduceSummarizer
+from utils.metrics import metrics, span
 
 class OpenAIIntegration:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, client=None):
+        # Reuse an existing client (e.g. the one validated in the UI) or build one
+        if client is not None:
+            self.client = client
+            return
         # Use provided API key or fallback to config
         api_key = api_key or Config.OPENAI_API_KEY
         if api_key:
+            # Imported on first use: the SDK (pydantic models, httpx) is slow to import
+            from openai import OpenAI
             self.client = OpenAI(api_key=api_key)
         else:
             self.client = None
             raise ValueError("API key is required. Please configure it via the UI or environment variable.")
     
-    def generate_response(self, prompt, context=None, temperature=0.7):
-        try:
-            if context:
-                messages = [
-                    {"role": "system", "content": "You are a helpful assistant that provides detailed answers based on the given context."},
-                    {"role": "user", "content": f"Context:\n{context}\n\nQuestion:\n{prompt}\n\nAnswer:"}
-                ]
-            else:
-                messages = [
-                    {"role": "user", "content": prompt}
-                ]
-            
+    @staticmethod
+    def build_messages(prompt, context=None):
+        if context:
+            return [
+                {"role": "system", "content": "You are a helpful assistant that provides detailed answers based on the given context."},
+                {"role": "user", "content": f"Context:\n{context}\n\nQuestion:\n{prompt}\n\nAnswer:"}
+            ]
+        return [
+            {"role": "user", "content": prompt}
+        ]
+    
+    def complete(self, prompt, context=None, temperature=0.7, max_tokens=None):
+        # Like generate_response, but lets API errors propagate (for retrying callers)
+        with span("llm", model=Config.OPENAI_MODEL) as fields:
             response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=messages,
+                model=Config.OPENAI_MODEL,
+                messages=self.build_messages(prompt, context),
                 temperature=temperature,
-                max_tokens=2048
+                max_tokens=max_tokens or Config.OPENAI_MAX_TOKENS
             )
-            return response.choices[0].message.content
+            usage = getattr(response, "usage", None)
+            fields["completion_tokens"] = getattr(usage, "completion_tokens", None)
+        metrics.record_usage(Config.OPENAI_MODEL, usage)
+        return response.choices[0].message.content
+    
+    def generate_response(self, prompt, context=None, temperature=0.7):
+        try:
+            return self.complete(prompt, context=context, temperature=temperature)
         except Exception as e:
             return f"Error generating response: {str(e)}"
     
+    def stream_response(self, prompt, context=None, temperature=0.7):
+        # Yields text deltas as the model produces them. The span covers the whole
+        # stream; time to first token is logged with it, usage comes in the last chunk.
+        # Errors are raised, not yielded, so callers can tell a partial answer from a
+        # complete one.
+        start = time.perf_counter()
+        try:
+            stream = self.client.chat.completions.create(
+                model=Config.OPENAI_MODEL,
+                messages=self.build_messages(prompt, context),
+                temperature=temperature,
+                max_tokens=Config.OPENAI_MAX_TOKENS,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+        except Exception as e:
+            metrics.observe("llm", time.perf_counter() - start, error=type(e).__name__, model=Config.OPENAI_MODEL, stream=True)
+            raise
+        
+        first_token = None
+        usage = None
+        error = None
+        try:
+            for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first_token is None:
+                        first_token = time.perf_counter() - start
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            # Closing the HTTP response cancels generation if the consumer stopped early
+            stream.close()
+            metrics.observe("llm", time.perf_counter() - start, error=error, model=Config.OPENAI_MODEL, stream=True,
+                            first_token_seconds=first_token)
+            metrics.record_usage(Config.OPENAI_MODEL, usage)
+    
     def generate_summary(self, text):
-        prompt = f"Please provide a comprehensive summary of the following content, highlighting key points and themes:\n\n{text}"
-        return self.generate_response(prompt, temperature=0.3)
\ No newline at end of file
+        # Long input is summarized hierarchically instead of being sent in one request
+        try:
+            return MapReduceSummarizer(self).summarize(
+                {"text": [text]},
+                final_prompt="Please provide a comprehensive summary of the following content, highlighting key points and themes:\n\n{text}"
+            )
+        except Exception as e:
+            return f"Error generating response: {str(e)}"
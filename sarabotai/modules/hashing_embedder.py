@@ -0,0 +1,51 @@
+import hashlib
+import re
+import time
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from config import Config
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+class HashingEmbedder(Embeddings):
+    # Deterministic stand-in for the transformer encoders (EMBEDDING_BACKEND=hashing):
+    # unigrams and bigrams are feature-hashed into a fixed dimension with a random
+    # sign and L2-normalized. Needs no model download and yields the same vectors
+    # on every machine, so benchmarks measure the pipeline rather than the encoder.
+    # Retrieval quality is lexical only; not meant for real use.
+    def __init__(self, dim=None):
+        self.dim = dim or Config.HASHING_EMBEDDING_DIM
+        self.texts_encoded = 0
+        self.encode_seconds = 0.0
+    
+    def _bucket(self, feature):
+        value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+        return value % self.dim, 1.0 if value >> 63 else -1.0
+    
+    def encode(self, texts):
+        start = time.perf_counter()
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = TOKEN_PATTERN.findall(text.lower())
+            for feature in tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]:
+                column, sign = self._bucket(feature)
+                vectors[row, column] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1.0, norms)
+        self.texts_encoded += len(texts)
+        self.encode_seconds += time.perf_counter() - start
+        return vectors
+    
+    def embed_documents(self, texts):
+        return self.encode(list(texts)).tolist()
+    
+    def embed_query(self, text):
+        return self.encode([text])[0].tolist()
+    
+    def stats(self):
+        return {
+            "backend": "hashing",
+            "dim": self.dim,
+            "texts_encoded": self.texts_encoded,
+            "chunks_per_second": self.texts_encoded / self.encode_seconds if self.encode_seconds else 0.0
+        }
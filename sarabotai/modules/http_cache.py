@@ -0,0 +1,133 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from config import Config
+
+def decode_body(body, encoding):
+    # The same decoding requests' Response.text applies, so a cached page reads
+    # exactly like the fresh download. encoding is the one Response.text used;
+    # rows stored without one are detected from the body, as requests does.
+    if encoding is None:
+        from requests.compat import chardet
+        encoding = chardet.detect(body)["encoding"] if chardet is not None else "utf-8"
+    try:
+        return str(body, encoding, errors="replace")
+    except (LookupError, TypeError):
+        return str(body, errors="replace")
+
+class HTTPCache:
+    # On-disk response cache under the Fetcher. Stores body, headers and the
+    # ETag / Last-Modified validators; stale entries are revalidated with a
+    # conditional GET and the total body size is bounded by LRU eviction.
+    def __init__(self, path=None, ttl=None, max_bytes=None):
+        self.path = path or os.path.join(Config.CACHE_DIR, "http_cache.sqlite")
+        self.ttl = Config.HTTP_CACHE_TTL if ttl is None else ttl
+        self.max_bytes = max_bytes or Config.HTTP_CACHE_MAX_BYTES
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "url TEXT PRIMARY KEY, status INTEGER, headers TEXT, body BLOB, encoding TEXT, "
+            "etag TEXT, last_modified TEXT, expires_at REAL, last_access REAL, size INTEGER)"
+        )
+        self.hits = 0
+        self.revalidated = 0
+        self.downloads = 0
+    
+    def lookup(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, headers, body, encoding, etag, last_modified, expires_at "
+                "FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE url = ?", (time.time(), url))
+        status, headers, body, encoding, etag, last_modified, expires_at = row
+        return {
+            "status": status,
+            "headers": json.loads(headers),
+            "body": body,
+            "encoding": encoding,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh": time.time() < expires_at
+        }
+    
+    def record_hit(self):
+        with self._lock:
+            self.hits += 1
+    
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+    
+    def _expires_at(self, headers):
+        cache_control = headers.get("Cache-Control", "").lower()
+        if "no-cache" in cache_control:
+            return time.time()
+        max_age = re.search(r"max-age=(\d+)", cache_control)
+        ttl = int(max_age.group(1)) if max_age else self.ttl
+        return time.time() + ttl
+    
+    def store(self, url, response):
+        headers = dict(response.headers)
+        if "no-store" in headers.get("Cache-Control", "").lower():
+            return
+        body = response.content
+        # Response.text falls back to the detected charset when the headers name none
+        encoding = response.encoding or response.apparent_encoding
+        now = time.time()
+        with self._lock:
+            self.downloads += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(url, status, headers, body, encoding, etag, last_modified, expires_at, last_access, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, response.status_code, json.dumps(headers), body, encoding,
+                 headers.get("ETag"), headers.get("Last-Modified"), self._expires_at(headers), now, len(body))
+            )
+            self._evict()
+    
+    def mark_revalidated(self, url, response):
+        # 304 Not Modified: keep the stored body, extend its lifetime
+        with self._lock:
+            self.revalidated += 1
+            self._conn.execute(
+                "UPDATE responses SET expires_at = ?, last_access = ? WHERE url = ?",
+                (self._expires_at(dict(response.headers)), time.time(), url)
+            )
+    
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self._conn.execute(
+            "SELECT url, size FROM responses ORDER BY last_access ASC"
+        ).fetchall():
+            self._conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+    
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {
+            "entries": entries,
+            "bytes": size,
+            "fresh_hits": self.hits,
+            "revalidated": self.revalidated,
+            "downloads": self.downloads
+        }
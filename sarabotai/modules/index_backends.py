@@ -0,0 +1,571 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+from config import Config
+from utils.rw_lock import ReadWriteLock
+
+# Every backend reports cosine similarity (higher is more similar) from query()
+
+def _normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def matches(metadata, where):
+    # Subset of Chroma's metadata filter language: equality, $eq, $ne, $in, $nin, $and, $or
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for operator, operand in condition.items():
+                if operator == "$eq" and value != operand:
+                    return False
+                if operator == "$ne" and value == operand:
+                    return False
+                if operator == "$in" and value not in operand:
+                    return False
+                if operator == "$nin" and value in operand:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+class IndexBackend:
+    # Storage interface behind VectorStore. Embeddings are computed by the caller.
+    name = "base"
+    
+    def count(self):
+        raise NotImplementedError
+    
+    def ids(self):
+        raise NotImplementedError
+    
+    def get(self, ids=None, where=None, limit=None, include=("documents", "metadatas")):
+        # Returns {"ids": [...], "documents": [...], "metadatas": [...]} like Chroma
+        raise NotImplementedError
+    
+    def upsert(self, ids, texts, embeddings, metadatas):
+        raise NotImplementedError
+    
+    def delete(self, ids):
+        raise NotImplementedError
+    
+    def query(self, vector, k, where=None, ids=None):
+        # Returns [(id, text, metadata, cosine similarity), ...] best first.
+        # ids restricts the search to a candidate set (exact search over it).
+        raise NotImplementedError
+    
+    def query_many(self, vectors, k, where=None):
+        # One result list per query vector; backends override this with a batched search
+        return [self.query(vector, k, where) for vector in vectors]
+    
+    def export(self):
+        # Everything including float32 embeddings, for migrating between backends
+        raise NotImplementedError
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        pass
+    
+    def stats(self):
+        return {"backend": self.name, "chunks": self.count()}
+
+class ChromaBackend(IndexBackend):
+    name = "chroma"
+    
+    def __init__(self, path, collection_name):
+        import chromadb
+        self.path = path
+        self.client = chromadb.PersistentClient(path=path)
+        self.collection = self.client.get_or_create_collection(collection_name, metadata={"hnsw:space": "cosine"})
+        # Collections created earlier through langchain use Chroma's default squared-L2 space
+        self.space = (self.collection.metadata or {}).get("hnsw:space", "l2")
+    
+    @staticmethod
+    def exists(path):
+        return os.path.exists(os.path.join(path, "chroma.sqlite3"))
+    
+    def _similarity(self, distance):
+        if self.space == "l2":
+            # Squared L2 between unit vectors: d = 2 - 2cos
+            return 1.0 - distance / 2.0
+        return 1.0 - distance  # cosine and ip distances are 1 - similarity
+    
+    def count(self):
+        return self.collection.count()
+    
+    def ids(self):
+        return self.collection.get(include=[])["ids"]
+    
+    def get(self, ids=None, where=None, limit=None, include=("documents", "metadatas")):
+        result = self.collection.get(ids=ids, where=where or None, limit=limit, include=list(include))
+        count = len(result["ids"])
+        return {
+            "ids": result["ids"],
+            "documents": result.get("documents") or [None] * count,
+            "metadatas": result.get("metadatas") or [{}] * count
+        }
+    
+    def upsert(self, ids, texts, embeddings, metadatas):
+        self.collection.upsert(
+            ids=list(ids),
+            embeddings=np.asarray(embeddings, dtype=np.float32).tolist(),
+            documents=list(texts),
+            metadatas=list(metadatas)
+        )
+    
+    def delete(self, ids):
+        if ids:
+            self.collection.delete(ids=list(ids))
+    
+    def query(self, vector, k, where=None, ids=None):
+        if ids is not None:
+            return self._query_candidates(vector, k, where, ids)
+        count = self.count()
+        if count == 0:
+            return []
+        result = self.collection.query(
+            query_embeddings=[np.asarray(vector, dtype=np.float32).tolist()],
+            n_results=min(k, count),
+            where=where or None,
+            include=["documents", "metadatas", "distances"]
+        )
+        return [
+            (chunk_id, text, metadata, self._similarity(distance))
+            for chunk_id, text, metadata, distance in zip(
+                result["ids"][0], result["documents"][0], result["metadatas"][0], result["distances"][0]
+            )
+        ]
+    
+    def query_many(self, vectors, k, where=None):
+        count = self.count()
+        if count == 0 or len(vectors) == 0:
+            return [[] for _ in vectors]
+        result = self.collection.query(
+            query_embeddings=np.asarray(vectors, dtype=np.float32).tolist(),
+            n_results=min(k, count),
+            where=where or None,
+            include=["documents", "metadatas", "distances"]
+        )
+        return [
+            [
+                (chunk_id, text, metadata, self._similarity(distance))
+                for chunk_id, text, metadata, distance in zip(ids, texts, metadatas, distances)
+            ]
+            for ids, texts, metadatas, distances in zip(
+                result["ids"], result["documents"], result["metadatas"], result["distances"]
+            )
+        ]
+    
+    def _query_candidates(self, vector, k, where, ids):
+        # Exact scoring of a (small) candidate set instead of walking the HNSW graph
+        if not ids:
+            return []
+        result = self.collection.get(ids=list(ids), where=where or None, include=["documents", "metadatas", "embeddings"])
+        if not result["ids"]:
+            return []
+        scores = _normalize_rows(result["embeddings"]) @ _normalize_rows(vector)[0]
+        top = np.argsort(-scores)[:k]
+        return [
+            (result["ids"][i], result["documents"][i], result["metadatas"][i], float(scores[i]))
+            for i in top
+        ]
+    
+    def export(self):
+        result = self.collection.get(include=["documents", "metadatas", "embeddings"])
+        return {
+            "ids": result["ids"],
+            "documents": result["documents"],
+            "metadatas": result["metadatas"],
+            "embeddings": np.asarray(result["embeddings"], dtype=np.float32)
+        }
+    
+    def close(self):
+        # Best effort: stop the chromadb system so its SQLite and HNSW files are
+        # released (avoids Windows file locking on cleanup)
+        try:
+            from chromadb.api.client import SharedSystemClient
+            identifier = getattr(self.client, "_identifier", None)
+            if identifier is not None:
+                SharedSystemClient._identifier_to_system.pop(identifier, None)
+        except (ImportError, AttributeError):
+            pass
+        try:
+            system = getattr(self.client, "_system", None)
+            if system is not None:
+                system.stop()
+        except Exception:
+            pass
+
+class NumpyBackend(IndexBackend):
+    # In-process index for session-sized corpora: one contiguous float32 (or
+    # float16) matrix of unit vectors searched by brute-force dot product. No
+    # SQLite, no HNSW build, no file locks. Persistence is optional: each flush
+    # saves the matrix as .npy (optionally memory-mapped on load) next to a JSON
+    # file holding ids, texts and metadata, in a new snapshot directory; a
+    # manifest naming the current snapshot is then swapped in with one rename,
+    # so a crash never pairs vectors from one flush with records from another.
+    name = "numpy"
+    VECTORS_FILE = "vectors.npy"
+    RECORDS_FILE = "records.json"
+    MANIFEST_FILE = "numpy_index.json"
+    SNAPSHOT_PREFIX = "snapshot-"
+    
+    def __init__(self, path=None, dtype="float32", mmap=False):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self._lock = ReadWriteLock()  # queries share it
+        self._flush_lock = threading.Lock()  # one flush at a time
+        self._vectors = None
+        self._size = 0
+        self._ids = []
+        self._texts = []
+        self._metadatas = []
+        self._rows = {}
+        self._mapped = False
+        self._dirty = False
+        if path and NumpyBackend.exists(path):
+            self._load(mmap)
+    
+    @staticmethod
+    def exists(path):
+        # The manifest, or the files of a store saved before snapshots were used
+        return any(
+            os.path.exists(os.path.join(path, name))
+            for name in (NumpyBackend.MANIFEST_FILE, NumpyBackend.RECORDS_FILE)
+        )
+    
+    def _snapshot_dir(self):
+        # Directory holding the current files (the store directory itself for old stores)
+        manifest_path = os.path.join(self.path, self.MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return self.path
+        with open(manifest_path, encoding="utf-8") as f:
+            return os.path.join(self.path, json.load(f)["snapshot"])
+    
+    def _load(self, mmap):
+        directory = self._snapshot_dir()
+        with open(os.path.join(directory, self.RECORDS_FILE), encoding="utf-8") as f:
+            records = json.load(f)
+        vectors = None
+        if records["ids"]:
+            vectors = np.load(os.path.join(directory, self.VECTORS_FILE), mmap_mode="r" if mmap else None)
+        rows = 0 if vectors is None else vectors.shape[0]
+        if rows != len(records["ids"]):
+            raise ValueError(
+                f"NumPy index at {self.path} is inconsistent: {rows} vectors for "
+                f"{len(records['ids'])} records; re-ingest the documents"
+            )
+        self._ids = records["ids"]
+        self._texts = records["documents"]
+        self._metadatas = records["metadatas"]
+        self._rows = {chunk_id: row for row, chunk_id in enumerate(self._ids)}
+        self._size = len(self._ids)
+        self._vectors = vectors
+        self._mapped = mmap and vectors is not None
+    
+    def _reserve(self, extra, dim):
+        # Amortised growth; a memory-mapped matrix is copied into RAM on first write
+        needed = self._size + extra
+        if self._vectors is None:
+            self._vectors = np.empty((max(needed, 1024), dim), dtype=self.dtype)
+            return
+        capacity = self._vectors.shape[0]
+        if needed > capacity:
+            capacity = max(needed, capacity * 2)
+        elif not self._mapped:
+            return
+        grown = np.empty((capacity, dim), dtype=self.dtype)
+        grown[:self._size] = self._vectors[:self._size]
+        self._vectors = grown
+        self._mapped = False
+    
+    def count(self):
+        return self._size
+    
+    def ids(self):
+        with self._lock.read():
+            return list(self._ids)
+    
+    def _select(self, ids=None, where=None):
+        if ids is not None:
+            rows = [self._rows[chunk_id] for chunk_id in ids if chunk_id in self._rows]
+        else:
+            rows = range(self._size)
+        if where:
+            rows = [row for row in rows if matches(self._metadatas[row], where)]
+        return list(rows)
+    
+    def get(self, ids=None, where=None, limit=None, include=("documents", "metadatas")):
+        with self._lock.read():
+            rows = self._select(ids, where)[:limit]
+            return {
+                "ids": [self._ids[row] for row in rows],
+                "documents": [self._texts[row] for row in rows] if "documents" in include else [None] * len(rows),
+                "metadatas": [dict(self._metadatas[row]) for row in rows] if "metadatas" in include else [{}] * len(rows)
+            }
+    
+    def upsert(self, ids, texts, embeddings, metadatas):
+        vectors = _normalize_rows(embeddings)
+        with self._lock.write():
+            self._reserve(len(ids), vectors.shape[1])
+            for chunk_id, text, metadata, vector in zip(ids, texts, metadatas, vectors):
+                row = self._rows.get(chunk_id)
+                if row is None:
+                    row = self._size
+                    self._size += 1
+                    self._rows[chunk_id] = row
+                    self._ids.append(chunk_id)
+                    self._texts.append(text)
+                    self._metadatas.append(dict(metadata))
+                else:
+                    self._texts[row] = text
+                    self._metadatas[row] = dict(metadata)
+                self._vectors[row] = vector
+            self._dirty = True
+    
+    def delete(self, ids):
+        with self._lock.write():
+            if self._mapped:
+                self._reserve(0, self._vectors.shape[1])
+            for chunk_id in ids:
+                row = self._rows.pop(chunk_id, None)
+                if row is None:
+                    continue
+                # Swap-remove keeps the matrix contiguous
+                last = self._size - 1
+                if row != last:
+                    self._vectors[row] = self._vectors[last]
+                    self._ids[row] = self._ids[last]
+                    self._texts[row] = self._texts[last]
+                    self._metadatas[row] = self._metadatas[last]
+                    self._rows[self._ids[row]] = row
+                self._ids.pop()
+                self._texts.pop()
+                self._metadatas.pop()
+                self._size -= 1
+            self._dirty = True
+    
+    def _scores(self, matrix, query):
+        # query is one vector (d,) or a block of them (d, q)
+        if matrix.dtype == np.float32:
+            return matrix @ query
+        # float16 storage: upcast block by block so the dot product runs in float32
+        scores = np.empty(matrix.shape[:1] + query.shape[1:], dtype=np.float32)
+        for start in range(0, matrix.shape[0], 65536):
+            scores[start:start + 65536] = matrix[start:start + 65536].astype(np.float32) @ query
+        return scores
+    
+    def query(self, vector, k, where=None, ids=None):
+        query = _normalize_rows(vector)[0]
+        with self._lock.read():
+            if self._size == 0:
+                return []
+            if where or ids is not None:
+                rows = np.array(self._select(ids, where), dtype=np.int64)
+                if rows.size == 0:
+                    return []
+                scores = self._scores(self._vectors[rows], query)
+            else:
+                rows = None
+                scores = self._scores(self._vectors[:self._size], query)
+            
+            k = min(k, scores.shape[0])
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            results = []
+            for position in top:
+                row = int(rows[position]) if rows is not None else int(position)
+                results.append((self._ids[row], self._texts[row], dict(self._metadatas[row]), float(scores[position])))
+            return results
+    
+    def query_many(self, vectors, k, where=None):
+        # Scores a block of queries with one matrix product (rows x queries)
+        # instead of one pass over the matrix per query
+        queries = _normalize_rows(vectors)
+        with self._lock.read():
+            if self._size == 0 or queries.shape[0] == 0:
+                return [[] for _ in range(queries.shape[0])]
+            rows = np.array(self._select(None, where), dtype=np.int64) if where else None
+            if rows is not None and rows.size == 0:
+                return [[] for _ in range(queries.shape[0])]
+            matrix = self._vectors[rows] if rows is not None else self._vectors[:self._size]
+            k = min(k, matrix.shape[0])
+            results = []
+            for start in range(0, queries.shape[0], Config.MULTI_QUERY_BLOCK):
+                scores = self._scores(matrix, queries[start:start + Config.MULTI_QUERY_BLOCK].T)
+                top = np.argpartition(-scores, k - 1, axis=0)[:k]
+                for column in range(scores.shape[1]):
+                    ranked = top[np.argsort(-scores[top[:, column], column]), column]
+                    hits = []
+                    for position in ranked:
+                        row = int(rows[position]) if rows is not None else int(position)
+                        hits.append((self._ids[row], self._texts[row], dict(self._metadatas[row]), float(scores[position, column])))
+                    results.append(hits)
+            return results
+    
+    def export(self):
+        with self._lock.read():
+            if self._size:
+                embeddings = np.asarray(self._vectors[:self._size], dtype=np.float32)
+            else:
+                embeddings = np.zeros((0, 0), dtype=np.float32)
+            return {
+                "ids": list(self._ids),
+                "documents": list(self._texts),
+                "metadatas": [dict(metadata) for metadata in self._metadatas],
+                "embeddings": embeddings
+            }
+    
+    def flush(self):
+        # Copy the rows under the read lock, so searches carry on while the files are written
+        with self._flush_lock:
+            with self._lock.read():
+                if not self._dirty or not self.path:
+                    return
+                vectors = np.array(self._vectors[:self._size]) if self._size else None
+                records = {"ids": list(self._ids), "documents": list(self._texts), "metadatas": list(self._metadatas)}
+                self._dirty = False
+            try:
+                self._write(vectors, records)
+            except BaseException:
+                self._dirty = True
+                raise
+    
+    def _write(self, vectors, records):
+        os.makedirs(self.path, exist_ok=True)
+        directory = tempfile.mkdtemp(prefix=self.SNAPSHOT_PREFIX, dir=self.path)
+        try:
+            if vectors is not None:
+                with open(os.path.join(directory, self.VECTORS_FILE), "wb") as f:
+                    np.save(f, vectors)
+                    f.flush()
+                    os.fsync(f.fileno())
+            with open(os.path.join(directory, self.RECORDS_FILE), "w", encoding="utf-8") as f:
+                json.dump(records, f)
+                f.flush()
+                os.fsync(f.fileno())
+            manifest_path = os.path.join(self.path, self.MANIFEST_FILE)
+            with open(f"{manifest_path}.tmp", "w", encoding="utf-8") as f:
+                json.dump({"snapshot": os.path.basename(directory), "chunks": len(records["ids"])}, f)
+            previous = self._snapshot_dir()
+            os.replace(f"{manifest_path}.tmp", manifest_path)
+        except BaseException:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+        # Keep the previous snapshot for processes still loading it; drop older
+        # ones and the files of the pre-snapshot layout
+        self._remove_files(keep={directory, previous})
+    
+    def _remove_files(self, keep=()):
+        for name in os.listdir(self.path):
+            file_path = os.path.join(self.path, name)
+            if name.startswith(self.SNAPSHOT_PREFIX) and file_path not in keep:
+                shutil.rmtree(file_path, ignore_errors=True)
+            elif name in (self.VECTORS_FILE, self.RECORDS_FILE) and self.path not in keep:
+                os.remove(file_path)
+    
+    def destroy(self):
+        # Remove the persisted files (used after migrating to Chroma). Waits for a
+        # flush in progress, so it can't write them back afterwards
+        with self._flush_lock, self._lock.write():
+            self._dirty = False
+            if self.path and os.path.isdir(self.path):
+                manifest_path = os.path.join(self.path, self.MANIFEST_FILE)
+                if os.path.exists(manifest_path):
+                    os.remove(manifest_path)
+                self._remove_files()
+    
+    def close(self):
+        self.flush()
+    
+    def stats(self):
+        return {
+            "backend": self.name,
+            "chunks": self._size,
+            "dtype": str(self.dtype),
+            "matrix_bytes": int(self._vectors.nbytes) if self._vectors is not None and not self._mapped else 0
+        }
+
+def open_backend(path, collection_name, backend=None):
+    # "auto" keeps small corpora in the NumPy backend; VectorStore migrates them
+    # to Chroma once they grow past NUMPY_BACKEND_MAX_CHUNKS
+    backend = backend or Config.VECTOR_BACKEND
+    if backend == "auto":
+        backend = "chroma" if ChromaBackend.exists(path) else "numpy"
+    if backend == "numpy":
+        return NumpyBackend(path, dtype=Config.NUMPY_BACKEND_DTYPE, mmap=Config.NUMPY_BACKEND_MMAP)
+    return ChromaBackend(path, collection_name)
+
+def benchmark(chunks=5000, queries=200, dim=384, k=10, seed=0):
+    # Latency and recall@k against exact float32 search, on random unit vectors
+    rng = np.random.default_rng(seed)
+    vectors = _normalize_rows(rng.standard_normal((chunks, dim)))
+    query_vectors = _normalize_rows(rng.standard_normal((queries, dim)))
+    truth = [set(np.argsort(-(vectors @ query))[:k].tolist()) for query in query_vectors]
+    ids = [str(i) for i in range(chunks)]
+    texts = [""] * chunks
+    metadatas = [{"doc_id": str(i % 50)} for i in range(chunks)]
+    
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="sarabot-bench-")
+    try:
+        backends = {
+            "numpy-float32": NumpyBackend(dtype="float32"),
+            "numpy-float16": NumpyBackend(dtype="float16"),
+            "chroma-hnsw": ChromaBackend(os.path.join(workdir, "chroma"), "benchmark")
+        }
+        for name, backend in backends.items():
+            start = time.perf_counter()
+            for offset in range(0, chunks, 1000):
+                backend.upsert(ids[offset:offset + 1000], texts[offset:offset + 1000],
+                               vectors[offset:offset + 1000], metadatas[offset:offset + 1000])
+            build_seconds = time.perf_counter() - start
+            
+            latencies, hits = [], 0
+            for query, expected in zip(query_vectors, truth):
+                start = time.perf_counter()
+                found = backend.query(query, k)
+                latencies.append(time.perf_counter() - start)
+                hits += len(expected & {int(chunk_id) for chunk_id, _, _, _ in found})
+            backend.close()
+            latencies.sort()
+            results[name] = {
+                "build_seconds": round(build_seconds, 3),
+                "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+                "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 3),
+                f"recall@{k}": round(hits / (k * queries), 4)
+            }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare vector index backends (latency and recall)")
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args(argv)
+    print(json.dumps(benchmark(args.chunks, args.queries, k=args.k), indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
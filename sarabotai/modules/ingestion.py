@@ -0,0 +1,110 @@
+from datetime import datetime
+from config import Config
+from modules.data_processing import DataProcessor
+from modules.vector_store import IncompleteWriteError, document_id, content_hash, split_hash, stream_hash
+from modules.web_scraper import WebScraper
+from utils.metrics import span
+
+# Stages reported through job.update(stage, progress, message)
+STAGES = ("fetch", "split", "embed", "commit")
+
+def ingest_urls(job, vector_store, urls, chunk_size=None, chunk_overlap=None, use_selenium=False):
+    # Fetch, parse, split and embed every changed URL first, then publish all of
+    # them in one commit, so the index never shows a half-processed batch.
+    # Returns {"articles": [metadata, ...], "unchanged": count, "chunks": count}.
+    processor = DataProcessor(
+        chunk_size=chunk_size or Config.DEFAULT_CHUNK_SIZE,
+        chunk_overlap=chunk_overlap if chunk_overlap is not None else Config.DEFAULT_CHUNK_OVERLAP
+    )
+    job.update("fetch", 0.0, f"Fetching {len(urls)} URL(s)")
+    if use_selenium:
+        # langchain_community (and Selenium) load only when this option is used
+        from langchain_community.document_loaders import SeleniumURLLoader
+        data = SeleniumURLLoader(urls=urls).load()
+        fetched_articles = WebScraper.get_many_article_metadata(urls)
+    else:
+        # Cached pages that are still current (or answered 304) are not parsed again
+        data, fetched_articles = processor.load_urls(urls, indexed_metadata=vector_store.get_document_metadata)
+    job.check()
+    
+    articles = {}
+    for url, metadata in zip(urls, fetched_articles):
+        metadata["source"] = url
+        metadata["doc_id"] = document_id(url)
+        articles[url] = metadata
+    unchanged = sum(1 for metadata in articles.values() if metadata.pop("unchanged", False))
+    
+    prepared = []
+    for position, doc in enumerate(data):
+        source = doc.metadata.get("source")
+        doc_hash = split_hash(content_hash(doc.page_content), *processor.split_settings())
+        if vector_store.get_document_hash(source) == doc_hash:
+            unchanged += 1
+            continue
+        job.update("split", position / max(len(data), 1), f"Splitting {source}")
+        with span("split", source=source):
+            chunks = processor.text_splitter.split_documents([doc])
+        job.update("embed", position / max(len(data), 1), f"Embedding {len(chunks)} chunks from {source}")
+        article = articles.get(source, {})
+        prepared.append(vector_store.prepare_document(source, chunks, doc_hash, {
+            "title": article.get("title", "Untitled Article"),
+            "description": article.get("description", "No description available"),
+            "chunk_size": processor.chunk_size,
+            "chunk_overlap": processor.chunk_overlap
+        }, check=job.check))
+    
+    job.check()
+    job.update("commit", 1.0, "Publishing to the index")
+    written = vector_store.commit_documents(prepared)
+    return {"articles": list(articles.values()), "unchanged": unchanged, "chunks": written}
+
+def ingest_upload(job, vector_store, stream, name, size=None, chunk_size=None, chunk_overlap=None):
+    # Uploaded text file. Files up to ATOMIC_UPLOAD_MAX_BYTES are embedded first and
+    # committed in one step; larger ones are streamed straight into the index in
+    # micro-batches (flat memory), replacing the previous version when complete
+    # and removed again if the upload fails or is cancelled.
+    processor = DataProcessor(
+        chunk_size=chunk_size or Config.DEFAULT_CHUNK_SIZE,
+        chunk_overlap=chunk_overlap if chunk_overlap is not None else Config.DEFAULT_CHUNK_OVERLAP
+    )
+    metadata = {
+        "title": name,
+        "description": "Uploaded text content",
+        "url": "local_file",
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "source": name,
+        "doc_id": document_id(name)
+    }
+    job.update("fetch", 0.0, f"Reading {name}")
+    doc_hash = split_hash(stream_hash(stream), *processor.split_settings())
+    if vector_store.get_document_hash(name) == doc_hash:
+        return {"articles": [metadata], "unchanged": 1, "chunks": 0}
+    
+    total_bytes = max(size or 0, 1)
+    
+    def on_progress(read):
+        job.check()
+        job.update("embed", min(read / total_bytes, 1.0), f"Embedding {name}")
+    
+    chunks = processor.iter_stream_documents(stream, metadata={"source": name}, on_progress=on_progress)
+    chunk_metadata = {
+        "title": metadata["title"],
+        "description": metadata["description"],
+        "chunk_size": processor.chunk_size,
+        "chunk_overlap": processor.chunk_overlap
+    }
+    if size is not None and size <= Config.ATOMIC_UPLOAD_MAX_BYTES:
+        prepared = vector_store.prepare_document(name, chunks, doc_hash, chunk_metadata, check=job.check)
+        job.update("commit", 1.0, "Publishing to the index")
+        written = vector_store.commit_documents([prepared])
+    else:
+        try:
+            written = vector_store.upsert_document(
+                name, chunks, doc_hash, chunk_metadata,
+                on_batch=lambda count: job.update("embed", message=f"Indexed {count} chunks of {name}")
+            )
+        except IncompleteWriteError as e:
+            # The partial version is still in the index: report it even if the job was cancelled
+            job.warning = str(e)
+            raise
+    return {"articles": [metadata], "unchanged": 0, "chunks": written}
@@ -0,0 +1,202 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from modules.term_index import STOPWORDS
+from utils.rw_lock import ReadWriteLock
+from utils.synced_table import SyncedTable
+
+# Unlike the topic chart, BM25 keeps short tokens and numbers so that exact
+# entities ("G7", "Q3", "2024", "AI") can be matched
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+SHORT_STOPWORDS = frozenset("""
+a an and are as at be but by for if in is it its of on or so the to was we he she his her not no
+you our has had who why how all any can did get got may new now one out own too two use via
+""".split())
+
+def tokenize(text):
+    return [
+        token for token in TOKEN_PATTERN.findall(text.lower())
+        if token not in SHORT_STOPWORDS and token not in STOPWORDS
+    ]
+
+class BM25Index:
+    # Okapi BM25 inverted index over chunks, built at ingest time next to the
+    # vectors. Postings map term -> {chunk_id: term frequency}. Chunk term counts
+    # are persisted as rows of a SyncedTable shared by all server processes;
+    # each process rebuilds the postings from them on load and replays the
+    # chunks other processes changed before it searches or writes.
+    def __init__(self, path=None, k1=1.5, b=0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._chunks = {}  # chunk_id -> (doc_id, length, Counter)
+        self._postings = {}
+        self._total_length = 0
+        self._pending = {}  # chunk_id -> row to write on flush (None = delete)
+        self._lock = ReadWriteLock()  # searches share it
+        self._table = SyncedTable(path, "chunks") if path else None
+        self._seq = 0
+        if self._table is not None:
+            self._load()
+    
+    def _load(self):
+        rows, self._seq = self._table.load()
+        self._chunks, self._postings, self._total_length = {}, {}, 0
+        rows.update(self._pending)  # unflushed changes stay visible
+        for chunk_id, row in rows.items():
+            if row is not None:
+                doc_id, terms = json.loads(row)
+                self._add(chunk_id, doc_id, Counter(terms))
+    
+    def import_json(self, json_path):
+        # One-off migration of a bm25.json written by earlier versions
+        try:
+            with open(json_path, encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock.write():
+            if not self._chunks:
+                for chunk_id, (doc_id, terms) in stored.items():
+                    self._add(chunk_id, doc_id, Counter(terms))
+                    self._pending[chunk_id] = json.dumps([doc_id, terms])
+                self.flush()
+        os.remove(json_path)
+    
+    def _apply(self, changed):
+        # Chunks another process changed; our own unflushed changes win
+        if changed is None:
+            self._load()
+            return
+        for chunk_id, row in changed.items():
+            if chunk_id in self._pending:
+                continue
+            if row is None:
+                self._remove(chunk_id)
+            else:
+                doc_id, terms = json.loads(row)
+                self._add(chunk_id, doc_id, Counter(terms))
+    
+    def sync(self):
+        if self._table is None or not self._table.changed_elsewhere():
+            return
+        with self._lock.write():
+            changed, self._seq = self._table.changes(self._seq)
+            self._apply(changed)
+    
+    def _add(self, chunk_id, doc_id, terms):
+        self._remove(chunk_id)
+        length = sum(terms.values())
+        self._chunks[chunk_id] = (doc_id, length, terms)
+        self._total_length += length
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[chunk_id] = frequency
+    
+    def _remove(self, chunk_id):
+        entry = self._chunks.pop(chunk_id, None)
+        if entry is None:
+            return
+        _, length, terms = entry
+        self._total_length -= length
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+    
+    def add_chunks(self, doc_id, ids, texts):
+        with self._lock.write():
+            for chunk_id, text in zip(ids, texts):
+                terms = Counter(tokenize(text))
+                self._add(chunk_id, doc_id, terms)
+                self._pending[chunk_id] = json.dumps([doc_id, terms])
+    
+    def remove_chunks(self, ids):
+        with self._lock.write():
+            for chunk_id in ids:
+                self._remove(chunk_id)
+                self._pending[chunk_id] = None
+    
+    def remove_document(self, doc_id):
+        with self._lock.write():
+            self.remove_chunks([chunk_id for chunk_id, entry in self._chunks.items() if entry[0] == doc_id])
+    
+    def search(self, query, k=10, scope=None):
+        # [(chunk_id, score), ...] best first; only chunks sharing a query term score.
+        # scope: optional set of document version keys (chunk ID prefixes) to search in
+        terms = set(tokenize(query))
+        self.sync()
+        with self._lock.read():
+            count = len(self._chunks)
+            if not terms or count == 0:
+                return []
+            average_length = self._total_length / count
+            scores = Counter()
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, frequency in postings.items():
+                    if scope is not None and chunk_id.rsplit(":", 1)[0] not in scope:
+                        continue
+                    length = self._chunks[chunk_id][1]
+                    norm = self.k1 * (1 - self.b + self.b * length / average_length)
+                    scores[chunk_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+            return scores.most_common(k)
+    
+    def flush(self):
+        # Persist the chunks changed since the last flush (rows, not the whole index)
+        with self._lock.write():
+            if not self._pending or self._table is None:
+                self._pending = {}
+                return
+            changed, self._seq = self._table.write(self._pending, self._seq)
+            pending, self._pending = self._pending, {}
+            if changed is None:
+                self._load()
+            else:
+                self._apply({chunk_id: row for chunk_id, row in changed.items() if chunk_id not in pending})
+    
+    def close(self):
+        if self._table is not None:
+            self._table.close()
+    
+    def __len__(self):
+        self.sync()
+        return len(self._chunks)
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_lexical_index(directory):
+    # One BM25Index per store directory per process, persisted next to the vectors
+    # (and shared through SQLite with the other processes using the directory)
+    directory = os.path.abspath(directory)
+    with _indexes_lock:
+        if directory not in _indexes:
+            index = BM25Index(os.path.join(directory, "bm25.sqlite3"))
+            legacy_path = os.path.join(directory, "bm25.json")
+            if os.path.exists(legacy_path):
+                index.import_json(legacy_path)
+            _indexes[directory] = index
+        return _indexes[directory]
+
+def drop_lexical_index(directory):
+    with _indexes_lock:
+        index = _indexes.pop(os.path.abspath(directory), None)
+    if index is not None:
+        index.close()
+
+def reciprocal_rank_fusion(rankings, k=60):
+    # rankings: lists of ids, best first. Returns [(id, fused score), ...] best first
+    scores = Counter()
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] += 1.0 / (k + rank + 1)
+    return scores.most_common()
@@ -0,0 +1,173 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from config import Config
+
+# Same limit sentence-transformers uses for all-MiniLM-L6-v2
+MAX_SEQ_LENGTH = 256
+
+def default_model_dir(model_name=None):
+    model_name = model_name or Config.EMBEDDING_MODEL_NAME
+    return Config.EMBEDDING_MODEL_DIR or os.path.join(Config.CACHE_DIR, "onnx", model_name.replace("/", "__"))
+
+def export_onnx_model(model_name=None, model_dir=None, quantize=False):
+    # One-time export of the Hugging Face model to ONNX (needs optimum, and the
+    # model either online or in the local HF cache). Afterwards model_dir is
+    # self-contained and loads offline.
+    model_name = model_name or Config.EMBEDDING_MODEL_NAME
+    model_dir = model_dir or default_model_dir(model_name)
+    model_path = os.path.join(model_dir, "model.onnx")
+    if not os.path.exists(model_path):
+        try:
+            from optimum.onnxruntime import ORTModelForFeatureExtraction
+            from transformers import AutoTokenizer
+        except ImportError:
+            raise ImportError("Exporting to ONNX requires: pip install optimum[onnxruntime]")
+        ORTModelForFeatureExtraction.from_pretrained(model_name, export=True).save_pretrained(model_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(model_dir)
+    
+    if not quantize:
+        return model_path
+    quantized_path = os.path.join(model_dir, "model_int8.onnx")
+    if not os.path.exists(quantized_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+    return quantized_path
+
+class OnnxEmbedder(Embeddings):
+    # all-MiniLM-L6-v2 on ONNX Runtime (optionally dynamic int8), with the same
+    # mean pooling + L2 normalisation as the sentence-transformers pipeline.
+    # Does not import torch.
+    def __init__(self, model_name=None, model_dir=None, quantize=False, batch_size=None, threads=None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+        
+        self.model_name = model_name or Config.EMBEDDING_MODEL_NAME
+        self.model_dir = model_dir or default_model_dir(self.model_name)
+        self.quantize = quantize
+        self.batch_size = batch_size or Config.EMBEDDING_BATCH_SIZE
+        model_path = export_onnx_model(self.model_name, self.model_dir, quantize=quantize)
+        
+        self.tokenizer = Tokenizer.from_file(os.path.join(self.model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id("[PAD]") or 0, pad_token="[PAD]")
+        
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads or Config.EMBEDDING_WORKERS:
+            options.intra_op_num_threads = threads or Config.EMBEDDING_WORKERS
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        
+        self.texts_encoded = 0
+        self.encode_seconds = 0.0
+    
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        
+        token_embeddings = self.session.run(None, feeds)[0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+    
+    def encode(self, texts):
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        start = time.perf_counter()
+        # Length-sorted batches keep padding (and wasted compute) small
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        vectors = None
+        for offset in range(0, len(texts), self.batch_size):
+            indices = order[offset:offset + self.batch_size]
+            batch_vectors = self._encode_batch([texts[i] for i in indices])
+            if vectors is None:
+                vectors = np.empty((len(texts), batch_vectors.shape[1]), dtype=np.float32)
+            vectors[indices] = batch_vectors
+        self.texts_encoded += len(texts)
+        self.encode_seconds += time.perf_counter() - start
+        return vectors
+    
+    def embed_documents(self, texts):
+        return self.encode(texts).tolist()
+    
+    def embed_query(self, text):
+        return self.encode([text])[0].tolist()
+    
+    def stats(self):
+        return {
+            "backend": "onnx-int8" if self.quantize else "onnx",
+            "batch_size": self.batch_size,
+            "workers": self.session.get_session_options().intra_op_num_threads or os.cpu_count(),
+            "texts_encoded": self.texts_encoded,
+            "chunks_per_second": self.texts_encoded / self.encode_seconds if self.encode_seconds else 0.0
+        }
+
+def parity_check(reference, candidate, texts):
+    # Cosine agreement between two embedders on the same texts (1.0 = identical)
+    expected = np.asarray(reference.embed_documents(texts), dtype=np.float32)
+    actual = np.asarray(candidate.embed_documents(texts), dtype=np.float32)
+    expected /= np.linalg.norm(expected, axis=1, keepdims=True)
+    actual /= np.linalg.norm(actual, axis=1, keepdims=True)
+    cosines = (expected * actual).sum(axis=1)
+    return {"min_cosine": float(cosines.min()), "mean_cosine": float(cosines.mean())}
+
+def benchmark(embedder, texts, repeats=3):
+    embedder.embed_documents(texts[:8])  # warm-up
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        embedder.embed_documents(texts)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    return {"texts": len(texts), "best_seconds": round(best, 4), "texts_per_second": round(len(texts) / best, 1)}
+
+def _sample_texts(count):
+    sentences = [
+        "The central bank held interest rates steady amid signs of cooling inflation.",
+        "Researchers unveiled a battery chemistry that charges in under ten minutes.",
+        "The championship final drew a record audience across streaming platforms.",
+        "Lawmakers debated new rules for data privacy and artificial intelligence.",
+        "Heavy rainfall caused flooding in several coastal towns over the weekend."
+    ]
+    return [" ".join(sentences[(i + j) % len(sentences)] for j in range(1 + i % 6)) for i in range(count)]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export, verify and benchmark the ONNX MiniLM embedder")
+    parser.add_argument("command", choices=["export", "parity", "benchmark"])
+    parser.add_argument("--model-dir", default=None)
+    parser.add_argument("--int8", action="store_true", help="use dynamic int8 quantization")
+    parser.add_argument("--texts", type=int, default=512)
+    args = parser.parse_args(argv)
+    
+    if args.command == "export":
+        print(export_onnx_model(model_dir=args.model_dir, quantize=args.int8))
+        return 0
+    
+    from modules.embedding_engine import EmbeddingEngine
+    texts = _sample_texts(args.texts)
+    reference = EmbeddingEngine(Config.EMBEDDING_MODEL_NAME, device="cpu")
+    candidate = OnnxEmbedder(model_dir=args.model_dir, quantize=args.int8)
+    if args.command == "parity":
+        result = parity_check(reference, candidate, texts)
+        print(f"min cosine {result['min_cosine']:.5f}, mean cosine {result['mean_cosine']:.5f}")
+        return 0 if result["min_cosine"] >= Config.ONNX_PARITY_MIN_COSINE else 1
+    
+    torch_result = benchmark(reference, texts)
+    onnx_result = benchmark(candidate, texts)
+    print(f"torch: {torch_result['texts_per_second']} texts/s")
+    print(f"{candidate.stats()['backend']}: {onnx_result['texts_per_second']} texts/s "
+          f"({onnx_result['texts_per_second'] / torch_result['texts_per_second']:.2f}x)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+import importlib
+import threading
+import time
+from config import Config
+
+# Imported in the background after the first page is rendered, heaviest first.
+# Everything here is otherwise imported on first use by the feature that needs it.
+PREWARM_MODULES = (
+    "numpy",
+    "langchain_core.documents",
+    "langchain_text_splitters",
+    "openai",
+    "bs4",
+    "pandas",
+    "plotly.express",
+    "modules.embedding_cache",
+    "modules.embedding_engine"
+)
+
+class Prewarmer:
+    # Imports the heavy libraries and loads the embedding model in one daemon
+    # thread per process, so startup only pays for what the first page needs and
+    # the first question or ingest doesn't pay for the rest. A module the main
+    # thread needs before the thread got to it is imported by the main thread;
+    # Python's per-module import locks keep the two from importing it twice.
+    def __init__(self, modules=PREWARM_MODULES):
+        self.modules = modules
+        self._thread = None
+        self._lock = threading.Lock()
+        self._timings = {}  # module -> seconds (0.0 if it was already imported)
+        self._errors = {}  # module -> error message
+        self._started_at = None
+        self._finished_at = None
+    
+    def start(self):
+        # Idempotent; does nothing in "lazy" startup mode
+        if Config.STARTUP_MODE != "prewarm":
+            return False
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self._started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name="prewarm", daemon=True)
+        self._thread.start()
+        return True
+    
+    def _run(self):
+        for name in self.modules:
+            start = time.perf_counter()
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                # Optional dependencies (e.g. plotly on an API-only host) may be missing
+                self._errors[name] = f"{type(e).__name__}: {e}"
+                continue
+            self._timings[name] = time.perf_counter() - start
+        
+        from modules.embeddings import embedding_registry
+        try:
+            embedding_registry.get()
+        except Exception as e:
+            # Loading errors resurface on the first foreground get()
+            self._errors["embedding_model"] = f"{type(e).__name__}: {e}"
+        self._finished_at = time.time()
+    
+    def wait(self, timeout=None):
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.finished
+    
+    @property
+    def finished(self):
+        return self._finished_at is not None
+    
+    def stats(self):
+        return {
+            "mode": Config.STARTUP_MODE,
+            "started": self._started_at is not None,
+            "finished": self.finished,
+            "seconds": round(self._finished_at - self._started_at, 3) if self.finished else None,
+            "import_seconds": {name: round(seconds, 3) for name, seconds in self._timings.items()},
+            "errors": dict(self._errors)
+        }
+
+prewarmer = Prewarmer()
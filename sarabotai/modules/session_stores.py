@@ -0,0 +1,207 @@
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+from modules.document_refs import get_document_refs
+from modules.lexical_index import drop_lexical_index
+from modules.term_index import drop_term_index
+from modules.vector_store import VectorStore, store_handles
+
+STORE_PREFIX = "chroma_db_"
+
+def directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+class SessionStoreManager:
+    # Lifecycle of the per-session index directories (<root>/chroma_db_<session_id>).
+    # Tracks last access, size on disk and in-memory index size of each session,
+    # evicts idle sessions after SESSION_TTL and the least recently used ones
+    # while the disk or memory quota is exceeded, and removes directories left
+    # behind by earlier server processes. Replaces the old atexit hook, which
+    # only ever saw the last script run's path. In shared mode the same is done
+    # for document references: they are kept alive while the session is used and
+    # released once idle, whichever process created them.
+    def __init__(self, root=None, ttl=None, disk_quota=None, memory_quota=None):
+        self.root = root or Config.SESSION_STORE_ROOT
+        self.ttl = ttl or Config.SESSION_TTL
+        self.disk_quota = disk_quota or Config.SESSION_DISK_QUOTA_BYTES
+        self.memory_quota = memory_quota or Config.SESSION_MEMORY_QUOTA_BYTES
+        self._sessions = OrderedDict()  # session_id -> {"last_access", "disk_bytes", "memory_bytes"}, LRU order
+        self._evicted = OrderedDict()
+        self._lock = threading.Lock()
+        self._started = False
+        self.evictions = 0
+        self.orphans_removed = 0
+        self.stale_sessions_released = 0
+    
+    def path_for(self, session_id):
+        return os.path.join(self.root, f"{STORE_PREFIX}{session_id}")
+    
+    def start(self):
+        # Once per process: the janitor cleans up orphans, then evicts periodically.
+        # Orphan cleanup walks every old store directory, so it runs in the
+        # background instead of delaying the first page
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        thread = threading.Thread(target=self._janitor, name="session-store-janitor", daemon=True)
+        thread.start()
+    
+    def _janitor(self):
+        try:
+            self.cleanup_orphans()
+        except Exception:
+            pass
+        while True:
+            try:
+                self.release_stale_references()
+            except Exception:
+                pass
+            time.sleep(Config.SESSION_JANITOR_INTERVAL)
+            try:
+                self.evict()
+            except Exception:
+                pass
+    
+    def touch(self, session_id):
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                entry = self._sessions[session_id] = {"last_access": 0.0, "disk_bytes": 0, "memory_bytes": 0, "refs_touched": 0.0}
+            entry["last_access"] = now
+            self._sessions.move_to_end(session_id)
+            # Shared mode: other processes' janitors judge idleness by the reference table
+            touch_refs = Config.SHARED_COLLECTION and now - entry["refs_touched"] > Config.SESSION_JANITOR_INTERVAL
+            if touch_refs:
+                entry["refs_touched"] = now
+        if touch_refs:
+            get_document_refs(Config.CHROMA_PERSIST_DIR).touch(session_id)
+    
+    def was_evicted(self, session_id):
+        # True once after the session's index was removed for being idle or over quota
+        with self._lock:
+            return self._evicted.pop(session_id, None) is not None
+    
+    def refresh(self, session_id, memory_bytes=0):
+        # Re-measure a session after it was written to, then enforce the quotas
+        size = directory_size(self.path_for(session_id))
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                entry["disk_bytes"] = size
+                entry["memory_bytes"] = memory_bytes
+        self.evict(protect=session_id)
+    
+    def evict(self, protect=None):
+        # Idle sessions first, then least recently used until both quotas hold
+        now = time.time()
+        victims = []
+        with self._lock:
+            for session_id, entry in self._sessions.items():
+                if session_id != protect and now - entry["last_access"] > self.ttl:
+                    victims.append(session_id)
+            disk = sum(entry["disk_bytes"] for entry in self._sessions.values())
+            memory = sum(entry["memory_bytes"] for entry in self._sessions.values())
+            for session_id in victims:
+                disk -= self._sessions[session_id]["disk_bytes"]
+                memory -= self._sessions[session_id]["memory_bytes"]
+            for session_id, entry in self._sessions.items():
+                if disk <= self.disk_quota and memory <= self.memory_quota:
+                    break
+                if session_id == protect or session_id in victims:
+                    continue
+                victims.append(session_id)
+                disk -= entry["disk_bytes"]
+                memory -= entry["memory_bytes"]
+        for session_id in victims:
+            self.evict_session(session_id, reason="evicted")
+        return len(victims)
+    
+    def evict_session(self, session_id, reason=None):
+        # Close the session's handles and delete its index directory; in shared
+        # mode release its document references instead
+        if Config.SHARED_COLLECTION:
+            VectorStore(session_id=session_id).release_session()
+        path = self.path_for(session_id)
+        store_handles.invalidate(session_id=session_id)
+        self._remove(path)
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self.evictions += 1
+            if reason:
+                self._evicted[session_id] = reason
+                while len(self._evicted) > 1000:
+                    self._evicted.popitem(last=False)
+    
+    def _remove(self, path):
+        store_handles.invalidate(path)
+        drop_term_index(path)
+        drop_lexical_index(path)
+        shutil.rmtree(path, ignore_errors=True)
+    
+    def cleanup_orphans(self):
+        # Directories no live session owns and nobody touched within the TTL
+        # (left by crashed or restarted servers); other live processes' stores are kept
+        if not os.path.isdir(self.root):
+            return 0
+        now = time.time()
+        removed = 0
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if not name.startswith(STORE_PREFIX) or not os.path.isdir(path):
+                continue
+            with self._lock:
+                if name[len(STORE_PREFIX):] in self._sessions:
+                    continue
+            try:
+                idle = now - max(os.path.getmtime(os.path.join(root, entry))
+                                 for root, dirs, files in os.walk(path) for entry in dirs + files + ["."])
+            except (OSError, ValueError):
+                continue
+            if idle > self.ttl:
+                self._remove(path)
+                removed += 1
+        self.orphans_removed += removed
+        return removed
+    
+    def release_stale_references(self):
+        # Shared mode: sessions of crashed or restarted server processes are never
+        # evicted by anyone, so their references are released once they have gone
+        # unused for the TTL (live sessions refresh them through touch())
+        if not Config.SHARED_COLLECTION or not os.path.isdir(Config.CHROMA_PERSIST_DIR):
+            return 0
+        with self._lock:
+            live = set(self._sessions)
+        released = 0
+        for session_id in get_document_refs(Config.CHROMA_PERSIST_DIR).idle_sessions(time.time() - self.ttl):
+            if session_id in live:
+                continue  # evict() handles this process's sessions
+            VectorStore(session_id=session_id).release_session()
+            released += 1
+        with self._lock:
+            self.stale_sessions_released += released
+        return released
+    
+    def stats(self):
+        with self._lock:
+            return {
+                "live_sessions": len(self._sessions),
+                "disk_bytes": sum(entry["disk_bytes"] for entry in self._sessions.values()),
+                "memory_bytes": sum(entry["memory_bytes"] for entry in self._sessions.values()),
+                "evictions": self.evictions,
+                "orphans_removed": self.orphans_removed,
+                "stale_sessions_released": self.stale_sessions_released
+            }
+
+session_stores = SessionStoreManager()
@@ -0,0 +1,145 @@
+import contextvars
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from utils.kv_cache import SQLiteCache
+from utils.llm_retry import complete_with_retries
+
+MAP_PROMPT = """Summarize the following excerpt. Keep the key facts, figures, names and the overall tone.
+
+{text}"""
+
+REDUCE_PROMPT = """Combine the following partial summaries into one coherent summary. Keep the key facts, figures, names and the overall tone.
+
+{text}"""
+
+REPORT_PROMPT = """
+Analyze the following text content and provide a comprehensive summary report:
+
+Content:
+{text}
+
+Please provide:
+1. Key themes and topics covered
+2. Notable facts or statistics mentioned
+3. Overall sentiment analysis
+
+Format your response with clear headings for each section.
+"""
+
+_summary_cache = None
+
+def get_summary_cache():
+    global _summary_cache
+    if _summary_cache is None:
+        _summary_cache = SQLiteCache(os.path.join(Config.CACHE_DIR, "summaries.sqlite"), table="summaries")
+    return _summary_cache
+
+class MapReduceSummarizer:
+    # Hierarchical summarizer: chunk groups are summarized concurrently (map),
+    # each document's partials are folded into one summary, and document
+    # summaries are reduced level by level into the final report. Every LLM
+    # result is cached by a hash of its prompt, so adding an article only
+    # recomputes that article's branch and the levels above it.
+    def __init__(self, llm, max_workers=None, group_chars=None, cache=None, temperature=0.3):
+        self.llm = llm
+        self.max_workers = max_workers or Config.SUMMARY_MAX_WORKERS
+        self.group_chars = group_chars or Config.SUMMARY_GROUP_CHARS
+        self.cache = cache if cache is not None else get_summary_cache()
+        self.temperature = temperature
+        self.llm_calls = 0
+        self.cache_hits = 0
+    
+    def _cache_key(self, prompt, max_tokens):
+        payload = f"{Config.OPENAI_MODEL}\x00{self.temperature}\x00{max_tokens}\x00{prompt}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def _complete(self, prompt, max_tokens=None):
+        max_tokens = max_tokens or Config.SUMMARY_MAX_TOKENS
+        key = self._cache_key(prompt, max_tokens)
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is not None:
+            self.cache_hits += 1
+            return cached.decode("utf-8")
+        
+        result = complete_with_retries(self.llm, prompt, temperature=self.temperature, max_tokens=max_tokens)
+        self.llm_calls += 1
+        if self.cache is not None:
+            self.cache.put(key, result.encode("utf-8"))
+        return result
+    
+    def _group(self, texts, min_size=1):
+        # Greedy grouping of consecutive texts under group_chars. With min_size=2
+        # every group (except a lone leftover) holds at least two texts, so each
+        # reduce level strictly shrinks the list.
+        groups, current, size = [], [], 0
+        for text in texts:
+            if current and size + len(text) > self.group_chars and len(current) >= min_size:
+                groups.append(current)
+                current, size = [], 0
+            current.append(text)
+            size += len(text)
+        if current:
+            groups.append(current)
+        return groups
+    
+    def _run(self, prompts):
+        # Each call runs in a copy of the caller's context (keeps the metrics session)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, self._complete, prompt) for prompt in prompts]
+            return [future.result() for future in futures]
+    
+    def _reduce_each(self, partial_lists):
+        # Fold every list to a single summary; all lists advance one level per round
+        while any(len(partials) > 1 for partials in partial_lists):
+            jobs = []
+            for index, partials in enumerate(partial_lists):
+                if len(partials) > 1:
+                    for group in self._group(partials, min_size=2):
+                        jobs.append((index, REDUCE_PROMPT.format(text="\n\n".join(group))))
+            results = self._run([prompt for _, prompt in jobs])
+            next_lists = [partials if len(partials) == 1 else [] for partials in partial_lists]
+            for (index, _), result in zip(jobs, results):
+                next_lists[index].append(result)
+            partial_lists = next_lists
+        return [partials[0] for partials in partial_lists]
+    
+    def summarize(self, documents, final_prompt=REPORT_PROMPT):
+        # documents: {source: [chunk texts in order]}
+        # Oversized texts are cut into group-sized slices first
+        documents = {
+            source: [text[start:start + self.group_chars] for text in texts for start in range(0, len(text), self.group_chars)]
+            for source, texts in documents.items()
+        }
+        documents = {source: texts for source, texts in documents.items() if texts}
+        if not documents:
+            return ""
+        
+        # Small corpora fit in a single request
+        total_chars = sum(len(text) for texts in documents.values() for text in texts)
+        if total_chars <= self.group_chars:
+            combined = "\n\n".join(text for texts in documents.values() for text in texts)
+            return self._complete(final_prompt.format(text=combined), max_tokens=Config.OPENAI_MAX_TOKENS)
+        
+        # Map: summarize every chunk group of every document concurrently
+        jobs = []
+        for index, texts in enumerate(documents.values()):
+            for group in self._group(texts):
+                jobs.append((index, MAP_PROMPT.format(text="\n\n".join(group))))
+        results = self._run([prompt for _, prompt in jobs])
+        partial_lists = [[] for _ in documents]
+        for (index, _), result in zip(jobs, results):
+            partial_lists[index].append(result)
+        
+        # One summary per document, then reduce across documents until it fits
+        summaries = self._reduce_each(partial_lists)
+        while sum(len(summary) for summary in summaries) > self.group_chars and len(summaries) > 1:
+            summaries = self._run([
+                REDUCE_PROMPT.format(text="\n\n".join(group))
+                for group in self._group(summaries, min_size=2)
+            ])
+        return self._complete(final_prompt.format(text="\n\n".join(summaries)), max_tokens=Config.OPENAI_MAX_TOKENS)
+    
+    def stats(self):
+        return {"llm_calls": self.llm_calls, "cache_hits": self.cache_hits}
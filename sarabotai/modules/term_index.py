@@ -0,0 +1,156 @@
+import json
+import os
+import re
+import threading
+from collections import Counter
+from utils.synced_table import SyncedTable
+
+# Whole words; the topic chart keeps the alphabetic ones of 4+ letters, case-folded
+TOKEN_PATTERN = re.compile(r"\w+")
+
+STOPWORDS = frozenset("""
+about above after again against also among another around because been before being below between
+both came come could does doing down during each even every from further have having here into
+itself just like made make many more most much must only other ought over said same says shall
+should since some such than that their theirs them then there these they this those through under
+until upon very want were what when where which while will with within without would your yours
+year years according told still well back first last next including however
+""".split())
+
+def count_terms(texts):
+    # Filter whole words, so "covid19" or "data_2024" add nothing rather than "covid" or "data"
+    counts = Counter(
+        word for word in TOKEN_PATTERN.findall(" ".join(texts).lower())
+        if len(word) >= 4 and word.isalpha()
+    )
+    for word in STOPWORDS.intersection(counts):
+        del counts[word]
+    return counts
+
+class TermIndex:
+    # Corpus term statistics maintained at ingest time, per document, so the
+    # Topic Analysis tab reads top terms without a vector query. Each document's
+    # counts are one row of a SyncedTable shared by all server processes; the
+    # totals are kept in memory and catch up with other processes' changes.
+    def __init__(self, path=None):
+        self.path = path
+        self._doc_terms = {}
+        self._totals = Counter()
+        self._ranked = None
+        self._lock = threading.Lock()
+        self._table = SyncedTable(path, "documents") if path else None
+        self._seq = 0
+        if self._table is not None:
+            self._load()
+    
+    def _load(self):
+        rows, self._seq = self._table.load()
+        self._doc_terms = {doc_id: Counter(json.loads(terms)) for doc_id, terms in rows.items()}
+        self._totals = Counter()
+        for terms in self._doc_terms.values():
+            self._totals.update(terms)
+        self._ranked = None
+    
+    def import_json(self, json_path):
+        # One-off migration of a terms.json written by earlier versions
+        try:
+            with open(json_path, encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            if not self._doc_terms:
+                self._write({doc_id: Counter(terms) for doc_id, terms in stored.items()})
+        os.remove(json_path)
+    
+    def _apply(self, changed):
+        if changed is None:
+            self._load()
+            return
+        for doc_id, terms in changed.items():
+            self._set(doc_id, None if terms is None else Counter(json.loads(terms)))
+    
+    def _set(self, doc_id, terms):
+        previous = self._doc_terms.pop(doc_id, None)
+        if previous:
+            self._totals.subtract(previous)
+        if terms is not None:
+            self._doc_terms[doc_id] = terms
+            self._totals.update(terms)
+        self._totals = +self._totals  # drop zero and negative counts
+        self._ranked = None
+    
+    def _write(self, documents):
+        # {doc_id: Counter, or None to remove}: applied here and persisted as rows
+        for doc_id, terms in documents.items():
+            self._set(doc_id, terms)
+        if self._table is not None:
+            rows = {doc_id: None if terms is None else json.dumps(terms) for doc_id, terms in documents.items()}
+            changed, self._seq = self._table.write(rows, self._seq)
+            self._apply(changed if changed is None else {
+                doc_id: terms for doc_id, terms in changed.items() if doc_id not in documents
+            })
+    
+    def sync(self):
+        if self._table is None or not self._table.changed_elsewhere():
+            return
+        with self._lock:
+            changed, self._seq = self._table.changes(self._seq)
+            self._apply(changed)
+    
+    def add_document(self, doc_id, texts):
+        # Replaces any counts previously recorded for doc_id
+        self.set_document_counts(doc_id, count_terms(texts))
+    
+    def set_document_counts(self, doc_id, terms):
+        with self._lock:
+            self._write({doc_id: Counter(terms)})
+    
+    def remove_document(self, doc_id):
+        with self._lock:
+            if doc_id in self._doc_terms:
+                self._write({doc_id: None})
+    
+    def close(self):
+        if self._table is not None:
+            self._table.close()
+    
+    def top_terms(self, k=10, keys=None):
+        # Ranking is rebuilt once per change; reads are a slice, O(k).
+        # keys restricts the counts to some documents (aggregated on demand).
+        self.sync()
+        with self._lock:
+            if keys is not None:
+                totals = Counter()
+                for key in keys:
+                    totals.update(self._doc_terms.get(key, {}))
+                return totals.most_common(k)
+            if self._ranked is None:
+                self._ranked = self._totals.most_common()
+            return self._ranked[:k]
+    
+    def __len__(self):
+        self.sync()
+        return len(self._doc_terms)
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_term_index(directory):
+    # One TermIndex per store directory per process, persisted next to the vectors
+    # (and shared through SQLite with the other processes using the directory)
+    directory = os.path.abspath(directory)
+    with _indexes_lock:
+        if directory not in _indexes:
+            index = TermIndex(os.path.join(directory, "terms.sqlite3"))
+            legacy_path = os.path.join(directory, "terms.json")
+            if os.path.exists(legacy_path):
+                index.import_json(legacy_path)
+            _indexes[directory] = index
+        return _indexes[directory]
+
+def drop_term_index(directory):
+    with _indexes_lock:
+        index = _indexes.pop(os.path.abspath(directory), None)
+    if index is not None:
+        index.close()
@@ -1,48 +1,675 @@
+import hashlib
 import os
 import shutil
-from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
+import threading
+from collections import Counter, OrderedDict
+import numpy as np
 from config import Config
+from modules.document_refs import get_document_refs
+from modules.embeddings import get_embeddings
+from modules.index_backends import ChromaBackend, NumpyBackend, open_backend
+from modules.lexical_index import get_lexical_index, drop_lexical_index, reciprocal_rank_fusion
+from modules.term_index import count_terms, get_term_index, drop_term_index
+from utils.metrics import span
+from utils.rw_lock import ReadWriteLock
+
+def document_id(source):
+    # Stable per-document key derived from the URL (or file name)
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def stream_hash(stream, block_size=1024 * 1024):
+    # Hash a binary file object block by block, then rewind it
+    digest = hashlib.sha256()
+    for block in iter(lambda: stream.read(block_size), b""):
+        digest.update(block)
+    stream.seek(0)
+    return digest.hexdigest()
+
+def split_hash(doc_hash, chunk_size, chunk_overlap):
+    # Hash a document is indexed under: its content plus the splitter settings,
+    # so re-ingesting with another chunk size or overlap re-chunks it
+    return hashlib.sha256(f"{doc_hash}:{chunk_size}:{chunk_overlap}".encode("utf-8")).hexdigest()
+
+def version_key(doc_id, doc_hash):
+    # Identifies one version of a document; prefix of all its chunk IDs
+    return f"{doc_id}:{doc_hash[:12]}"
+
+def chunk_id(doc_id, doc_hash, index):
+    # Same document content always produces the same chunk IDs
+    return f"{version_key(doc_id, doc_hash)}:{index}"
+
+def committed_where(doc_id, doc_hash=None):
+    # Chunk 0 of a version is written last, in the same step that removes the
+    # previous version: a version is committed iff its first chunk is stored
+    clauses = [{"doc_id": doc_id}, {"chunk_index": 0}]
+    if doc_hash is not None:
+        clauses.append({"content_hash": doc_hash})
+    return {"$and": clauses}
+
+class IncompleteWriteError(Exception):
+    # A failed streaming write whose partial chunks could not be removed
+    pass
+
+class StoreHandleCache:
+    # Process-wide cache of open index backends keyed by (session, path, collection),
+    # so Streamlit reruns don't pay the open/load cost on every interaction.
+    # Each entry also memoizes derived state (the corpus fingerprint) that is
+    # invalidated whenever the store is written to, and carries the reader/writer
+    # lock that makes multi-document commits atomic for searches while letting
+    # searches run concurrently with each other.
+    def __init__(self, max_handles=None):
+        self.max_handles = max_handles or Config.STORE_HANDLE_CACHE_SIZE
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.opens = 0
+        self.reuses = 0
+    
+    def get(self, key, factory):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.reuses += 1
+                return entry
+        
+        entry = {"store": factory(), "fingerprint": None, "lock": ReadWriteLock()}
+        evicted = []
+        with self._lock:
+            # Another thread may have opened the same store meanwhile
+            if key in self._entries:
+                evicted.append(entry)
+                entry = self._entries[key]
+            else:
+                self._entries[key] = entry
+                self.opens += 1
+                while len(self._entries) > self.max_handles:
+                    evicted.append(self._entries.popitem(last=False)[1])
+        for stale in evicted:
+            stale["store"].close()
+        return entry
+    
+    def peek(self, key):
+        with self._lock:
+            return self._entries.get(key)
+    
+    def replace(self, key, store):
+        # Swap the backend behind a key (e.g. after migrating NumPy -> Chroma)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {"store": store, "fingerprint": None, "lock": ReadWriteLock()}
+            else:
+                entry["store"] = store
+            return entry
+    
+    def invalidate(self, path=None, session_id=None):
+        # Close and drop every handle for the given path and/or session
+        path = os.path.abspath(path) if path else None
+        with self._lock:
+            keys = [
+                key for key in self._entries
+                if (path is None or key[1] == path) and (session_id is None or key[0] == session_id)
+            ]
+            entries = [self._entries.pop(key) for key in keys]
+        for entry in entries:
+            entry["store"].close()
+        return len(entries)
+    
+    def stats(self):
+        return {"open_handles": len(self._entries), "opens": self.opens, "reuses": self.reuses}
+
+store_handles = StoreHandleCache()
 
 class VectorStore:
-    def __init__(self):
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
-        )
-        self.db_path = Config.CHROMA_PERSIST_DIR
-        self.collection_name = Config.CHROMA_COLLECTION_NAME
+    def __init__(self, db_path=None, collection_name=None, session_id=None, backend=None, shared=None):
+        self.db_path = db_path or Config.CHROMA_PERSIST_DIR
+        self.collection_name = collection_name or Config.CHROMA_COLLECTION_NAME
+        self.session_id = session_id
+        # Shared mode: every session writes to one collection; chunks of a document
+        # version are stored once and each session sees only the versions it references
+        self.shared = Config.SHARED_COLLECTION if shared is None else shared
+        # "auto" | "numpy" | "chroma"; see modules.index_backends.open_backend
+        self.backend = backend or Config.VECTOR_BACKEND
+        if self.shared and self.backend == "auto":
+            # Several server processes may write to the shared store
+            self.backend = "chroma"
+    
+    @property
+    def embeddings(self):
+        # Shared process-wide model, only resolved when something is embedded
+        return get_embeddings()
+    
+    def _handle_key(self):
+        # One handle per shared store, whichever session uses it
+        session_id = None if self.shared else self.session_id
+        return (session_id, os.path.abspath(self.db_path), self.collection_name)
+    
+    def refs(self):
+        return get_document_refs(self.db_path)
+    
+    def scope(self):
+        # Metadata filter limiting reads to this session's document versions
+        # (None outside shared mode); [] when the session references nothing
+        if not self.shared:
+            return None
+        hashes = sorted({doc_hash for _, doc_hash in self.refs().documents(self.session_id).values()})
+        return {"content_hash": {"$in": hashes}} if hashes else []
+    
+    def _version_keys(self):
+        return {version_key(doc_id, doc_hash) for doc_id, (_, doc_hash) in self.refs().documents(self.session_id).items()}
     
     def create_store(self, documents):
+        # Incremental: documents are grouped by source and only changed ones are re-embedded
         try:
-            # Clear existing database
-            if os.path.exists(self.db_path):
-                shutil.rmtree(self.db_path)
-                
-            return Chroma.from_documents(
-                documents,
-                self.embeddings,
-                persist_directory=self.db_path,
-                collection_name=self.collection_name
-            )
+            grouped = {}
+            for doc in documents:
+                grouped.setdefault(doc.metadata.get("source", "unknown"), []).append(doc)
+            for source, chunks in grouped.items():
+                # Chunk boundaries are part of the hash: same text split differently is a new version
+                doc_hash = content_hash("\x1e".join(chunk.page_content for chunk in chunks))
+                if self.get_document_hash(source) != doc_hash:
+                    self.upsert_document(source, chunks, doc_hash)
+            return self.get_store()
         except Exception as e:
             raise Exception(f"Error creating vector store: {str(e)}")
     
-    def get_store(self):
+    def _open(self):
+        return open_backend(self.db_path, self.collection_name, self.backend)
+    
+    def get_store(self, create=False):
         try:
-            if os.path.exists(self.db_path):
-                return Chroma(
-                    persist_directory=self.db_path,
-                    embedding_function=self.embeddings,
-                    collection_name=self.collection_name
-                )
+            if create or os.path.exists(self.db_path):
+                # An index backend (modules.index_backends), not a langchain store
+                return store_handles.get(self._handle_key(), self._open)["store"]
+            # Directory removed underneath us: drop any handle still pointing at it
+            store_handles.invalidate(self.db_path)
             return None
         except Exception as e:
             raise Exception(f"Error loading vector store: {str(e)}")
     
-    def search(self, query, k=Config.MAX_RESULTS):
+    def write_lock(self):
+        # Held while writing; excludes searches, so a commit is seen whole
+        return store_handles.get(self._handle_key(), self._open)["lock"].write()
+    
+    def read_lock(self):
+        # Held while searching; any number of searches share it
+        return store_handles.get(self._handle_key(), self._open)["lock"].read()
+    
+    def _locked_store(self):
+        # The backend currently behind the handle. Call with write_lock() or
+        # read_lock() held: an auto-mode migration swaps it under the write lock,
+        # so a backend fetched earlier may already be destroyed
+        return store_handles.get(self._handle_key(), self._open)["store"]
+    
+    def _written(self):
+        entry = store_handles.peek(self._handle_key())
+        if entry is not None:
+            entry["fingerprint"] = None
+    
+    def get_document_metadata(self, source):
+        # Metadata of the first chunk of an indexed document, or None if it isn't
+        # indexed (or only partially written by an interrupted upload)
+        store = self.get_store()
+        if store is None:
+            return None
+        doc_id = document_id(source)
+        doc_hash = None
+        if self.shared:
+            doc_hash = self.refs().get(self.session_id, doc_id)
+            if doc_hash is None:
+                return None
+        where = committed_where(doc_id, doc_hash)
+        result = store.get(where=where, limit=1, include=["metadatas"])
+        if not result["ids"]:
+            return None
+        return result["metadatas"][0]
+    
+    def get_document_hash(self, source):
+        # Content hash the document was indexed with, or None if it isn't indexed
+        metadata = self.get_document_metadata(source)
+        return metadata.get("content_hash") if metadata else None
+    
+    def upsert_document(self, source, chunks, doc_hash, metadata=None, batch_size=None, on_batch=None):
+        # Replace whatever was indexed for this source with the given chunks.
+        # chunks may be any iterable (e.g. a generator over a streamed upload):
+        # they are embedded and written in micro-batches of batch_size. The first
+        # batch is held back and written together with the removal of the old
+        # version, so the new version only counts as indexed once it is complete;
+        # if anything fails (or the caller cancels) the written chunks are removed.
+        try:
+            doc_id = document_id(source)
+            self.get_store(create=True)
+            with self.write_lock():
+                store = self._locked_store()
+                stale_ids = self._begin(store, doc_id, doc_hash, source)
+                stored = self._stored_chunks(store, doc_id, doc_hash) if stale_ids is None else None
+            if stale_ids is None:
+                self._persist(store)
+                return stored
+            lexical = self.lexical_index()
+            
+            terms = Counter()
+            written_ids = []
+            first = None
+            offset = 0
+            try:
+                for batch in self._batches(source, doc_id, doc_hash, chunks, metadata, batch_size):
+                    embedded = self._embed_batch(doc_id, doc_hash, batch, offset)
+                    offset += len(batch)
+                    if first is None:
+                        first = embedded
+                        continue
+                    with self.write_lock():
+                        self._write(self._locked_store(), lexical, doc_id, embedded, terms, stale_ids)
+                    written_ids.extend(embedded[0])
+                    if on_batch:
+                        on_batch(offset)
+                
+                with self.write_lock():
+                    store = self._locked_store()
+                    if first is not None:
+                        self._write(store, lexical, doc_id, first, terms, stale_ids)
+                    self._finish(store, lexical, source, doc_id, doc_hash, terms, stale_ids)
+            except BaseException:
+                self._rollback(lexical, source, written_ids)
+                raise
+            self._persist(store)
+            self._maybe_migrate()
+            return offset
+        except IncompleteWriteError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error indexing document: {str(e)}")
+    
+    def _rollback(self, lexical, source, ids):
+        # Remove the chunks of an unfinished version (the previous version is untouched)
+        if not ids:
+            return
+        try:
+            with self.write_lock():
+                store = self._locked_store()
+                store.delete(ids)
+                lexical.remove_chunks(ids)
+                self._written()
+            self._persist(store)
+        except Exception as e:
+            raise IncompleteWriteError(
+                f"{len(ids)} chunks of an unfinished upload of {source} could not be removed ({e}); "
+                "upload the file again to replace them"
+            ) from e
+    
+    def prepare_document(self, source, chunks, doc_hash, metadata=None, batch_size=None, check=None):
+        # Embed a document without touching the index; commit_documents() publishes it.
+        # check() is called between batches and may raise to cancel.
+        doc_id = document_id(source)
+        prepared = {"source": source, "doc_id": doc_id, "doc_hash": doc_hash, "batches": []}
         store = self.get_store()
-        if store:
-            return store.similarity_search(query, k=k)
-        return []
\ No newline at end of file
+        if store is not None and self.shared and self._committed(store, doc_id, doc_hash):
+            return prepared  # stored by another session: commit only adds a reference
+        offset = 0
+        for batch in self._batches(source, doc_id, doc_hash, chunks, metadata, batch_size):
+            if check:
+                check()
+            prepared["batches"].append(self._embed_batch(doc_id, doc_hash, batch, offset))
+            offset += len(batch)
+        return prepared
+    
+    def commit_documents(self, prepared_documents):
+        # Publish prepared documents in one step: searches through this process
+        # see either none or all of them (embeddings were computed beforehand)
+        self.get_store(create=True)
+        lexical = self.lexical_index()
+        with self.write_lock():
+            store = self._locked_store()
+            for prepared in prepared_documents:
+                doc_id, doc_hash, source = prepared["doc_id"], prepared["doc_hash"], prepared["source"]
+                stale_ids = self._begin(store, doc_id, doc_hash, source)
+                if stale_ids is None:
+                    continue
+                terms = Counter()
+                for embedded in prepared["batches"]:
+                    self._write(store, lexical, doc_id, embedded, terms, stale_ids)
+                self._finish(store, lexical, source, doc_id, doc_hash, terms, stale_ids)
+        # Once per commit, not per document, and outside the lock searches wait on
+        self._persist(store)
+        self._maybe_migrate()
+        return sum(len(embedded[0]) for prepared in prepared_documents for embedded in prepared["batches"])
+    
+    def _stored_chunks(self, store, doc_id, doc_hash):
+        return len(store.get(where={"$and": [{"doc_id": doc_id}, {"content_hash": doc_hash}]}, include=[])["ids"])
+    
+    def _committed(self, store, doc_id, doc_hash):
+        return bool(store.get(where=committed_where(doc_id, doc_hash), limit=1, include=[])["ids"])
+    
+    def _begin(self, store, doc_id, doc_hash, source):
+        # IDs of the previous version to remove once the new one is written, or
+        # None when nothing needs writing (shared mode: version already stored)
+        if not self.shared:
+            return set(store.get(where={"doc_id": doc_id}, include=[])["ids"])
+        if self._committed(store, doc_id, doc_hash):
+            self._reference(store, doc_id, doc_hash, source)
+            self._written()
+            return None
+        # Other versions may still be referenced by other sessions
+        return set()
+    
+    def _batches(self, source, doc_id, doc_hash, chunks, metadata, batch_size):
+        batch_size = batch_size or Config.INGEST_BATCH_SIZE
+        batch = []
+        index = 0
+        for chunk in chunks:
+            chunk.metadata.update(metadata or {})
+            chunk.metadata.update({
+                "source": source,
+                "doc_id": doc_id,
+                "content_hash": doc_hash,
+                "chunk_index": index
+            })
+            if self.shared:
+                chunk.metadata["session_id"] = self.session_id  # first session to ingest it
+            index += 1
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    def _embed_batch(self, doc_id, doc_hash, batch, offset):
+        ids = [chunk_id(doc_id, doc_hash, offset + position) for position in range(len(batch))]
+        texts = [chunk.page_content for chunk in batch]
+        with span("embed", chunks=len(texts)):
+            vectors = self.embeddings.embed_documents(texts)
+        return ids, texts, vectors, [chunk.metadata for chunk in batch]
+    
+    def _write(self, store, lexical, doc_id, embedded, terms, stale_ids):
+        ids, texts, vectors, metadatas = embedded
+        with span("upsert", chunks=len(ids)):
+            store.upsert(ids, texts, vectors, metadatas)
+            lexical.add_chunks(doc_id, ids, texts)
+        stale_ids.difference_update(ids)
+        terms.update(count_terms(texts))
+        return len(ids)
+    
+    def _finish(self, store, lexical, source, doc_id, doc_hash, terms, stale_ids):
+        # Chunks of the previous version that the new one didn't overwrite
+        if stale_ids:
+            store.delete(list(stale_ids))
+            lexical.remove_chunks(stale_ids)
+        self.term_index().set_document_counts(version_key(doc_id, doc_hash) if self.shared else doc_id, terms)
+        if self.shared:
+            self._reference(store, doc_id, doc_hash, source)
+        self._written()
+    
+    def _persist(self, store):
+        # Write what the last commit changed to disk. Called after the write lock is
+        # released: the backend snapshots under its own lock and writes without it
+        store.flush()
+        self.lexical_index().flush()
+    
+    def _reference(self, store, doc_id, doc_hash, source):
+        previous = self.refs().add(self.session_id, doc_id, doc_hash, source)
+        if previous:
+            self._release(store, doc_id, previous)
+    
+    def _release(self, store, doc_id, doc_hash):
+        # Delete a document version from the shared store once nobody references it
+        if self.refs().references(doc_id, doc_hash):
+            return 0
+        ids = store.get(where={"$and": [{"doc_id": doc_id}, {"content_hash": doc_hash}]}, include=[])["ids"]
+        if ids:
+            store.delete(ids)
+            self.lexical_index().remove_chunks(ids)
+        self.term_index().remove_document(version_key(doc_id, doc_hash))
+        self._written()
+        return len(ids)
+    
+    def release_session(self):
+        # Shared mode: drop every reference the session holds (garbage-collecting
+        # versions nobody else uses). Used by the session store manager on eviction.
+        if not self.shared or not os.path.exists(self.db_path):
+            return 0
+        if self.get_store() is None:
+            return 0
+        released = 0
+        with self.write_lock():
+            store = self._locked_store()
+            for doc_id, doc_hash in self.refs().remove_session(self.session_id):
+                released += self._release(store, doc_id, doc_hash)
+        self._persist(store)
+        return released
+    
+    def delete_document(self, source):
+        store = self.get_store()
+        if store is None:
+            return 0
+        doc_id = document_id(source)
+        with self.write_lock():
+            store = self._locked_store()
+            if self.shared:
+                doc_hash = self.refs().remove(self.session_id, doc_id)
+                removed = self._release(store, doc_id, doc_hash) if doc_hash else 0
+            else:
+                ids = store.get(where={"doc_id": doc_id}, include=[])["ids"]
+                if ids:
+                    store.delete(ids)
+                    self.lexical_index().remove_chunks(ids)
+                    self._written()
+                self.term_index().remove_document(doc_id)
+                removed = len(ids)
+        self._persist(store)
+        return removed
+    
+    def list_documents(self):
+        store = self.get_store()
+        if store is None:
+            return {}
+        if self.shared:
+            return {doc_id: source for doc_id, (source, _) in self.refs().documents(self.session_id).items()}
+        documents = {}
+        for metadata in store.get(include=["metadatas"])["metadatas"]:
+            documents.setdefault(metadata.get("doc_id"), metadata.get("source"))
+        return documents
+    
+    def get_documents(self):
+        # Every indexed chunk text grouped by source, in document order
+        store = self.get_store()
+        where = self.scope()
+        if store is None or where == []:
+            return {}
+        result = store.get(where=where, include=["documents", "metadatas"])
+        grouped = {}
+        for text, metadata in zip(result["documents"], result["metadatas"]):
+            source = metadata.get("source", "unknown")
+            grouped.setdefault(source, []).append((metadata.get("chunk_index", 0), text))
+        return {
+            source: [text for _, text in sorted(chunks, key=lambda chunk: chunk[0])]
+            for source, chunks in sorted(grouped.items())
+        }
+    
+    def fingerprint(self):
+        # Identifies the exact set of indexed chunks (changes on any add, update or delete)
+        store = self.get_store()
+        if store is None:
+            return None
+        if self.shared:
+            # The handle is shared by all sessions, so derive it from this session's references
+            versions = "\n".join(sorted(self._version_keys()))
+            return hashlib.sha256(versions.encode("utf-8")).hexdigest()
+        entry = store_handles.peek(self._handle_key())
+        if entry is not None and entry["fingerprint"] is not None:
+            return entry["fingerprint"]
+        ids = sorted(store.ids())
+        fingerprint = hashlib.sha256("\n".join(ids).encode("utf-8")).hexdigest()
+        if entry is not None:
+            entry["fingerprint"] = fingerprint
+        return fingerprint
+    
+    def term_index(self):
+        return get_term_index(self.db_path)
+    
+    def lexical_index(self):
+        index = get_lexical_index(self.db_path)
+        if len(index) == 0:
+            # Stores indexed before the lexical index existed: build it once from the chunks
+            store = self.get_store()
+            if store is not None and store.count():
+                result = store.get(include=["documents", "metadatas"])
+                for chunk_id, text, metadata in zip(result["ids"], result["documents"], result["metadatas"]):
+                    index.add_chunks(metadata.get("doc_id"), [chunk_id], [text])
+                index.flush()
+        return index
+    
+    def top_terms(self, k=10):
+        # Corpus-wide term counts maintained at ingest time (no vector query)
+        if self.shared:
+            return self.term_index().top_terms(k, keys=self._version_keys())
+        return self.term_index().top_terms(k)
+    
+    def close(self):
+        store_handles.invalidate(self.db_path)
+    
+    def reset(self):
+        if self.shared:
+            # Other sessions' documents live in the same store
+            return self.release_session()
+        # Handles must be closed before the files can be removed (Windows locking)
+        self.close()
+        drop_term_index(self.db_path)
+        drop_lexical_index(self.db_path)
+        if os.path.exists(self.db_path):
+            shutil.rmtree(self.db_path)
+    
+    def _maybe_migrate(self):
+        # Auto mode: once a NumPy-backed corpus outgrows brute force, move it into Chroma.
+        # Runs under the write lock, so no search or write sees the swap half-done;
+        # the NumPy files are only removed once Chroma is installed behind the handle.
+        if self.backend != "auto":
+            return None
+        with self.write_lock():
+            store = self._locked_store()
+            if not isinstance(store, NumpyBackend) or store.count() <= Config.NUMPY_BACKEND_MAX_CHUNKS:
+                return store
+            data = store.export()
+            chroma = ChromaBackend(self.db_path, self.collection_name)
+            for start in range(0, len(data["ids"]), 1000):
+                chroma.upsert(
+                    data["ids"][start:start + 1000],
+                    data["documents"][start:start + 1000],
+                    data["embeddings"][start:start + 1000],
+                    data["metadatas"][start:start + 1000]
+                )
+            store_handles.replace(self._handle_key(), chroma)
+            store.destroy()
+            store.close()
+            self._written()
+            return chroma
+    
+    def backend_stats(self):
+        store = self.get_store()
+        return store.stats() if store is not None else None
+    
+    def _scoped(self, where=None):
+        # Combine a caller's metadata filter with the session scope ([] = nothing visible)
+        scope = self.scope()
+        if scope is None or scope == []:
+            return where if scope is None else []
+        return {"$and": [scope, where]} if where else scope
+    
+    def search_by_vector(self, vector, k=Config.MAX_RESULTS, where=None):
+        # [(Document, cosine similarity), ...] best first
+        where = self._scoped(where)
+        if self.get_store() is None or where == []:
+            return []
+        with self.read_lock():
+            results = self._locked_store().query(np.asarray(vector, dtype=np.float32), k, where)
+        from langchain_core.documents import Document
+        return [(Document(page_content=text, metadata=metadata), similarity) for _, text, metadata, similarity in results]
+    
+    def search_with_scores(self, query, k=Config.MAX_RESULTS, where=None):
+        return self.search_by_vector(self.embeddings.embed_query(query), k, where)
+    
+    def hybrid_search(self, query, k=Config.MAX_RESULTS, vector=None, min_similarity=None, where=None):
+        # Dense and BM25 rankings fused with reciprocal-rank fusion: [(Document, fused score), ...].
+        # Dense hits are kept only above a cosine-similarity floor (backends report
+        # similarity whatever their distance metric); lexical hits need a shared term.
+        vectors = None if vector is None else [vector]
+        return self.hybrid_search_many([query], k, vectors, min_similarity, where)[0]
+    
+    def hybrid_search_many(self, queries, k=Config.MAX_RESULTS, vectors=None, min_similarity=None, where=None):
+        # Batch form of hybrid_search, one result list per query: all query vectors
+        # are scored in one multi-query search; BM25 and fusion stay per query
+        queries = list(queries)
+        store = self.get_store()
+        where = self._scoped(where)
+        if store is None or where == [] or not queries:
+            return [[] for _ in queries]
+        if vectors is None:
+            with span("embed_query", queries=len(queries)):
+                vectors = self.embeddings.embed_queries(queries)
+        with span("retrieve", queries=len(queries)):
+            return self._hybrid_search_many(queries, k, vectors, min_similarity, where)
+    
+    def _hybrid_search_many(self, queries, k, vectors, min_similarity, where):
+        if min_similarity is None:
+            min_similarity = Config.MIN_RELEVANCE
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self.read_lock():
+            store = self._locked_store()
+            depth = max(k, Config.HYBRID_CANDIDATES)
+            lexical = self.lexical_index()
+            scope = self._version_keys() if self.shared else None
+            
+            # On large corpora the lexical side narrows each dense search to its top candidates
+            candidates = [None] * len(queries)
+            if store.count() >= Config.LEXICAL_PREFILTER_MIN_CHUNKS:
+                for position, query in enumerate(queries):
+                    prefilter = lexical.search(query, Config.LEXICAL_PREFILTER_CANDIDATES, scope)
+                    if len(prefilter) >= depth:
+                        candidates[position] = [chunk_id for chunk_id, _ in prefilter]
+            
+            dense = [None] * len(queries)
+            full = [position for position, ids in enumerate(candidates) if ids is None]
+            if full:
+                for position, hits in zip(full, store.query_many(vectors[full], depth, where)):
+                    dense[position] = hits
+            for position, ids in enumerate(candidates):
+                if ids is not None:
+                    dense[position] = store.query(vectors[position], depth, where, ids)
+            
+            records = {}
+            rankings = []
+            for query, hits in zip(queries, dense):
+                dense_ranking = []
+                for chunk_id, text, metadata, similarity in hits:
+                    if similarity >= min_similarity:
+                        records[chunk_id] = (text, metadata)
+                        dense_ranking.append(chunk_id)
+                rankings.append((dense_ranking, [chunk_id for chunk_id, _ in lexical.search(query, depth, scope)]))
+            
+            missing = list(dict.fromkeys(
+                chunk_id for _, lexical_ranking in rankings for chunk_id in lexical_ranking if chunk_id not in records
+            ))
+            if missing:
+                # Lexical-only hits (also applies the metadata filter to them)
+                result = store.get(ids=missing, where=where)
+                for chunk_id, text, metadata in zip(result["ids"], result["documents"], result["metadatas"]):
+                    records[chunk_id] = (text, metadata)
+        
+        # Imported on first search rather than at app start
+        from langchain_core.documents import Document
+        results = []
+        for dense_ranking, lexical_ranking in rankings:
+            lexical_ranking = [chunk_id for chunk_id in lexical_ranking if chunk_id in records]
+            fused = reciprocal_rank_fusion([dense_ranking, lexical_ranking], Config.RRF_K)[:k]
+            results.append([
+                (Document(page_content=records[chunk_id][0], metadata=records[chunk_id][1]), score)
+                for chunk_id, score in fused
+            ])
+        return results
+    
+    def search(self, query, k=Config.MAX_RESULTS):
+        return [doc for doc, _ in self.search_with_scores(query, k)]
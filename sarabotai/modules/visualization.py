@@ -1,22 +1,21 @@
 import pandas as pd
 import plotly.express as px
 from langchain_core.documents import Document
+from modules.term_index import count_terms
 
 class Visualizer:
     @staticmethod
     def generate_word_frequency_chart(documents):
         if not documents:
             return None
-            
-        words = " ".join([doc.page_content for doc in documents]).split()
-        word_freq = pd.Series(words).value_counts().reset_index()
-        word_freq.columns = ['word', 'count']
         
-        # Filter short words and non-alphabetic
-        word_freq = word_freq[
-            (word_freq['word'].str.len() >= 4) & 
-            (word_freq['word'].str.isalpha())
-        ].head(10)
+        terms = count_terms([doc.page_content for doc in documents])
+        return Visualizer.term_frequency_chart(terms.most_common(10))
+    
+    @staticmethod
+    def term_frequency_chart(top_terms):
+        # top_terms: [(term, count), ...] e.g. from VectorStore.top_terms()
+        word_freq = pd.DataFrame(top_terms, columns=['word', 'count'])
         
         if word_freq.empty:
             return None
@@ -33,4 +32,4 @@ class Visualizer:
             yaxis_title="Frequency",
             plot_bgcolor='rgba(0,0,0,0)'
         )
-        return fig
\ No newline at end of file
+        return fig
@@ -1,18 +1,28 @@
-import requests
-from bs4 import BeautifulSoup
 from datetime import datetime
+from modules.fetcher import get_fetcher
 
 class WebScraper:
     @staticmethod
     def get_article_metadata(url):
+        result = get_fetcher().fetch(url)
+        if not result.ok:
+            return WebScraper.error_metadata(url, result.error)
+        return WebScraper.parse_metadata(result.html, url)
+    
+    @staticmethod
+    def get_many_article_metadata(urls):
+        return [
+            WebScraper.parse_metadata(result.html, result.url) if result.ok else WebScraper.error_metadata(result.url, result.error)
+            for result in get_fetcher().fetch_many(urls)
+        ]
+    
+    @staticmethod
+    def parse_metadata(html, url):
+        from bs4 import BeautifulSoup
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=10)
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = BeautifulSoup(html, 'html.parser')
             
-            title = soup.find('meta', property='og:title') or soup.title
+            title = soup.find('meta', property='og:title') or soup.find('meta', attrs={'name': 'title'}) or soup.title
             title = title['content'] if hasattr(title, 'has_attr') and title.has_attr('content') else str(title.string) if title else "Untitled Article"
             
             description = soup.find('meta', property='og:description') or soup.find('meta', attrs={'name': 'description'})
@@ -25,9 +35,27 @@ class WebScraper:
                 "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             }
         except Exception as e:
-            return {
-                "title": "Untitled Article",
-                "description": f"Error fetching metadata: {str(e)}",
-                "url": url,
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
\ No newline at end of file
+            return WebScraper.error_metadata(url, str(e))
+    
+    @staticmethod
+    def error_metadata(url, error):
+        return {
+            "title": "Untitled Article",
+            "description": f"Error fetching metadata: {error}",
+            "url": url,
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+    
+    @staticmethod
+    def extract_text(html):
+        # Same extraction UnstructuredURLLoader performs, but on HTML we already downloaded
+        try:
+            from unstructured.partition.html import partition_html
+        except ImportError:
+            from bs4 import BeautifulSoup
+            soup = BeautifulSoup(html, 'html.parser')
+            for tag in soup(["script", "style", "noscript"]):
+                tag.decompose()
+            return "\n\n".join(line.strip() for line in soup.get_text("\n").splitlines() if line.strip())
+        elements = partition_html(text=html)
+        return "\n\n".join(str(element) for element in elements)
@@ -0,0 +1,91 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+
+SUMMARY_PROMPT = """Update the running summary of a research conversation with the new exchanges below. Keep names, figures, conclusions and open questions; drop pleasantries. Reply with the updated summary only, in under 200 words.
+
+Current summary:
+{summary}
+
+New exchanges:
+{turns}"""
+
+# Shared by every session; summaries are short single LLM calls
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="memory-summary")
+
+class ConversationMemory:
+    # Stores only question/answer pairs (never the prompts with retrieved
+    # excerpts). Once more than max_turns are held, the older ones are folded
+    # into a running summary in the background, keeping the newest keep_turns
+    # verbatim, so memory and the history part of the prompt stay flat.
+    # summarize(prompt) -> str, e.g. a retried completion (utils.llm_retry).
+    def __init__(self, summarize=None, max_turns=None, keep_turns=None):
+        self.summarize = summarize
+        self.max_turns = max_turns or Config.MEMORY_MAX_TURNS
+        self.keep_turns = min(keep_turns or Config.MEMORY_KEEP_TURNS, self.max_turns)
+        self.turns = []
+        self.summary = ""
+        self._pending = None
+        self._generation = 0
+        self._lock = threading.Lock()
+    
+    def add(self, question, answer):
+        with self._lock:
+            self.turns.append({"question": question, "answer": answer})
+            if len(self.turns) <= self.max_turns or self._pending is not None:
+                return
+            if self.summarize is None:
+                # No LLM available: keep the newest turns only
+                del self.turns[:len(self.turns) - self.max_turns]
+                return
+            folded = self.turns[:len(self.turns) - self.keep_turns]
+            self._pending = _executor.submit(self._fold, self.summary, folded, self._generation)
+    
+    def _fold(self, summary, folded, generation):
+        turns = "\n\n".join(f"Q: {turn['question']}\nA: {turn['answer']}" for turn in folded)
+        try:
+            updated = self.summarize(SUMMARY_PROMPT.format(summary=summary or "(none yet)", turns=turns)).strip()
+        except Exception:
+            updated = None
+        with self._lock:
+            self._pending = None
+            if generation != self._generation:
+                return  # cleared while the summary was being computed
+            if updated:
+                self.summary = updated
+                del self.turns[:len(folded)]
+            elif len(self.turns) > self.max_turns:
+                # Summarization failed: stay bounded by dropping the oldest turns
+                del self.turns[:len(self.turns) - self.max_turns]
+    
+    def wait(self, timeout=None):
+        # Block until a pending summary (if any) has been folded in
+        pending = self._pending
+        if pending is not None:
+            pending.result(timeout)
+    
+    def messages(self):
+        # [{"role", "content"}, ...] oldest first, the running summary leading
+        with self._lock:
+            messages = [{"role": "summary", "content": self.summary}] if self.summary else []
+            for turn in self.turns:
+                messages.append({"role": "user", "content": turn["question"]})
+                messages.append({"role": "assistant", "content": turn["answer"]})
+            return messages
+    
+    def clear(self):
+        with self._lock:
+            self.turns = []
+            self.summary = ""
+            self._generation += 1
+    
+    def stats(self):
+        with self._lock:
+            return {
+                "turns": len(self.turns),
+                "summary_chars": len(self.summary),
+                "summarizing": self._pending is not None
+            }
+    
+    def __len__(self):
+        return len(self.turns)
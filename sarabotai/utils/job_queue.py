@@ -0,0 +1,162 @@
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from utils.metrics import current_session
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+class JobCancelled(Exception):
+    pass
+
+class Job:
+    # State of one background task. The task reports progress through
+    # update() and calls check() at safe points so it can be cancelled.
+    def __init__(self, kind, owner=None, description=""):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.owner = owner
+        self.description = description
+        self.status = QUEUED
+        self.stage = None
+        self.progress = 0.0
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.warning = None  # set by the task when it couldn't leave things clean (kept if cancelled)
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+    
+    def update(self, stage=None, progress=None, message=None):
+        if stage is not None:
+            self.stage = stage
+        if progress is not None:
+            self.progress = max(0.0, min(float(progress), 1.0))
+        if message is not None:
+            self.message = message
+    
+    def cancel(self):
+        self._cancel.set()
+    
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+    
+    def check(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+    
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+    
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "owner": self.owner,
+            "description": self.description,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "message": self.message,
+            "error": self.error,
+            "warning": self.warning,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+class JobQueue:
+    # Process-wide worker pool that runs jobs outside the Streamlit script run,
+    # so reruns and widget interactions neither block on nor drop the work.
+    # Finished jobs are kept for JOB_RETENTION seconds so their results can be collected.
+    def __init__(self, max_workers=None, retention=None):
+        self.retention = retention or Config.JOB_RETENTION
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or Config.JOB_WORKERS, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def submit(self, kind, fn, *args, owner=None, description="", **kwargs):
+        # fn(job, *args, **kwargs); its return value becomes job.result
+        job = Job(kind, owner=owner, description=description)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+    
+    def _run(self, job, fn, args, kwargs):
+        if job.cancelled:
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+        # Spans recorded by the job count towards its owner's session
+        session_token = current_session.set(job.owner)
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = DONE
+            job.progress = 1.0
+        except JobCancelled:
+            job.status = CANCELLED
+            job.message = "Cancelled"
+        except Exception as e:
+            if job.cancelled:
+                # Cancellation raised inside a callee that wrapped the exception
+                job.status = CANCELLED
+                job.message = "Cancelled"
+                return
+            job.status = FAILED
+            job.error = str(e)
+            job.message = traceback.format_exception_only(type(e), e)[-1].strip()
+        finally:
+            current_session.reset(session_token)
+            job.finished_at = time.time()
+    
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+    
+    def jobs(self, owner=None):
+        with self._lock:
+            return [job for job in self._jobs.values() if owner is None or job.owner == owner]
+    
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None and not job.finished:
+            job.cancel()
+            return True
+        return False
+    
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+    
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return counts
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue():
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+        return _job_queue
@@ -0,0 +1,115 @@
+import os
+import sqlite3
+import threading
+import time
+
+# SQLite limits the number of bound parameters per statement
+_MAX_PARAMS = 900
+# Eviction frees space down to this fraction of max_bytes, so the size is not
+# recounted on every write once the cache is full
+_EVICT_TO = 0.9
+
+class SQLiteCache:
+    # Small persistent key -> blob store shared by threads of one process and,
+    # through WAL mode, safely by several server processes on the same host.
+    # With max_bytes, the oldest entries (by created_at) are evicted once the
+    # stored values outgrow it; without it the store is unbounded.
+    def __init__(self, path, table="cache", max_bytes=None):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.table = table
+        self.max_bytes = max_bytes
+        self._approx_bytes = None  # this process's running estimate, recounted before evicting
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_created_at ON {table} (created_at)")
+    
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def get_many(self, keys):
+        found = {}
+        keys = list(keys)
+        with self._lock:
+            for start in range(0, len(keys), _MAX_PARAMS):
+                batch = keys[start:start + _MAX_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM {self.table} WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+        return found
+    
+    def put(self, key, value):
+        self.put_many([(key, value)])
+    
+    def put_many(self, items):
+        now = time.time()
+        rows = [(key, value, now) for key, value in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, created_at) VALUES (?, ?, ?)", rows
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            if self.max_bytes is not None:
+                if self._approx_bytes is None:
+                    self._approx_bytes = self._stored_bytes()
+                else:
+                    # Replaced keys are counted twice; the recount below corrects it
+                    self._approx_bytes += sum(len(value) for _, value, _ in rows)
+                if self._approx_bytes > self.max_bytes:
+                    self._evict()
+    
+    def _stored_bytes(self):
+        # length() of a BLOB is read from the record header, not the value itself
+        return self._conn.execute(f"SELECT COALESCE(SUM(length(value)), 0) FROM {self.table}").fetchone()[0]
+    
+    def _evict(self):
+        # Other processes write to the same file, so recount before deleting anything
+        total = self._stored_bytes()
+        if total > self.max_bytes:
+            excess = total - int(self.max_bytes * _EVICT_TO)
+            doomed = []
+            cursor = self._conn.execute(f"SELECT key, length(value) FROM {self.table} ORDER BY created_at ASC")
+            for key, size in cursor:
+                doomed.append(key)
+                total -= size
+                excess -= size
+                if excess <= 0:
+                    break
+            cursor.close()
+            for start in range(0, len(doomed), _MAX_PARAMS):
+                batch = doomed[start:start + _MAX_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key IN ({placeholders})", batch)
+        self._approx_bytes = total
+    
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+    
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,35 @@
+import random
+import time
+from config import Config
+
+def retryable_errors():
+    # Errors worth retrying with backoff (rate limits, timeouts, transient 5xx).
+    # Imported on first use: the SDK (pydantic models, httpx) is slow to import
+    import openai
+    return (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+
+def complete_with_retries(llm, prompt, temperature=0.7, max_tokens=None, max_retries=None, before_attempt=None):
+    # llm.complete() (OpenAIIntegration) retried on transient API errors. Nothing
+    # is cached here: callers that want caching do it themselves. before_attempt()
+    # runs before every attempt, retries included (e.g. a rate limiter's acquire).
+    max_retries = Config.LLM_MAX_RETRIES if max_retries is None else max_retries
+    delay = 1.0
+    for attempt in range(max_retries + 1):
+        if before_attempt:
+            before_attempt()
+        try:
+            return llm.complete(prompt, temperature=temperature, max_tokens=max_tokens)
+        except Exception as e:
+            if attempt == max_retries or not isinstance(e, retryable_errors()):
+                raise
+            # Honour Retry-After when the API sends one, otherwise back off exponentially with jitter
+            retry_after = None
+            response = getattr(e, "response", None)
+            if response is not None:
+                retry_after = response.headers.get("retry-after")
+            try:
+                wait = float(retry_after) if retry_after else delay
+            except ValueError:
+                wait = delay
+            time.sleep(wait + random.uniform(0, 0.5))
+            delay = min(delay * 2, 30)
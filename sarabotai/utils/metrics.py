@@ -0,0 +1,224 @@
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import Config
+
+# Upper bounds (seconds) of the stage latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+logger = logging.getLogger("sarabotai.metrics")
+
+# Session the current thread works for; spans and LLM usage are attributed to it.
+# Worker pools don't inherit context variables, so callers submit through
+# contextvars.copy_context().run (the job queue sets it from job.owner).
+current_session = contextvars.ContextVar("sarabot_session", default=None)
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+class Metrics:
+    # Process-wide stage timings and LLM usage: Prometheus histograms and
+    # counters for operators, plus recent samples per session for the in-app
+    # diagnostics panel. Every span is also logged as one JSON line.
+    def __init__(self, max_sessions=1000, samples_per_stage=500):
+        self.max_sessions = max_sessions
+        self.samples_per_stage = samples_per_stage
+        self._histograms = {}  # stage -> Histogram
+        self._errors = {}  # stage -> count
+        self._llm = {}  # model -> {"requests", "prompt_tokens", "completion_tokens", "cost_usd"}
+        self._sessions = OrderedDict()  # session_id -> {"stages": {stage: deque}, "llm": {...}}, LRU order
+        self._lock = threading.Lock()
+    
+    def _session(self, session_id):
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            entry = self._sessions[session_id] = {
+                "stages": {},
+                "llm": {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+            }
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(session_id)
+        return entry
+    
+    def observe(self, stage, seconds, error=None, **fields):
+        session_id = current_session.get()
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram()
+            histogram.observe(seconds)
+            if error is not None:
+                self._errors[stage] = self._errors.get(stage, 0) + 1
+            if session_id is not None:
+                stages = self._session(session_id)["stages"]
+                if stage not in stages:
+                    stages[stage] = deque(maxlen=self.samples_per_stage)
+                stages[stage].append(seconds)
+        if logger.isEnabledFor(logging.INFO):
+            record = {"event": "span", "stage": stage, "seconds": round(seconds, 6), "session": session_id}
+            record.update(fields)
+            if error is not None:
+                record["error"] = error
+            logger.info(json.dumps(record, default=str))
+    
+    @contextmanager
+    def span(self, stage, **fields):
+        # Times the block; extra fields (sizes, counts) go into the log line
+        start = time.perf_counter()
+        try:
+            yield fields
+        except BaseException as e:
+            self.observe(stage, time.perf_counter() - start, error=type(e).__name__, **fields)
+            raise
+        self.observe(stage, time.perf_counter() - start, **fields)
+    
+    def record_usage(self, model, usage):
+        # usage: the API response's usage object (prompt_tokens, completion_tokens)
+        if usage is None:
+            return
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        input_price, output_price = Config.MODEL_PRICES.get(model, (0.0, 0.0))
+        cost = (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+        session_id = current_session.get()
+        with self._lock:
+            totals = [self._llm.setdefault(model, {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0})]
+            if session_id is not None:
+                totals.append(self._session(session_id)["llm"])
+            for total in totals:
+                total["requests"] += 1
+                total["prompt_tokens"] += prompt_tokens
+                total["completion_tokens"] += completion_tokens
+                total["cost_usd"] += cost
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                "event": "llm_usage", "model": model, "session": session_id,
+                "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "cost_usd": round(cost, 6)
+            }))
+    
+    def session_stats(self, session_id):
+        # {"stages": {stage: {"count", "mean", "p50", "p95", "max", "total"}}, "llm": {...}}
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return {"stages": {}, "llm": {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}}
+            samples = {stage: sorted(values) for stage, values in entry["stages"].items()}
+            llm = dict(entry["llm"])
+        stages = {}
+        for stage, values in samples.items():
+            stages[stage] = {
+                "count": len(values),
+                "mean": sum(values) / len(values),
+                "p50": values[(len(values) - 1) // 2],
+                "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+                "max": values[-1],
+                "total": sum(values)
+            }
+        return {"stages": stages, "llm": llm}
+    
+    def render_prometheus(self):
+        # Prometheus text exposition format
+        with self._lock:
+            histograms = {stage: (list(h.counts), h.sum, h.count) for stage, h in self._histograms.items()}
+            errors = dict(self._errors)
+            llm = {model: dict(totals) for model, totals in self._llm.items()}
+        lines = [
+            "# HELP sarabot_stage_seconds Time spent in each pipeline stage.",
+            "# TYPE sarabot_stage_seconds histogram"
+        ]
+        for stage, (counts, total, count) in sorted(histograms.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS, counts):
+                cumulative += bucket_count
+                lines.append(f'sarabot_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'sarabot_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'sarabot_stage_seconds_sum{{stage="{stage}"}} {total}')
+            lines.append(f'sarabot_stage_seconds_count{{stage="{stage}"}} {count}')
+        lines += ["# HELP sarabot_stage_errors_total Stage executions that raised.", "# TYPE sarabot_stage_errors_total counter"]
+        lines += [f'sarabot_stage_errors_total{{stage="{stage}"}} {count}' for stage, count in sorted(errors.items())]
+        lines += ["# HELP sarabot_llm_requests_total Chat completion requests.", "# TYPE sarabot_llm_requests_total counter"]
+        lines += [f'sarabot_llm_requests_total{{model="{model}"}} {totals["requests"]}' for model, totals in sorted(llm.items())]
+        lines += ["# HELP sarabot_llm_tokens_total Tokens reported by the API.", "# TYPE sarabot_llm_tokens_total counter"]
+        for model, totals in sorted(llm.items()):
+            lines.append(f'sarabot_llm_tokens_total{{model="{model}",kind="prompt"}} {totals["prompt_tokens"]}')
+            lines.append(f'sarabot_llm_tokens_total{{model="{model}",kind="completion"}} {totals["completion_tokens"]}')
+        lines += ["# HELP sarabot_llm_cost_usd_total Estimated API cost from MODEL_PRICES.", "# TYPE sarabot_llm_cost_usd_total counter"]
+        lines += [f'sarabot_llm_cost_usd_total{{model="{model}"}} {totals["cost_usd"]:.6f}' for model, totals in sorted(llm.items())]
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+def span(stage, **fields):
+    return metrics.span(stage, **fields)
+
+_logging_configured = False
+
+def configure_logging():
+    # JSON lines from the sarabotai loggers on stderr, at LOG_LEVEL (idempotent)
+    global _logging_configured
+    if _logging_configured:
+        return
+    _logging_configured = True
+    package_logger = logging.getLogger("sarabotai")
+    if not package_logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        package_logger.addHandler(handler)
+    package_logger.setLevel(Config.LOG_LEVEL)
+    package_logger.propagate = False
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+    
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+_metrics_server = None
+_metrics_server_started = False
+_metrics_server_lock = threading.Lock()
+
+def start_metrics_server(port=None):
+    # Serves /metrics on METRICS_PORT from a daemon thread, once per process
+    # (0 disables it; the HTTP API serves /metrics itself)
+    global _metrics_server, _metrics_server_started
+    port = Config.METRICS_PORT if port is None else port
+    if not port:
+        return None
+    with _metrics_server_lock:
+        if not _metrics_server_started:
+            _metrics_server_started = True
+            try:
+                _metrics_server = ThreadingHTTPServer((Config.METRICS_HOST, port), _MetricsHandler)
+            except OSError as e:
+                logger.warning(json.dumps({"event": "metrics_server_failed", "port": port, "error": str(e)}))
+                return None
+            _metrics_server.daemon_threads = True
+            threading.Thread(target=_metrics_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _metrics_server
@@ -1,14 +1,15 @@
 import uuid
 import json
 from datetime import datetime
-from langchain.memory import ConversationBufferMemory
+from utils.conversation_memory import ConversationMemory
 
 class SessionManager:
-    def __init__(self):
+    def __init__(self, summarize=None):
         self.session_id = str(uuid.uuid4())[:8]
         self.conversation_history = []
         self.processed_articles = []
-        self.memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+        # Question/answer pairs with a rolling summary of older turns
+        self.memory = ConversationMemory(summarize=summarize)
     
     def new_session(self):
         self.session_id = str(uuid.uuid4())[:8]
@@ -23,6 +24,7 @@ class SessionManager:
             "context": context,
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         })
+        self.memory.add(question, answer)
     
     def export_chat_history(self):
         return json.dumps(self.conversation_history, indent=2)
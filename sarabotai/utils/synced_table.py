@@ -0,0 +1,108 @@
+import os
+import sqlite3
+import threading
+
+# Change log entries kept for processes that are behind; older ones make them reload
+CHANGE_LOG_ENTRIES = 100000
+
+class SyncedTable:
+    # key -> JSON text rows in SQLite, shared by every server process using the
+    # same store directory (WAL mode). Writers append the keys they changed to
+    # a change log in the same transaction, so a process keeping an in-memory
+    # view of the rows (BM25 postings, term totals) catches up by replaying
+    # only what other processes changed since it last looked.
+    def __init__(self, path, table="rows"):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table}_changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL)"
+        )
+        self._data_version = None
+    
+    def _last_seq(self):
+        return self._conn.execute(f"SELECT COALESCE(MAX(seq), 0) FROM {self.table}_changes").fetchone()[0]
+    
+    def load(self):
+        # (every row as {key: value}, change sequence number they reflect)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                rows = dict(self._conn.execute(f"SELECT key, value FROM {self.table}").fetchall())
+                seq = self._last_seq()
+            finally:
+                self._conn.execute("COMMIT")
+            self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        return rows, seq
+    
+    def changed_elsewhere(self):
+        # False while no other connection committed since the last check (cheap, no I/O)
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            changed = version != self._data_version
+            self._data_version = version
+        return changed
+    
+    def _changes(self, since):
+        # {key: value, or None if deleted} changed after since, or None when the
+        # log no longer reaches back that far (the caller reloads everything)
+        first = self._conn.execute(f"SELECT MIN(seq) FROM {self.table}_changes").fetchone()[0]
+        if first is not None and since < first - 1:
+            return None
+        keys = {key for (key,) in self._conn.execute(f"SELECT key FROM {self.table}_changes WHERE seq > ?", (since,))}
+        changed = dict.fromkeys(keys)
+        keys = list(keys)
+        for start in range(0, len(keys), 900):
+            batch = keys[start:start + 900]
+            placeholders = ",".join("?" * len(batch))
+            changed.update(self._conn.execute(
+                f"SELECT key, value FROM {self.table} WHERE key IN ({placeholders})", batch
+            ).fetchall())
+        return changed
+    
+    def changes(self, since):
+        # (changes since the given sequence number as for _changes, new sequence number)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                changed = self._changes(since)
+                seq = self._last_seq()
+            finally:
+                self._conn.execute("COMMIT")
+        return changed, seq
+    
+    def write(self, rows, since):
+        # Apply {key: value, or None to delete} in one transaction. Returns what
+        # other processes changed since the given sequence number (as changes()
+        # does) together with the new sequence number, which covers this write.
+        rows = list(rows.items())
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                changed = self._changes(since)
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value) VALUES (?, ?)",
+                    [(key, value) for key, value in rows if value is not None]
+                )
+                self._conn.executemany(
+                    f"DELETE FROM {self.table} WHERE key = ?",
+                    [(key,) for key, value in rows if value is None]
+                )
+                self._conn.executemany(f"INSERT INTO {self.table}_changes (key) VALUES (?)", [(key,) for key, _ in rows])
+                seq = self._last_seq()
+                self._conn.execute(f"DELETE FROM {self.table}_changes WHERE seq <= ?", (seq - CHANGE_LOG_ENTRIES,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        return changed, seq
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The app imports its modules as top-level packages (config, modules, utils)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sarabotai"))
+# Deterministic, model-free embeddings; must be set before config is imported
+os.environ["EMBEDDING_BACKEND"] = "hashing"
+os.environ["SHARED_COLLECTION"] = "false"
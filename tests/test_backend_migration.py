@@ -0,0 +1,50 @@
+import os
+from langchain_core.documents import Document
+from config import Config
+from modules.index_backends import ChromaBackend, NumpyBackend
+from modules.vector_store import VectorStore
+
+WORDS = "orchard harvest cider blossom branch ladder basket pruning graft sapling frost market".split()
+
+def make_chunks(count, word):
+    return [Document(page_content=f"{word} {' '.join(WORDS[i:i + 1 + i % 3])}") for i in range(count)]
+
+def ranked(store, query):
+    # Every chunk with its similarity, best first; equal scores (bag-of-words
+    # embeddings tie often) in a fixed order
+    hits = store.search_with_scores(query, k=12)
+    return sorted(
+        (-round(score, 4), doc.metadata["doc_id"], doc.metadata["chunk_index"]) for doc, score in hits
+    )
+
+def test_migration_keeps_ids_and_results(tmp_path, monkeypatch):
+    db_path = os.path.join(tmp_path, "store")
+    store = VectorStore(db_path=db_path, session_id="s", backend="auto")
+    store.upsert_document("apples.txt", make_chunks(6, "apples"), "a1")
+    store.upsert_document("pears.txt", make_chunks(6, "pears"), "p1")
+    assert isinstance(store.get_store(), NumpyBackend)
+    ids = sorted(store.get_store().ids())
+    queries = ["apples cider", "pears", "harvest basket frost"]
+    results = {query: ranked(store, query) for query in queries}
+    
+    monkeypatch.setattr(Config, "NUMPY_BACKEND_MAX_CHUNKS", 10)
+    store._maybe_migrate()
+    
+    assert isinstance(store.get_store(), ChromaBackend)
+    assert sorted(store.get_store().ids()) == ids
+    assert {query: ranked(store, query) for query in queries} == results
+    assert store.get_document_hash("apples.txt") == "a1"
+    # The NumPy files are gone and a fresh handle opens Chroma
+    assert not NumpyBackend.exists(db_path)
+    store.close()
+    assert isinstance(VectorStore(db_path=db_path, session_id="s", backend="auto").get_store(), ChromaBackend)
+
+def test_upsert_past_the_limit_migrates(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "NUMPY_BACKEND_MAX_CHUNKS", 10)
+    store = VectorStore(db_path=os.path.join(tmp_path, "store"), session_id="s", backend="auto")
+    store.upsert_document("apples.txt", make_chunks(6, "apples"), "a1")
+    assert isinstance(store.get_store(), NumpyBackend)
+    store.upsert_document("pears.txt", make_chunks(6, "pears"), "p1")
+    assert isinstance(store.get_store(), ChromaBackend)
+    assert store.get_store().count() == 12
+    assert all("pears" in doc.page_content for doc, _ in store.hybrid_search("pears", k=3))
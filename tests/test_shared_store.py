@@ -0,0 +1,64 @@
+import os
+import time
+from langchain_core.documents import Document
+from config import Config
+from modules.session_stores import SessionStoreManager
+from modules.vector_store import VectorStore
+
+def make_chunks(count, word):
+    return [Document(page_content=f"chunk {i} about {word} number{i}") for i in range(count)]
+
+def shared_store(db_path, session_id):
+    return VectorStore(db_path=db_path, session_id=session_id, shared=True)
+
+def test_version_is_kept_until_every_session_releases_it(tmp_path):
+    db_path = os.path.join(tmp_path, "shared")
+    first = shared_store(db_path, "first")
+    second = shared_store(db_path, "second")
+    first.upsert_document("pears.txt", make_chunks(5, "pears"), "p1")
+    # Same version from another session: referenced, not stored again
+    second.upsert_document("pears.txt", make_chunks(5, "pears"), "p1")
+    assert first.get_store().count() == 5
+    
+    assert first.release_session() == 0
+    assert first.list_documents() == {}
+    assert first.hybrid_search("pears", k=3) == []
+    assert second.get_store().count() == 5
+    assert len(second.lexical_index()) == 5
+    assert second.hybrid_search("pears", k=1)[0][0].metadata["source"] == "pears.txt"
+    assert second.top_terms(1) == [("chunk", 5)]
+    
+    assert second.release_session() == 5
+    assert second.get_store().count() == 0
+    assert len(second.lexical_index()) == 0
+    assert second.top_terms(1) == []
+
+def test_sessions_only_see_their_own_versions(tmp_path):
+    db_path = os.path.join(tmp_path, "shared")
+    first = shared_store(db_path, "first")
+    second = shared_store(db_path, "second")
+    first.upsert_document("pears.txt", make_chunks(5, "pears"), "p1")
+    second.upsert_document("figs.txt", make_chunks(3, "figs"), "f1")
+    assert all(doc.metadata["source"] == "figs.txt" for doc, _ in second.hybrid_search("pears", k=5))
+    assert set(first.list_documents().values()) == {"pears.txt"}
+
+def test_janitor_releases_sessions_no_process_owns(tmp_path, monkeypatch):
+    db_path = os.path.join(tmp_path, "shared")
+    monkeypatch.setattr(Config, "CHROMA_PERSIST_DIR", db_path)
+    monkeypatch.setattr(Config, "SHARED_COLLECTION", True)
+    # A session left behind by a process that has since restarted
+    shared_store(db_path, "gone").upsert_document("pears.txt", make_chunks(5, "pears"), "p1")
+    refs = shared_store(db_path, "gone").refs()
+    idle = time.time() - 10 * Config.SESSION_TTL
+    refs._conn.execute("UPDATE refs SET last_access = ?", (idle,))
+    
+    manager = SessionStoreManager(root=str(tmp_path))
+    manager.touch("live")
+    live = shared_store(db_path, "live")
+    live.upsert_document("figs.txt", make_chunks(3, "figs"), "f1")
+    refs._conn.execute("UPDATE refs SET last_access = ? WHERE session_id = 'live'", (idle,))
+    
+    # The live session is owned by this process, so only the other one is released
+    assert manager.release_stale_references() == 1
+    assert live.get_store().count() == 3
+    assert set(live.list_documents().values()) == {"figs.txt"}
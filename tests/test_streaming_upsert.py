@@ -0,0 +1,62 @@
+import os
+import pytest
+from langchain_core.documents import Document
+from modules.vector_store import VectorStore
+from utils.job_queue import Job
+
+def make_chunks(count, word):
+    return [Document(page_content=f"chunk {i} about {word} number{i}") for i in range(count)]
+
+def failing_chunks(count, word, fail_after):
+    # A streamed upload that breaks (or is cancelled) part way through
+    for i, chunk in enumerate(make_chunks(count, word)):
+        if i == fail_after:
+            raise RuntimeError("upload cancelled")
+        yield chunk
+
+@pytest.mark.parametrize("backend", ["numpy", "chroma"])
+def test_failed_upsert_keeps_previous_version(tmp_path, backend):
+    store = VectorStore(db_path=os.path.join(tmp_path, "store"), session_id="s", backend=backend)
+    assert store.upsert_document("notes.txt", make_chunks(6, "apples"), "v1") == 6
+    ids_before = sorted(store.get_store().ids())
+    
+    with pytest.raises(Exception, match="upload cancelled"):
+        store.upsert_document("notes.txt", failing_chunks(20, "pears", fail_after=9), "v2", batch_size=2)
+    
+    assert store.get_document_hash("notes.txt") == "v1"
+    assert sorted(store.get_store().ids()) == ids_before
+    hits = store.hybrid_search("apples", k=3)
+    assert hits and all("apples" in doc.page_content for doc, _ in hits)
+    assert all("pears" not in doc.page_content for doc, _ in store.hybrid_search("pears", k=3))
+    assert len(store.lexical_index()) == 6
+
+def test_cancelled_upsert_keeps_previous_version(tmp_path):
+    # Same path as a cancelled upload job: the chunk stream calls job.check()
+    store = VectorStore(db_path=os.path.join(tmp_path, "store"), session_id="s", backend="numpy")
+    store.upsert_document("notes.txt", make_chunks(6, "apples"), "v1")
+    job = Job("upload")
+    
+    def chunks():
+        for chunk in make_chunks(20, "pears"):
+            job.check()
+            yield chunk
+    
+    def on_batch(count):
+        if count >= 6:
+            job.cancel()
+    
+    with pytest.raises(Exception):
+        store.upsert_document("notes.txt", chunks(), "v2", batch_size=2, on_batch=on_batch)
+    
+    assert job.cancelled
+    assert store.get_document_hash("notes.txt") == "v1"
+    assert store.get_store().count() == 6
+    assert len(store.lexical_index()) == 6
+
+def test_completed_upsert_replaces_previous_version(tmp_path):
+    store = VectorStore(db_path=os.path.join(tmp_path, "store"), session_id="s", backend="numpy")
+    store.upsert_document("notes.txt", make_chunks(6, "apples"), "v1")
+    assert store.upsert_document("notes.txt", iter(make_chunks(5, "pears")), "v2", batch_size=2) == 5
+    assert store.get_document_hash("notes.txt") == "v2"
+    assert store.get_store().count() == 5
+    assert all("pears" in doc.page_content for doc, _ in store.hybrid_search("pears", k=5))